@@ -72,6 +72,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.core.middleware.audit.AuditBufferMiddleware',
 ]
 
 ROOT_URLCONF = 'AgendaVirtualEiwa.urls'
@@ -156,6 +157,16 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Adjuntos de tareas deduplicados por contenido (cada archivo se guarda una vez
+# en media/blobs/ con cuenta de referencias; ver apps/tasks/storage.py)
+ATTACHMENTS_DEDUP = os.environ.get('ATTACHMENTS_DEDUP', 'False') == 'True'
+
+# Descarga de adjuntos delegada al servidor frontal: 'nginx' (X-Accel-Redirect
+# a ATTACHMENTS_SENDFILE_PREFIX, una location internal con alias a MEDIA_ROOT)
+# o 'apache' (X-Sendfile). Vacío = Django envía el archivo (ver apps/tasks/downloads.py)
+ATTACHMENTS_SENDFILE = os.environ.get('ATTACHMENTS_SENDFILE', '')
+ATTACHMENTS_SENDFILE_PREFIX = os.environ.get('ATTACHMENTS_SENDFILE_PREFIX', '/protected-media/')
+
 # Configuración de archivos adjuntos
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10 MB
 ALLOWED_DOCUMENT_TYPES = [
@@ -169,6 +180,60 @@ ALLOWED_DOCUMENT_TYPES = [
     'text/plain',
 ]
 
+# Calendario: días de tareas vencidas que se envían junto al mes visible.
+# Las más antiguas se devuelven como resumen (ver calendar_app.views.calendar_overdue)
+CALENDAR_HISTORY_DAYS = int(os.environ.get('CALENDAR_HISTORY_DAYS', '30'))
+
+# Tareas por página en las listas (paginación por cursor)
+TASKS_PAGE_SIZE = int(os.environ.get('TASKS_PAGE_SIZE', '30'))
+
+# Entradas por página del historial de grupos y tareas
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', '50'))
+
+# Stream de notificaciones (SSE): repartir avisos entre procesos con LISTEN/NOTIFY de PostgreSQL.
+# Desactivar si la conexión pasa por PgBouncer en modo transacción
+NOTIFICATIONS_PG_LISTEN = os.environ.get('NOTIFICATIONS_PG_LISTEN', 'True') == 'True'
+
+# Particionado mensual de notificaciones (se activa una vez con `partition_notifications --setup`).
+# Meses de particiones creados por adelantado y meses que se conservan (0 = todos)
+NOTIFICATIONS_PARTITIONS_AHEAD = int(os.environ.get('NOTIFICATIONS_PARTITIONS_AHEAD', '3'))
+NOTIFICATIONS_RETENTION_MONTHS = int(os.environ.get('NOTIFICATIONS_RETENTION_MONTHS', '0'))
+
+# Auditoría (historial de tareas, actividad de grupos): escribir el lote de cada
+# petición en un hilo aparte en lugar de al final de la petición
+AUDIT_LOG_ASYNC = os.environ.get('AUDIT_LOG_ASYNC', 'False') == 'True'
+
+# Historial de tareas: meses que se conservan en la base de datos; lo anterior
+# se mueve a segmentos JSONL comprimidos en TASK_HISTORY_ARCHIVE_DIR
+# (0 = no archivar; el directorio debe estar en un disco persistente)
+TASK_HISTORY_HOT_MONTHS = int(os.environ.get('TASK_HISTORY_HOT_MONTHS', '0'))
+TASK_HISTORY_ARCHIVE_DIR = os.environ.get('TASK_HISTORY_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive', 'task_history'))
+
+# Segundos en los que notificaciones del mismo tipo y grupo se resumen en una sola
+NOTIFICATION_COALESCE_WINDOW = int(os.environ.get('NOTIFICATION_COALESCE_WINDOW', '900'))
+
+# Horas locales (TIME_ZONE) en las que se envían los recordatorios de tareas
+TASK_REMINDER_HOURS = [int(h) for h in os.environ.get('TASK_REMINDER_HOURS', '8,18').split(',') if h.strip()]
+
+# Tareas periódicas: comando de gestión -> intervalo mínimo en segundos.
+# Se ejecutan con `python manage.py run_scheduler` o dentro de gunicorn con RUN_SCHEDULER=True
+SCHEDULED_JOBS = {
+    'update_task_statuses': 60 * 60,
+    'cleanup_archived_files': 24 * 60 * 60,
+    'reconcile_task_counters': 24 * 60 * 60,
+    'reconcile_file_blobs': 24 * 60 * 60,
+    'reconcile_notification_counters': 6 * 60 * 60,
+    'partition_notifications': 24 * 60 * 60,
+    'send_task_reminders': 15 * 60,
+    'cleanup_old_actions': 24 * 60 * 60,
+    'archive_task_history': 24 * 60 * 60,
+}
+SCHEDULER_POLL_INTERVAL = 60
+# Un trabajo que sigue 'running' después de estos segundos se da por interrumpido (el proceso murió).
+# Los locks del planificador son de transacción (pg_try_advisory_xact_lock): sirven con PgBouncer en
+# modo transacción; no cambiarlos por locks de sesión mientras DATABASE_URL apunte al pooler
+SCHEDULER_JOB_TIMEOUT = int(os.environ.get('SCHEDULER_JOB_TIMEOUT', str(6 * 60 * 60)))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
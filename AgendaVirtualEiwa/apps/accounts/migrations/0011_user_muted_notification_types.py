@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_user_avatar_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='muted_notification_types',
+            field=models.PositiveIntegerField(default=0, verbose_name='Notificaciones silenciadas'),
+        ),
+    ]
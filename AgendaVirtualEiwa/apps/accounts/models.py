@@ -128,6 +128,12 @@ class User(AbstractUser):
         help_text='Categoría del avatar (eiwa, animals, disney)'
     )
     
+    # Tipos de notificación silenciados (máscara de bits, ver apps.notifications.preferences)
+    muted_notification_types = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Notificaciones silenciadas'
+    )
+    
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'nombre', 'apellido']
     
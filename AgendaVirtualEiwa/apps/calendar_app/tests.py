@@ -1,3 +1,231 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.groups.models import Group, GroupMember
+from apps.subjects.models import Subject
+from apps.tasks.models import Task, TaskCompletion
+
+
+class CalendarQueryCountTests(TestCase):
+    """El número de consultas del calendario no debe crecer con el número de tareas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(
+            username='estudiante', email='estudiante@example.com', password='clave-segura-123',
+            nombre='Ana', apellido='Lopez'
+        )
+        cls.groups = []
+        for i in range(4):
+            group = Group.objects.create(name=f'Grupo {i}')
+            GroupMember.objects.create(group=group, user=cls.user, role='member')
+            Subject.objects.create(group=group, name=f'Materia {i}', created_by=cls.user)
+            cls.groups.append(group)
+
+        # Mes siguiente: todas las tareas quedan pendientes y no cambian de estado
+        today = timezone.now().date()
+        cls.month_start = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+    def _create_tasks(self, count):
+        for i in range(count):
+            group = self.groups[i % len(self.groups)]
+            task = Task.objects.create(
+                group=group,
+                subject=group.subjects.first(),
+                title=f'Tarea {i}',
+                assigned_date=self.month_start,
+                due_date=self.month_start + timedelta(days=i % 28),
+                created_by=self.user,
+            )
+            if i % 2:
+                TaskCompletion.objects.create(task=task, user=self.user, completed=True, completed_at=timezone.now())
+
+    def _count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_calendar_data_query_count_is_constant(self):
+        self.client.force_login(self.user)
+        url = reverse('calendar_data')
+        params = {'year': self.month_start.year, 'month': self.month_start.month}
+
+        self._create_tasks(4)
+        small_count, small_data = self._count_queries(url, params)
+
+        self._create_tasks(40)
+        large_count, large_data = self._count_queries(url, params)
+
+        self.assertEqual(len(small_data['tasks']), 4)
+        self.assertEqual(len(large_data['tasks']), 44)
+        self.assertEqual(small_count, large_count)
+        self.assertLessEqual(large_count, 5)
+
+    def test_calendar_data_reports_user_completion(self):
+        self.client.force_login(self.user)
+        self._create_tasks(2)
+        _, data = self._count_queries(
+            reverse('calendar_data'),
+            {'year': self.month_start.year, 'month': self.month_start.month},
+        )
+        statuses = {task['title']: task['status'] for task in data['tasks']}
+        self.assertEqual(statuses, {'Tarea 0': 'pending', 'Tarea 1': 'completed'})
+
+    def test_day_details_query_count_is_constant(self):
+        self.client.force_login(self.user)
+        url = reverse('day_details', kwargs={
+            'year': self.month_start.year, 'month': self.month_start.month, 'day': 1,
+        })
+
+        self._create_tasks(1)
+        small_count, small_data = self._count_queries(url)
+
+        self._create_tasks(57)
+        large_count, large_data = self._count_queries(url)
+
+        self.assertEqual(small_data['task_count'], 1)
+        self.assertEqual(large_data['task_count'], 4)
+        self.assertEqual(small_count, large_count)
+        self.assertLessEqual(large_count, 5)
+
+
+class CalendarReadOnlyStatusTests(TestCase):
+    """El calendario calcula el estado para mostrar sin escribir en la base de datos"""
+
+    def test_calendar_data_does_not_persist_status_changes(self):
+        from apps.tracking.models import TaskHistory
+
+        User = get_user_model()
+        user = User.objects.create_user(
+            username='lectora', email='lectora@example.com', password='clave-segura-123',
+            nombre='Eva', apellido='Ruiz'
+        )
+        group = Group.objects.create(name='Grupo historico')
+        GroupMember.objects.create(group=group, user=user, role='member')
+        subject = Subject.objects.create(group=group, name='Historia', created_by=user)
+
+        today = timezone.now().date()
+        old_task = Task.objects.create(
+            group=group, subject=subject, title='Historia', created_by=user,
+            assigned_date=today - timedelta(days=60), due_date=today - timedelta(days=45),
+        )
+
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('calendar_data'), {
+                'year': old_task.due_date.year, 'month': old_task.due_date.month,
+            })
+
+        writes = [q['sql'] for q in ctx.captured_queries if not q['sql'].lstrip().upper().startswith('SELECT')]
+        self.assertEqual(writes, [])
+        payload = {task['id']: task for task in response.json()['tasks']}
+        self.assertTrue(payload[old_task.id]['is_archived'])
+
+        old_task.refresh_from_db()
+        self.assertEqual(old_task.status, 'pending')
+        self.assertFalse(TaskHistory.objects.filter(task=old_task).exists())
+
+
+class CalendarOverdueSummaryTests(TestCase):
+    """Las tareas vencidas fuera de la ventana de historial se resumen y se consultan paginadas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(
+            username='resumen', email='resumen@example.com', password='clave-segura-123',
+            nombre='Luis', apellido='Perez'
+        )
+        cls.group = Group.objects.create(name='Grupo resumen')
+        GroupMember.objects.create(group=cls.group, user=cls.user, role='member')
+        cls.math = Subject.objects.create(group=cls.group, name='Matematicas', created_by=cls.user)
+        cls.art = Subject.objects.create(group=cls.group, name='Arte', created_by=cls.user)
+
+        cls.today = timezone.now().date()
+        old_dates = [cls.today - timedelta(days=100 + i) for i in range(5)]
+        for i, due in enumerate(old_dates):
+            subject = cls.math if i < 3 else cls.art
+            task = Task.objects.create(
+                group=cls.group, subject=subject, title=subject.name, created_by=cls.user,
+                assigned_date=due - timedelta(days=7), due_date=due,
+            )
+            if i == 0:
+                TaskCompletion.objects.create(task=task, user=cls.user, completed=True, completed_at=timezone.now())
+        cls.recent = Task.objects.create(
+            group=cls.group, subject=cls.math, title='Matematicas', created_by=cls.user,
+            assigned_date=cls.today - timedelta(days=10), due_date=cls.today - timedelta(days=3),
+        )
+
+    def test_calendar_data_bounds_history_and_summarizes_older_overdue(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('calendar_data'), {'year': self.today.year, 'month': self.today.month})
+        data = response.json()
+
+        self.assertEqual([task['id'] for task in data['tasks']], [self.recent.id])
+        summary = data['overdue_summary']
+        self.assertEqual(summary['total'], 4)
+        counts = {row['subject']: row['count'] for row in summary['groups']}
+        self.assertEqual(counts, {'Arte': 2, 'Matematicas': 2})
+
+    def test_calendar_overdue_pages_through_older_tasks(self):
+        self.client.force_login(self.user)
+        url = reverse('calendar_overdue')
+
+        first = self.client.get(url, {'per_page': 3}).json()
+        second = self.client.get(url, {'per_page': 3, 'cursor': first['next_cursor']}).json()
+
+        self.assertTrue(first['has_next'])
+        self.assertFalse(second['has_next'])
+        self.assertIsNone(second['next_cursor'])
+        ids = [task['id'] for task in first['tasks'] + second['tasks']]
+        self.assertEqual(len(ids), 4)
+        self.assertEqual(len(set(ids)), 4)
+        self.assertNotIn(self.recent.id, ids)
+        self.assertTrue(all(task['is_archived'] for task in first['tasks']))
+
+    def test_summary_rows_drill_down_to_their_tasks(self):
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('calendar')), 'id="overdueSummary"')
+
+        summary = self.client.get(
+            reverse('calendar_data'), {'year': self.today.year, 'month': self.today.month}
+        ).json()['overdue_summary']
+        for row in summary['groups']:
+            # Los mismos parámetros que envía el calendario al hacer clic en el resumen
+            tasks = self.client.get(reverse('calendar_overdue'), {
+                'before': summary['before'], 'group': row['group_id'], 'subject': row['subject_id'],
+            }).json()['tasks']
+            self.assertEqual(len(tasks), row['count'])
+            self.assertEqual({task['subject'] for task in tasks}, {row['subject']})
+
+    def test_view_all_keeps_the_creator_filter(self):
+        User = get_user_model()
+        classmate = User.objects.create_user(
+            username='autora', email='autora@example.com', password='clave-segura-123',
+            nombre='Rosa', apellido='Vega'
+        )
+        due = self.today - timedelta(days=120)
+        Task.objects.create(
+            group=self.group, subject=self.art, title='Arte', created_by=classmate,
+            assigned_date=due - timedelta(days=7), due_date=due,
+        )
+        self.client.force_login(self.user)
+
+        summary = self.client.get(reverse('calendar_data'), {
+            'year': self.today.year, 'month': self.today.month, 'creator': self.user.id,
+        }).json()['overdue_summary']
+        self.assertEqual(summary['filters'], {'creator': str(self.user.id)})
 
-# Create your tests here.
+        # Los parámetros que envía "Ver todas": before y los filtros del resumen
+        tasks = self.client.get(
+            reverse('calendar_overdue'), {'before': summary['before'], **summary['filters']}
+        ).json()['tasks']
+        self.assertEqual(len(tasks), summary['total'])
@@ -1,7 +1,9 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
+from django.conf import settings
 from django.utils import timezone
+from django.db.models import Count, Exists, Max, Min, OuterRef, Q
 from datetime import datetime, timedelta
 from calendar import monthrange
 from apps.tasks.models import Task, TaskCompletion
@@ -45,36 +47,35 @@ def calendar_data(request):
     status_filter = request.GET.get('status')  # pending, completed, overdue
     creator_id = request.GET.get('creator')
     
-    # Obtener grupos del usuario
-    user_group_ids = GroupMember.objects.filter(user=request.user).values_list('group_id', flat=True)
-    
     # Determinar qué grupos mostrar según el modo multigrupo
-    multigroup_mode = request.user.multigroup_mode
+    filtered_group_ids = get_calendar_group_ids(request, group_id)
     
-    # Siempre permitir ver todos los grupos, pero en modo separado preseleccionar el activo
-    if group_id:
-        # Si se especifica un grupo en el filtro, usarlo
-        filtered_group_ids = [int(group_id)]
-    elif multigroup_mode == 'separated' and request.user.last_active_group_id:
-        # En modo separado, usar el grupo activo por defecto
-        filtered_group_ids = [request.user.last_active_group_id]
-    else:
-        # Mostrar todos los grupos
-        filtered_group_ids = list(user_group_ids)
+    # Obtener fecha actual
+    today = timezone.now().date()
     
-    # Construir query de tareas
-    tasks_query = Task.objects.filter(group_id__in=filtered_group_ids).select_related(
-        'subject', 'group', 'created_by'
-    )
+    # Query base con los filtros del usuario
+    base_query = Task.objects.filter(group_id__in=filtered_group_ids)
     
     # Aplicar filtros adicionales
     if subject_id:
-        tasks_query = tasks_query.filter(subject_id=subject_id)
+        base_query = base_query.filter(subject_id=subject_id)
     if creator_id:
-        tasks_query = tasks_query.filter(created_by_id=creator_id)
+        base_query = base_query.filter(created_by_id=creator_id)
     
-    # Obtener fecha actual
-    today = timezone.now().date()
+    # Anotar con el estado personal del usuario y el estado calculado
+    # (solo lectura, sin actualizar la tarea)
+    tasks_query = base_query.select_related(
+        'subject', 'group', 'created_by'
+    ).annotate(
+        computed_status=Task.computed_status_expression(today),
+        user_completed=Exists(
+            TaskCompletion.objects.filter(
+                task=OuterRef('pk'),
+                user=request.user,
+                completed=True
+            )
+        )
+    )
     
     # Filtrar por rango de fechas según vista
     if view_type == 'month':
@@ -93,9 +94,16 @@ def calendar_data(request):
     
     # Aplicar filtro de fechas
     # Si no hay filtro de estado, mostrar tareas del mes Y vencidas anteriores
+    overdue_summary = None
     if not status_filter:
-        # Mostrar tareas del mes actual + tareas vencidas de meses anteriores
-        tasks_query = tasks_query.filter(due_date__lte=end_date)
+        # Mostrar tareas del mes actual + tareas vencidas dentro de la ventana de historial
+        history_start = get_history_start(start_date, today)
+        tasks_query = tasks_query.filter(due_date__gte=history_start, due_date__lte=end_date)
+        # Las vencidas más antiguas se resumen por grupo y materia
+        overdue_summary = get_overdue_summary(
+            base_query, request.user, history_start,
+            filters={'group': group_id, 'subject': subject_id, 'creator': creator_id},
+        )
     else:
         # Con filtro, solo mostrar tareas del rango
         tasks_query = tasks_query.filter(due_date__gte=start_date, due_date__lte=end_date)
@@ -104,16 +112,12 @@ def calendar_data(request):
     tasks = []
     
     for task in tasks_query:
-        # Actualizar estado de la tarea
-        task.update_status()
-        
-        # Obtener estado del usuario actual
-        completion = TaskCompletion.objects.filter(task=task, user=request.user).first()
-        user_completed = completion.completed if completion else False
+        # Estado del usuario actual (anotado en la consulta)
+        user_completed = task.user_completed
         
         # Determinar si está vencida
         is_overdue = task.due_date < today
-        is_archived = task.status == 'archived'
+        is_archived = task.computed_status == 'archived'
         
         # LÓGICA DE FILTRADO
         if status_filter == 'overdue':
@@ -187,11 +191,165 @@ def calendar_data(request):
     # Calcular carga de trabajo por semana (solo con las tareas filtradas)
     workload = calculate_weekly_workload(tasks, start_date, end_date)
     
-    return JsonResponse({
+    data = {
         'tasks': tasks,
         'workload': workload,
         'start_date': start_date.isoformat(),
         'end_date': end_date.isoformat(),
+    }
+    if overdue_summary is not None:
+        data['overdue_summary'] = overdue_summary
+    
+    return JsonResponse(data)
+
+
+def get_calendar_group_ids(request, group_id=None):
+    """Determina los grupos a mostrar en el calendario según el filtro y el modo multigrupo"""
+    # Obtener grupos del usuario
+    user_group_ids = list(GroupMember.objects.filter(user=request.user).values_list('group_id', flat=True))
+    
+    # Siempre permitir ver todos los grupos, pero en modo separado preseleccionar el activo
+    if group_id:
+        # Si se especifica un grupo en el filtro, usarlo (solo si el usuario pertenece)
+        return [gid for gid in [int(group_id)] if gid in user_group_ids]
+    elif request.user.multigroup_mode == 'separated' and request.user.last_active_group_id:
+        # En modo separado, usar el grupo activo por defecto
+        return [request.user.last_active_group_id]
+    
+    # Mostrar todos los grupos
+    return user_group_ids
+
+
+def get_history_start(start_date, today):
+    """Fecha mínima de las tareas vencidas que se envían junto al rango visible"""
+    window_start = today - timedelta(days=settings.CALENDAR_HISTORY_DAYS)
+    return min(start_date, window_start)
+
+
+def get_overdue_summary(base_query, user, before, filters=None):
+    """
+    Resumen de tareas vencidas anteriores a la ventana de historial
+    
+    Cuenta en una sola consulta las tareas no completadas por el usuario,
+    agrupadas por grupo y materia. El detalle se obtiene con calendar_overdue,
+    enviando los mismos filtros (se devuelven en 'filters').
+    """
+    rows = base_query.filter(
+        due_date__lt=before
+    ).exclude(
+        Exists(TaskCompletion.objects.filter(task=OuterRef('pk'), user=user, completed=True))
+    ).values(
+        'group_id', 'group__name', 'subject_id', 'subject__name', 'subject__color'
+    ).annotate(
+        count=Count('id'),
+        oldest=Min('due_date'),
+        newest=Max('due_date'),
+    ).order_by('group__name', 'subject__name')
+    
+    groups = [
+        {
+            'group_id': row['group_id'],
+            'group': row['group__name'],
+            'subject_id': row['subject_id'],
+            'subject': row['subject__name'],
+            'subject_color': row['subject__color'],
+            'count': row['count'],
+            'oldest': row['oldest'].isoformat(),
+            'newest': row['newest'].isoformat(),
+        }
+        for row in rows
+    ]
+    
+    return {
+        'before': before.isoformat(),
+        'filters': {name: value for name, value in (filters or {}).items() if value},
+        'total': sum(row['count'] for row in groups),
+        'groups': groups,
+    }
+
+
+def parse_overdue_cursor(value):
+    """(due_date, id) del cursor 'AAAA-MM-DD|id'; None si falta o no es válido"""
+    try:
+        due_date, task_id = value.split('|')
+        return datetime.strptime(due_date, '%Y-%m-%d').date(), int(task_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+@login_required
+def calendar_overdue(request):
+    """API paginada con el detalle de las tareas vencidas fuera de la ventana de historial"""
+    today = timezone.now().date()
+    
+    # Filtros (los mismos del calendario)
+    group_id = request.GET.get('group')
+    subject_id = request.GET.get('subject')
+    creator_id = request.GET.get('creator')
+    
+    try:
+        before = datetime.strptime(request.GET['before'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        before = get_history_start(today, today)
+    
+    try:
+        per_page = min(max(int(request.GET.get('per_page', 20)), 1), 100)
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros de paginación inválidos'}, status=400)
+    
+    tasks_query = Task.objects.filter(
+        group_id__in=get_calendar_group_ids(request, group_id),
+        due_date__lt=before
+    ).exclude(
+        Exists(TaskCompletion.objects.filter(task=OuterRef('pk'), user=request.user, completed=True))
+    )
+    
+    if subject_id:
+        tasks_query = tasks_query.filter(subject_id=subject_id)
+    if creator_id:
+        tasks_query = tasks_query.filter(created_by_id=creator_id)
+    
+    # Paginación por keyset sobre (due_date, id): cada página sigue después de la última tarea enviada
+    cursor = parse_overdue_cursor(request.GET.get('cursor'))
+    if cursor:
+        due_date, task_id = cursor
+        tasks_query = tasks_query.filter(Q(due_date__lt=due_date) | Q(due_date=due_date, id__lt=task_id))
+    
+    tasks_query = tasks_query.select_related('subject', 'group', 'created_by').annotate(
+        computed_status=Task.computed_status_expression(today)
+    ).order_by('-due_date', '-id')
+    
+    # Pedir un elemento extra para saber si hay más páginas sin hacer COUNT
+    page_tasks = list(tasks_query[:per_page + 1])
+    next_cursor = None
+    if len(page_tasks) > per_page:
+        last = page_tasks[per_page - 1]
+        next_cursor = f'{last.due_date.isoformat()}|{last.id}'
+    
+    tasks = []
+    for task in page_tasks[:per_page]:
+        is_archived = task.computed_status == 'archived'
+        tasks.append({
+            'id': task.id,
+            'title': task.title,
+            'subject': task.subject.name,
+            'subject_color': task.subject.color,
+            'group': task.group.name,
+            'due_date': task.due_date.isoformat(),
+            'assigned_date': task.assigned_date.isoformat(),
+            'status': 'archived' if is_archived else 'overdue',
+            'color_class': 'secondary' if is_archived else 'danger',
+            'priority': task.priority,
+            'created_by': f"{task.created_by.nombre} {task.created_by.apellido}" if task.created_by else "Desconocido",
+            'description': task.description[:100] if task.description else "",
+            'is_archived': is_archived,
+        })
+    
+    return JsonResponse({
+        'tasks': tasks,
+        'before': before.isoformat(),
+        'next_cursor': next_cursor,
+        'has_next': next_cursor is not None,
     })
 
 
@@ -266,16 +424,23 @@ def day_details(request, year, month, day):
     # Obtener grupos del usuario
     user_group_ids = GroupMember.objects.filter(user=request.user).values_list('group_id', flat=True)
     
-    # Obtener tareas del día (incluyendo vencidas)
+    # Obtener tareas del día (incluyendo vencidas) con el estado personal del usuario
     tasks = Task.objects.filter(
         group_id__in=user_group_ids,
         due_date=date
-    ).select_related('subject', 'group', 'created_by')
+    ).select_related('subject', 'group', 'created_by').annotate(
+        user_completed=Exists(
+            TaskCompletion.objects.filter(
+                task=OuterRef('pk'),
+                user=request.user,
+                completed=True
+            )
+        )
+    )
     
     tasks_data = []
     for task in tasks:
-        completion = TaskCompletion.objects.filter(task=task, user=request.user).first()
-        user_completed = completion.completed if completion else False
+        user_completed = task.user_completed
         is_overdue = task.due_date < today
         
         # Determinar estado
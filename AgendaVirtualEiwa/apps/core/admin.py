@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import ScheduledJob
 
-# Register your models here.
+
+@admin.register(ScheduledJob)
+class ScheduledJobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_status', 'last_started_at', 'last_duration', 'run_count']
+    list_filter = ['last_status']
+    search_fields = ['name']
+    readonly_fields = ['last_started_at', 'last_finished_at', 'last_duration', 'last_output', 'last_error', 'run_count']
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.scheduler import run_forever, run_job, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas periódicas (estados de tareas, limpieza de archivos y acciones) sin depender de cron'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Revisa los trabajos pendientes una sola vez y termina',
+        )
+        parser.add_argument(
+            '--job',
+            help='Ejecuta solo el trabajo indicado y termina',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Ejecuta aunque no haya pasado el intervalo desde la última ejecución',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=int,
+            default=settings.SCHEDULER_POLL_INTERVAL,
+            help='Segundos entre cada revisión de trabajos pendientes',
+        )
+
+    def handle(self, *args, **options):
+        if options['job']:
+            name = options['job']
+            if name not in settings.SCHEDULED_JOBS:
+                raise CommandError(f'Trabajo desconocido: {name}')
+            results = {name: run_job(name, settings.SCHEDULED_JOBS[name], force=options['force'])}
+        elif options['once']:
+            results = run_pending_jobs(force=options['force'])
+        else:
+            self.stdout.write(f"Planificador iniciado (revisión cada {options['poll_interval']}s)")
+            run_forever(poll_interval=options['poll_interval'])
+            return
+
+        for name, status in results.items():
+            if status == 'success':
+                self.stdout.write(self.style.SUCCESS(f'  ✓ {name}'))
+            elif status == 'error':
+                self.stdout.write(self.style.ERROR(f'  ✗ {name} (ver ScheduledJob.last_error)'))
+            else:
+                self.stdout.write(f'  - {name}: omitido (no le toca o lo ejecuta otro proceso)')
@@ -0,0 +1,40 @@
+# Middleware del buffer de auditoría
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from apps.tracking.buffer import get_buffer, start_buffer, stop_buffer
+
+
+class AuditBufferMiddleware:
+    """
+    Acumula la auditoría de la petición y la escribe en lote al terminar
+
+    Ver apps.tracking.buffer. Funciona tanto con vistas síncronas como
+    asíncronas (stream SSE bajo ASGI).
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        
+        token = start_buffer()
+        try:
+            return self.get_response(request)
+        finally:
+            get_buffer().flush()
+            stop_buffer(token)
+    
+    async def __acall__(self, request):
+        token = start_buffer()
+        try:
+            return await self.get_response(request)
+        finally:
+            await sync_to_async(get_buffer().flush)()
+            stop_buffer(token)
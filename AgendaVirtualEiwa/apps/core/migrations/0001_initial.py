@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Comando')),
+                ('last_status', models.CharField(blank=True, choices=[('running', 'En ejecución'), ('success', 'Completada'), ('error', 'Error')], max_length=20)),
+                ('last_started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_finished_at', models.DateTimeField(blank=True, null=True)),
+                ('last_duration', models.FloatField(blank=True, null=True, verbose_name='Duración (segundos)')),
+                ('last_output', models.TextField(blank=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('run_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Tarea Programada',
+                'verbose_name_plural': 'Tareas Programadas',
+                'ordering': ['name'],
+            },
+        ),
+    ]
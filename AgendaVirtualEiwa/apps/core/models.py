@@ -1,3 +1,30 @@
 from django.db import models
 
-# Create your models here.
+
+class ScheduledJob(models.Model):
+    """Registro de ejecuciones de tareas periódicas (ver apps.core.scheduler)"""
+    
+    STATUS_CHOICES = [
+        ('running', 'En ejecución'),
+        ('success', 'Completada'),
+        ('error', 'Error'),
+    ]
+    
+    name = models.CharField(max_length=100, unique=True, verbose_name="Comando")
+    last_status = models.CharField(max_length=20, choices=STATUS_CHOICES, blank=True)
+    last_started_at = models.DateTimeField(null=True, blank=True)
+    last_finished_at = models.DateTimeField(null=True, blank=True)
+    last_duration = models.FloatField(null=True, blank=True, verbose_name="Duración (segundos)")
+    last_output = models.TextField(blank=True)
+    last_error = models.TextField(blank=True)
+    run_count = models.PositiveIntegerField(default=0)
+    # Progreso que guarda el comando para retomar una ejecución interrumpida
+    checkpoint = models.JSONField(default=dict, blank=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_last_status_display() or 'sin ejecutar'})"
+    
+    class Meta:
+        verbose_name = 'Tarea Programada'
+        verbose_name_plural = 'Tareas Programadas'
+        ordering = ['name']
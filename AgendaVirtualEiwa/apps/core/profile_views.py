@@ -150,6 +150,24 @@ def update_preferences(request):
             messages.success(request, 'Grupos del dashboard actualizados exitosamente')
             return redirect('profile_settings')
         
+        # Manejar tipos de notificación silenciados
+        if form_type == 'notification_types':
+            from apps.notifications.preferences import build_muted_mask, get_mutable_types
+            enabled_types = set(request.POST.getlist('notification_types'))
+            muted_types = [t for t, _ in get_mutable_types() if t not in enabled_types]
+            
+            user.muted_notification_types = build_muted_mask(muted_types)
+            user.save(update_fields=['muted_notification_types'])
+            
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return JsonResponse({
+                    'success': True,
+                    'message': 'Preferencias de notificaciones actualizadas'
+                })
+            
+            messages.success(request, 'Preferencias de notificaciones actualizadas')
+            return redirect('notifications_settings')
+        
         # Obtener preferencias de resumen de actividades
         pending_range = request.POST.get('pending_range', 'week')
         completed_range = request.POST.get('completed_range', 'week')
@@ -184,7 +202,6 @@ def update_preferences(request):
         # Solo agregar mensaje si NO es AJAX
         messages.success(request, 'Preferencias actualizadas exitosamente')
         # Redirigir a la sección de preferencias
-        from django.shortcuts import redirect
         from django.urls import reverse
         return redirect(reverse('profile_settings') + '#preferences')
         
@@ -238,7 +255,15 @@ def delete_account(request):
 @login_required
 def notifications_settings(request):
     """Vista de configuración de notificaciones"""
-    return render(request, 'settings/notifications_settings.html')
+    from apps.notifications.preferences import get_mutable_types, is_muted
+    
+    notification_types = [
+        {'value': value, 'label': label, 'enabled': not is_muted(request.user, value)}
+        for value, label in get_mutable_types()
+    ]
+    return render(request, 'settings/notifications_settings.html', {
+        'notification_types': notification_types,
+    })
 
 
 @login_required
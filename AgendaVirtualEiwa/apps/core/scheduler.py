@@ -0,0 +1,161 @@
+# Planificador de tareas periódicas dentro del proceso
+#
+# Ejecuta los comandos definidos en settings.SCHEDULED_JOBS sin depender de cron.
+# Antes de ejecutar un trabajo se reclama en una transacción corta: se toma un
+# advisory lock de PostgreSQL de transacción (pg_try_advisory_xact_lock), se
+# verifica que le toque y que nadie lo tenga en ejecución, y se marca como
+# 'running'. Así, aunque varios workers (o varios nodos) ejecuten el
+# planificador, solo uno corre cada trabajo por periodo. El lock se libera con
+# el COMMIT, en la misma transacción: funciona igual a través de PgBouncer en
+# modo transacción (el pooler de Neon), donde un lock de sesión podría tomarse
+# y liberarse en conexiones distintas. El comando se ejecuta después, fuera de
+# esa transacción, y el resultado queda en ScheduledJob.
+import io
+import threading
+import time
+import traceback
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, close_old_connections, transaction
+from django.utils import timezone
+
+
+# Prefijo para que las claves de los locks no choquen con otros usos de advisory locks
+LOCK_NAMESPACE = 'agenda-scheduler'
+
+
+def get_lock_key(job_name):
+    """Clave entera estable para pg_try_advisory_xact_lock a partir del nombre del trabajo"""
+    return zlib.crc32(f'{LOCK_NAMESPACE}:{job_name}'.encode())
+
+
+def try_advisory_xact_lock(key):
+    """
+    Intenta tomar el lock hasta el final de la transacción actual, sin bloquear
+
+    Debe llamarse dentro de transaction.atomic(). Fuera de PostgreSQL siempre lo concede.
+    """
+    if connection.vendor != 'postgresql':
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_xact_lock(%s)', [key])
+        return cursor.fetchone()[0]
+
+
+def is_due(job, interval, now):
+    """Verifica si el trabajo debe ejecutarse según su última ejecución"""
+    if job.last_started_at is None:
+        return True
+    return job.last_started_at + timedelta(seconds=interval) <= now
+
+
+def is_running(job, now):
+    """Otro proceso lo está ejecutando (un 'running' más viejo que SCHEDULER_JOB_TIMEOUT se da por interrumpido)"""
+    if job.last_status != 'running' or job.last_started_at is None:
+        return False
+    return job.last_started_at + timedelta(seconds=settings.SCHEDULER_JOB_TIMEOUT) > now
+
+
+def claim_job(name, interval, force=False):
+    """
+    Marca un trabajo como en ejecución si le toca y nadie más lo tiene
+
+    Returns:
+        El ScheduledJob reclamado, o None si no corresponde ejecutarlo
+    """
+    from .models import ScheduledJob
+
+    with transaction.atomic():
+        if not try_advisory_xact_lock(get_lock_key(name)):
+            return None
+        job, _ = ScheduledJob.objects.get_or_create(name=name)
+        now = timezone.now()
+        if is_running(job, now) or (not force and not is_due(job, interval, now)):
+            return None
+
+        job.last_status = 'running'
+        job.last_started_at = now
+        job.save(update_fields=['last_status', 'last_started_at'])
+    return job
+
+
+def run_job(name, interval, force=False):
+    """
+    Ejecuta un trabajo si le toca y nadie más lo está ejecutando
+
+    Args:
+        name: Nombre del comando de gestión
+        interval: Segundos mínimos entre ejecuciones
+        force: Ejecutar aunque no haya pasado el intervalo
+
+    Returns:
+        'success', 'error' o None si no se ejecutó
+    """
+    job = claim_job(name, interval, force=force)
+    if job is None:
+        return None
+
+    output = io.StringIO()
+    started = time.monotonic()
+    try:
+        call_command(name, stdout=output, stderr=output)
+        job.last_status = 'success'
+        job.last_error = ''
+    except Exception:
+        job.last_status = 'error'
+        job.last_error = traceback.format_exc()
+
+    job.last_finished_at = timezone.now()
+    job.last_duration = time.monotonic() - started
+    job.last_output = output.getvalue()[-10000:]
+    job.run_count += 1
+    # Sin checkpoint: el comando lo actualiza por su cuenta durante la ejecución
+    job.save(update_fields=[
+        'last_status', 'last_error', 'last_finished_at', 'last_duration', 'last_output', 'run_count',
+    ])
+    return job.last_status
+
+
+def run_pending_jobs(force=False):
+    """Ejecuta una vez todos los trabajos configurados que estén pendientes"""
+    results = {}
+    for name, interval in settings.SCHEDULED_JOBS.items():
+        results[name] = run_job(name, interval, force=force)
+    return results
+
+
+def run_forever(poll_interval=None, stop_event=None):
+    """Bucle del planificador: revisa los trabajos cada poll_interval segundos"""
+    if poll_interval is None:
+        poll_interval = settings.SCHEDULER_POLL_INTERVAL
+
+    while not (stop_event and stop_event.is_set()):
+        close_old_connections()
+        try:
+            run_pending_jobs()
+        except Exception:
+            # Un fallo de conexión no debe detener el planificador
+            traceback.print_exc()
+        finally:
+            close_old_connections()
+
+        if stop_event:
+            stop_event.wait(poll_interval)
+        else:
+            time.sleep(poll_interval)
+
+
+def start_scheduler_thread(poll_interval=None):
+    """Inicia el planificador en un hilo daemon (para el hook post_fork de gunicorn)"""
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=run_forever,
+        kwargs={'poll_interval': poll_interval, 'stop_event': stop_event},
+        name='agenda-scheduler',
+        daemon=True,
+    )
+    thread.start()
+    return thread, stop_event
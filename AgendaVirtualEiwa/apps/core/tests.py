@@ -1,3 +1,155 @@
+import threading
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core.models import ScheduledJob
+from apps.core.scheduler import get_lock_key, run_job, try_advisory_xact_lock
+from apps.groups.models import Group, GroupMember
+from apps.subjects.models import Subject
+from apps.tasks.models import Task, TaskCompletion
+from apps.tasks.utils import get_group_task_counters
+
+
+class SchedulerTests(TestCase):
+    """El planificador registra cada ejecución y respeta el intervalo"""
+
+    def test_run_job_records_run_and_skips_until_due(self):
+        self.assertEqual(run_job('update_task_statuses', interval=3600), 'success')
+
+        job = ScheduledJob.objects.get(name='update_task_statuses')
+        self.assertEqual(job.run_count, 1)
+        self.assertIsNotNone(job.last_duration)
+        self.assertIn('Proceso completado', job.last_output)
+
+        self.assertIsNone(run_job('update_task_statuses', interval=3600))
+        self.assertEqual(run_job('update_task_statuses', interval=3600, force=True), 'success')
+        job.refresh_from_db()
+        self.assertEqual(job.run_count, 2)
+
+    def test_run_job_records_errors(self):
+        self.assertEqual(run_job('comando_inexistente', interval=60), 'error')
+        job = ScheduledJob.objects.get(name='comando_inexistente')
+        self.assertIn('comando_inexistente', job.last_error)
+
+    def test_running_job_is_not_started_again_until_it_times_out(self):
+        started = timezone.now() - timedelta(minutes=5)
+        ScheduledJob.objects.create(name='update_task_statuses', last_status='running', last_started_at=started)
+        self.assertIsNone(run_job('update_task_statuses', interval=60, force=True))
+
+        with self.settings(SCHEDULER_JOB_TIMEOUT=60):
+            self.assertEqual(run_job('update_task_statuses', interval=60), 'success')
+
+    def test_job_is_skipped_while_another_connection_claims_it(self):
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    try_advisory_xact_lock(get_lock_key('update_task_statuses'))
+                    locked.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        self.assertTrue(locked.wait(5))
+        try:
+            self.assertIsNone(run_job('update_task_statuses', interval=60))
+        finally:
+            release.set()
+            holder.join(5)
+
+        # El COMMIT del otro proceso liberó el lock
+        self.assertEqual(run_job('update_task_statuses', interval=60), 'success')
+
+
+class DashboardQueryCountTests(TestCase):
+    """Los contadores del dashboard salen de una consulta agregada, sin importar cuántos grupos haya"""
+
+    # Presupuesto fijo de consultas para la vista completa (incluye sesión y usuario)
+    QUERY_BUDGET = 8
+
+    def _make_user(self, username, group_count, date_range='all'):
+        User = get_user_model()
+        user = User.objects.create_user(
+            username=username, email=f'{username}@example.com', password='clave-segura-123',
+            nombre='Nora', apellido='Silva',
+            pending_range=date_range, completed_range=date_range, overdue_range=date_range,
+        )
+        today = timezone.now().date()
+        for g in range(group_count):
+            group = Group.objects.create(name=f'{username} {g}')
+            GroupMember.objects.create(group=group, user=user, role='member')
+            subject = Subject.objects.create(group=group, name='Lenguaje', created_by=user)
+            for days in (3, -2, 1):
+                task = Task.objects.create(
+                    group=group, subject=subject, title='Lenguaje', created_by=user,
+                    assigned_date=today - timedelta(days=7), due_date=today + timedelta(days=days),
+                )
+            TaskCompletion.objects.create(task=task, user=user, completed=True, completed_at=timezone.now())
+        return user
+
+    def _get_dashboard(self, user):
+        self.client.force_login(user)
+        # La primera visita crea los contadores del usuario; se mide la siguiente
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.context
+
+    def test_query_count_is_constant_for_1_to_20_groups(self):
+        counts = []
+        for group_count in (1, 5, 20):
+            user = self._make_user(f'usuario{group_count}', group_count)
+            query_count, context = self._get_dashboard(user)
+            counts.append(query_count)
+            self.assertEqual(len(context['group_stats']), group_count)
+
+        self.assertEqual(len(set(counts)), 1, counts)
+        self.assertLessEqual(counts[0], self.QUERY_BUDGET)
+
+    def test_counters_reflect_personal_completion(self):
+        user = self._make_user('contadora', 2)
+        _, context = self._get_dashboard(user)
+
+        self.assertEqual(context['pending_tasks_count'], 4)
+        self.assertEqual(context['completed_tasks_count'], 2)
+        self.assertEqual(context['overdue_tasks_count'], 2)
+        for stat in context['group_stats']:
+            self.assertEqual((stat['pending'], stat['completed'], stat['total']), (2, 1, 3))
+
+    def test_default_ranges_read_the_counters(self):
+        user = self._make_user('predeterminada', 3)
+        get_user_model().objects.filter(id=user.id).update(
+            pending_range='week', completed_range='week', overdue_range='7days'
+        )
+        user.refresh_from_db()
+        query_count, context = self._get_dashboard(user)
+
+        self.assertLessEqual(query_count, self.QUERY_BUDGET)
+        today = timezone.now().date()
+        week_start = today - timedelta(days=today.weekday())
+        expected = get_group_task_counters(
+            user, list(user.group_memberships.values_list('group_id', flat=True)),
+            pending_range=(week_start, week_start + timedelta(days=6)),
+            completed_range=(week_start, week_start + timedelta(days=6)),
+            overdue_since=today - timedelta(days=7),
+        ).values()
+        for name in ('pending', 'completed', 'overdue'):
+            self.assertEqual(context[f'{name}_tasks_count'], sum(c[name] for c in expected), name)
+
+    def test_ranged_counters_use_aggregate_query(self):
+        user = self._make_user('semanal', 2, date_range='today')
+        query_count, context = self._get_dashboard(user)
 
-# Create your tests here.
+        self.assertLessEqual(query_count, self.QUERY_BUDGET + 1)
+        self.assertEqual(context['completed_tasks_count'], 2)
+        self.assertEqual(context['pending_tasks_count'], 0)
@@ -36,9 +36,9 @@ def dashboard(request):
     from django.db.models import Q, Count
     
     # Verificar si el usuario tiene grupos APROBADOS (es miembro)
-    user_groups = GroupMember.objects.filter(user=request.user).select_related('group')
-    has_groups = user_groups.exists()
-    user_groups_count = user_groups.count()
+    user_groups = list(GroupMember.objects.filter(user=request.user).select_related('group'))
+    user_groups_count = len(user_groups)
+    has_groups = user_groups_count > 0
     
     # Verificar solicitudes pendientes (no cuenta como tener grupo)
     pending_requests = JoinRequest.objects.filter(
@@ -50,28 +50,29 @@ def dashboard(request):
     multigroup_mode = request.user.multigroup_mode
     
     # Determinar qué grupos usar según el modo y configuración de dashboard
-    dashboard_groups = request.user.dashboard_groups.all()
+    dashboard_group_ids = list(request.user.dashboard_groups.values_list('id', flat=True))
     
-    if dashboard_groups.exists():
+    if dashboard_group_ids:
         # Si hay grupos configurados para el dashboard, usar esos
-        user_group_ids = list(dashboard_groups.values_list('id', flat=True))
+        user_group_ids = dashboard_group_ids
     elif multigroup_mode == 'unified':
         # Modo unificado sin configuración: usar todos los grupos
-        user_group_ids = list(user_groups.values_list('group_id', flat=True))
+        user_group_ids = [membership.group_id for membership in user_groups]
     else:
         # Modo separado: usar solo el grupo activo
         if request.user.last_active_group_id:
             user_group_ids = [request.user.last_active_group_id]
         elif user_groups_count == 1:
             # Si solo tiene un grupo, usarlo automáticamente
-            user_group_ids = [user_groups.first().group.id]
+            user_group_ids = [user_groups[0].group_id]
         else:
             # Si no hay grupo activo y tiene múltiples grupos, no mostrar datos
             user_group_ids = []
     
     # Importar modelos necesarios
     from apps.tasks.models import TaskCompletion
-    from django.db.models import Exists, OuterRef, Q
+    from apps.tasks.utils import get_group_task_counters
+    from django.db.models import Exists, OuterRef
     
     # Obtener preferencias del usuario
     today = timezone.now().date()
@@ -93,57 +94,60 @@ def dashboard(request):
             return month_start, month_end
         return None, None  # 'all'
     
-    # Estadísticas de tareas pendientes (basadas en preferencias)
-    pending_query = Task.objects.filter(
-        group_id__in=user_group_ids
-    ).exclude(
-        Exists(TaskCompletion.objects.filter(task=OuterRef('pk'), user=request.user, completed=True))
-    )
-    
-    if request.user.pending_range != 'all':
-        start_date, end_date = get_date_range(request.user.pending_range)
-        if start_date and end_date:
-            pending_query = pending_query.filter(due_date__gte=start_date, due_date__lte=end_date)
-    
-    pending_tasks_count = pending_query.count()
-    
-    # Estadísticas de tareas completadas (basadas en preferencias)
-    completed_query = TaskCompletion.objects.filter(
-        task__group_id__in=user_group_ids,
-        user=request.user,
-        completed=True
-    )
-    
-    if request.user.completed_range != 'all':
-        start_date, end_date = get_date_range(request.user.completed_range)
-        if start_date and end_date:
-            completed_query = completed_query.filter(completed_at__date__gte=start_date, completed_at__date__lte=end_date)
-    
-    completed_tasks_count = completed_query.count()
-    
     # Tareas vencidas (basadas en preferencias)
-    overdue_query = Task.objects.filter(
-        group_id__in=user_group_ids,
-        due_date__lt=today
-    ).exclude(
-        Exists(TaskCompletion.objects.filter(task=OuterRef('pk'), user=request.user, completed=True))
-    )
+    overdue_since = {
+        'today': today - timedelta(days=1),
+        '7days': today - timedelta(days=7),
+        '30days': today - timedelta(days=30),
+    }.get(request.user.overdue_range)  # 'all' no aplica filtro adicional
     
-    if request.user.overdue_range == 'today':
-        overdue_query = overdue_query.filter(due_date=today - timedelta(days=1))
-    elif request.user.overdue_range == '7days':
-        overdue_query = overdue_query.filter(due_date__gte=today - timedelta(days=7))
-    elif request.user.overdue_range == '30days':
-        overdue_query = overdue_query.filter(due_date__gte=today - timedelta(days=30))
-    # 'all' no aplica filtro adicional
+    # Grupos con estadísticas individuales: todos en modo unificado, el activo en modo separado
+    if multigroup_mode == 'unified':
+        stats_memberships = user_groups
+    else:
+        stats_memberships = [
+            membership for membership in user_groups
+            if membership.group_id == request.user.last_active_group_id
+        ]
+    
+    # Contadores por grupo: una lectura de TaskCounter (mantenido de forma incremental)
+    from apps.tasks.counters import COUNTER_RANGE_FIELDS, get_user_task_counters
+    counter_rows = get_user_task_counters(
+        request.user,
+        set(user_group_ids) | {membership.group_id for membership in stats_memberships},
+    )
     
-    overdue_tasks_count = overdue_query.count()
+    # Campo de TaskCounter para cada rango elegido (None si el rango no tiene contador)
+    range_fields = {
+        'pending': COUNTER_RANGE_FIELDS.get(('pending', request.user.pending_range)),
+        'completed': COUNTER_RANGE_FIELDS.get(('completed', request.user.completed_range)),
+        'overdue': COUNTER_RANGE_FIELDS.get(('overdue', request.user.overdue_range)),
+    }
+    if all(range_fields.values()):
+        # Todo (incluidos los rangos por defecto) sale directo de los contadores
+        selected_counters = [
+            {name: getattr(c, field) for name, field in range_fields.items()}
+            for group_id, c in counter_rows.items() if group_id in user_group_ids
+        ]
+    else:
+        # Otros rangos: consulta agregada de los grupos seleccionados
+        selected_counters = get_group_task_counters(
+            request.user,
+            user_group_ids,
+            pending_range=get_date_range(request.user.pending_range),
+            completed_range=get_date_range(request.user.completed_range),
+            overdue_since=overdue_since,
+            today=today,
+        ).values()
+    pending_tasks_count = sum(c['pending'] for c in selected_counters)
+    completed_tasks_count = sum(c['completed'] for c in selected_counters)
+    overdue_tasks_count = sum(c['overdue'] for c in selected_counters)
     
     # Próximas tareas (próximos 7 días, pendientes para el usuario)
     upcoming_tasks = Task.objects.filter(
         group_id__in=user_group_ids,
-        due_date__gte=timezone.now().date(),
-        due_date__lte=timezone.now().date() + timedelta(days=7)
+        due_date__gte=today,
+        due_date__lte=today + timedelta(days=7)
     ).exclude(
         Exists(TaskCompletion.objects.filter(task=OuterRef('pk'), user=request.user, completed=True))
     ).select_related('subject', 'group', 'created_by').annotate(
@@ -166,40 +170,16 @@ def dashboard(request):
     
     # Estadísticas por grupo (basadas en el estado personal del usuario)
     group_stats = []
-    if multigroup_mode == 'unified':
-        # En modo unificado, mostrar estadísticas de todos los grupos
-        for membership in user_groups:
-            group = membership.group
-            group_pending = Task.objects.filter(group=group).exclude(
-                Exists(TaskCompletion.objects.filter(task=OuterRef('pk'), user=request.user, completed=True))
-            ).count()
-            group_completed = Task.objects.filter(group=group).filter(
-                Exists(TaskCompletion.objects.filter(task=OuterRef('pk'), user=request.user, completed=True))
-            ).count()
-            group_stats.append({
-                'group': group,
-                'pending': group_pending,
-                'completed': group_completed,
-                'total': group_pending + group_completed
-            })
-    else:
-        # En modo separado, mostrar solo el grupo activo
-        if request.user.last_active_group_id:
-            active_membership = user_groups.filter(group_id=request.user.last_active_group_id).first()
-            if active_membership:
-                group = active_membership.group
-                group_pending = Task.objects.filter(group=group).exclude(
-                    Exists(TaskCompletion.objects.filter(task=OuterRef('pk'), user=request.user, completed=True))
-                ).count()
-                group_completed = Task.objects.filter(group=group).filter(
-                    Exists(TaskCompletion.objects.filter(task=OuterRef('pk'), user=request.user, completed=True))
-                ).count()
-                group_stats.append({
-                    'group': group,
-                    'pending': group_pending,
-                    'completed': group_completed,
-                    'total': group_pending + group_completed
-                })
+    for membership in stats_memberships:
+        group_counter = counter_rows.get(membership.group_id)
+        group_pending = group_counter.pending if group_counter else 0
+        group_completed = group_counter.completed if group_counter else 0
+        group_stats.append({
+            'group': membership.group,
+            'pending': group_pending,
+            'completed': group_completed,
+            'total': group_pending + group_completed
+        })
     
     # Generar URLs con filtros según configuración del usuario
     from urllib.parse import urlencode
@@ -243,7 +223,7 @@ def dashboard(request):
     overdue_params = {'time': 'overdue'}
     
     # Determinar a dónde redirigir según configuración
-    dashboard_groups_count = dashboard_groups.count() if dashboard_groups.exists() else 0
+    dashboard_groups_count = len(dashboard_group_ids)
     
     # Lógica de redirección mejorada
     if multigroup_mode == 'separated' and dashboard_groups_count == 1:
@@ -287,7 +267,7 @@ def dashboard(request):
             completed_tasks_url = f"{reverse('group_tasks', kwargs={'group_id': group_id})}?{urlencode(completed_params)}"
             overdue_tasks_url = f"{reverse('group_tasks', kwargs={'group_id': group_id})}?{urlencode(overdue_params)}"
         elif user_groups_count == 1:
-            group_id = user_groups.first().group.id
+            group_id = user_groups[0].group_id
             pending_tasks_url = f"{reverse('group_tasks', kwargs={'group_id': group_id})}?{urlencode(pending_params)}"
             completed_tasks_url = f"{reverse('group_tasks', kwargs={'group_id': group_id})}?{urlencode(completed_params)}"
             overdue_tasks_url = f"{reverse('group_tasks', kwargs={'group_id': group_id})}?{urlencode(overdue_params)}"
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:57
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Índices creados sin bloquear escrituras en tablas grandes
+    atomic = False
+
+    dependencies = [
+        ('groups', '0005_group_document_upload_permission_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='groupactivity',
+            index=models.Index(fields=['group', '-created_at'], name='groupactivity_group_time_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='joinrequest',
+            index=models.Index(fields=['group', 'status'], name='joinrequest_group_status_idx'),
+        ),
+    ]
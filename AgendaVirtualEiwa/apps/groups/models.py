@@ -167,6 +167,9 @@ class JoinRequest(models.Model):
         verbose_name_plural = 'Solicitudes de Ingreso'
         unique_together = ['group', 'user']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['group', 'status'], name='joinrequest_group_status_idx'),
+        ]
 
 
 class BannedUser(models.Model):
@@ -236,3 +239,6 @@ class GroupActivity(models.Model):
         verbose_name = 'Actividad de Grupo'
         verbose_name_plural = 'Actividades de Grupos'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['group', '-created_at'], name='groupactivity_group_time_idx'),
+        ]
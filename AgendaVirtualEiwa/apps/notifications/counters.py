@@ -0,0 +1,111 @@
+# Contador desnormalizado de notificaciones no leídas por usuario
+#
+# El badge lee NotificationCounter.unread en lugar de contar las filas de
+# Notification. Cada cambio ajusta el contador con UPDATE ... SET
+# unread = unread + n, que es atómico frente a cambios concurrentes. Los
+# contadores se crean al leerlos por primera vez.
+#
+# version aumenta con cualquier cambio en la bandeja (nueva, resumida, leída,
+# vista o eliminada): la API arma su ETag con (version, unread) sin leer las
+# notificaciones.
+from collections import Counter
+
+from django.db.models import Count, F, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Notification, NotificationCounter
+
+
+def adjust_unread_counters(user_ids, step):
+    """
+    Suma step al contador de cada usuario (un usuario repetido suma varias veces)
+
+    Emite un UPDATE por cada cantidad distinta, así un envío masivo a un grupo
+    es un único UPDATE.
+    """
+    by_amount = {}
+    for user_id, times in Counter(user_ids).items():
+        by_amount.setdefault(times * step, []).append(user_id)
+
+    now = timezone.now()
+    for amount, ids in by_amount.items():
+        NotificationCounter.objects.filter(user_id__in=ids).update(
+            unread=F('unread') + amount, version=F('version') + 1, updated_at=now
+        )
+
+
+def touch_notification_counters(user_ids):
+    """Marca un cambio en la bandeja que no altera las no leídas (resumen, vista, borrado de leídas)"""
+    NotificationCounter.objects.filter(user_id__in=set(user_ids)).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+
+
+def compute_unread_counts(user_ids=None):
+    """Conteo real de no leídas: {user_id: unread} (solo usuarios con alguna)"""
+    notifications = Notification.objects.filter(is_read=False)
+    if user_ids is not None:
+        notifications = notifications.filter(recipient_id__in=user_ids)
+    rows = notifications.values('recipient_id').annotate(unread=Count('id')).order_by()
+    return {row['recipient_id']: row['unread'] for row in rows}
+
+
+def refresh_notification_counters(user_ids=None):
+    """
+    Recalcula y guarda los contadores indicados (por defecto todos los existentes)
+
+    Returns:
+        Número de contadores cuyo valor cambió (desviación corregida)
+    """
+    counters = NotificationCounter.objects.all()
+    if user_ids is not None:
+        counters = counters.filter(user_id__in=user_ids)
+
+    current = dict(counters.values_list('user_id', 'unread'))
+    expected = compute_unread_counts(current.keys() if user_ids is None else user_ids)
+
+    changed = {
+        user_id: expected.get(user_id, 0)
+        for user_id, unread in current.items()
+        if expected.get(user_id, 0) != unread
+    }
+    if changed:
+        NotificationCounter.objects.bulk_create(
+            [
+                NotificationCounter(user_id=user_id, unread=unread, updated_at=timezone.now())
+                for user_id, unread in changed.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['unread', 'updated_at'],
+        )
+        # La bandeja cambió (p. ej. se eliminaron particiones): invalida los ETag
+        touch_notification_counters(changed)
+    return len(changed)
+
+
+def get_notification_counter(user):
+    """(no leídas, versión) del usuario, creando su contador la primera vez"""
+    counter = NotificationCounter.objects.filter(user=user).values_list('unread', 'version').first()
+    if counter is not None:
+        return counter
+
+    # Primero la fila (en 0) y después el conteo: un ajuste concurrente ya
+    # encuentra el contador, y el UPDATE cuenta en la base de datos lo que
+    # esté confirmado en ese momento
+    _, created = NotificationCounter.objects.get_or_create(user=user, defaults={'unread': 0})
+    if created:
+        unread = (
+            Notification.objects.filter(recipient=user, is_read=False)
+            .values('recipient_id').annotate(total=Count('id')).values('total')
+        )
+        NotificationCounter.objects.filter(user=user).update(
+            unread=Coalesce(Subquery(unread), 0), updated_at=timezone.now()
+        )
+    return NotificationCounter.objects.filter(user=user).values_list('unread', 'version').get()
+
+
+def get_unread_count(user):
+    """No leídas del usuario, creando su contador la primera vez"""
+    return get_notification_counter(user)[0]
@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from apps.notifications.counters import refresh_notification_counters
+from apps.notifications.partitions import (
+    convert_to_partitioned, ensure_partitions, expire_partitions, is_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = 'Crea las particiones mensuales futuras de notificaciones y separa o elimina las vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--setup',
+            action='store_true',
+            help='Convierte la tabla de notificaciones en tabla particionada (una sola vez)',
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=settings.NOTIFICATIONS_PARTITIONS_AHEAD,
+            help='Meses de particiones a crear por adelantado',
+        )
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            default=settings.NOTIFICATIONS_RETENTION_MONTHS,
+            help='Meses a conservar; las particiones anteriores se separan (0 = conservar todo)',
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='Eliminar las particiones vencidas en lugar de solo separarlas',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        if connection.vendor != 'postgresql':
+            raise CommandError('El particionado de notificaciones requiere PostgreSQL')
+
+        created = []
+        if not is_partitioned():
+            if not options['setup']:
+                # Opcional: mientras no se active, el trabajo programado no hace nada
+                self.stdout.write(self.style.NOTICE(
+                    'La tabla de notificaciones no está particionada (usar --setup para activarlo)'
+                ))
+                return
+            created = convert_to_partitioned(months_ahead=options['months_ahead'])
+            self.stdout.write(f'  Tabla convertida con {len(created)} particiones')
+
+        created += ensure_partitions(months_ahead=options['months_ahead'])
+
+        expired = []
+        if options['retention_months'] > 0:
+            expired = expire_partitions(options['retention_months'], drop=options['drop'])
+            if expired:
+                # Las no leídas de las particiones quitadas dejan de existir para el badge
+                refresh_notification_counters()
+
+        for name in expired:
+            self.stdout.write(f"  {'Eliminada' if options['drop'] else 'Separada'}: {name}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Proceso completado en {time.monotonic() - started:.3f}s:'
+                f'\n  - {len(created)} particiones creadas'
+                f'\n  - {len(expired)} particiones vencidas'
+            )
+        )
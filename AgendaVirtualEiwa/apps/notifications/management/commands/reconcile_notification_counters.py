@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.notifications.counters import refresh_notification_counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de notificaciones no leídas y corrige las desviaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='users',
+            help='ID de usuario a reconciliar (se puede repetir; por defecto todos)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        fixed_count = refresh_notification_counters(user_ids=options['users'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Proceso completado en {time.monotonic() - started:.3f}s:'
+                f'\n  - {fixed_count} contadores corregidos'
+            )
+        )
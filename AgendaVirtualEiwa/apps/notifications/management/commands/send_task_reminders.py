@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.notifications.reminders import send_task_reminders
+
+
+class Command(BaseCommand):
+    help = 'Envía los recordatorios de tareas que vencen hoy, mañana y las vencidas (a las horas configuradas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Enviar aunque la hora actual no esté en TASK_REMINDER_HOURS',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        hour = timezone.localtime().hour
+        if not options['force'] and hour not in settings.TASK_REMINDER_HOURS:
+            self.stdout.write(self.style.NOTICE(f'Sin recordatorios programados a las {hour}:00'))
+            return
+
+        results = send_task_reminders()
+
+        for window, (reminder_count, notification_count) in results.items():
+            self.stdout.write(f'  {window}: {reminder_count} tareas en {notification_count} notificaciones')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n✓ Proceso completado en {time.monotonic() - started:.3f}s:'
+                f'\n  - {sum(r[0] for r in results.values())} recordatorios enviados'
+            )
+        )
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0006_groupactivity_groupactivity_group_time_idx_and_more'),
+        ('notifications', '0004_taskreminder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='groups.group'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='object_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
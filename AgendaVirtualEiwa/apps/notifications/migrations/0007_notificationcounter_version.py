@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_notification_coalesce_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationcounter',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -56,12 +56,27 @@ class Notification(models.Model):
     # URL de acción (opcional)
     action_url = models.CharField(max_length=500, blank=True)
     
+    # Grupo de origen y resumen (varias notificaciones del mismo tipo agrupadas en una)
+    group = models.ForeignKey(
+        'groups.Group',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='notifications'
+    )
+    count = models.PositiveIntegerField(default=1)
+    object_ids = models.JSONField(default=list, blank=True)
+    # Qué resumen puede absorber esta notificación (vacío = no se resume)
+    coalesce_key = models.CharField(max_length=50, blank=True)
+    
     # Estado
     is_read = models.BooleanField(default=False)
     is_seen = models.BooleanField(default=False)  # Visto en el dropdown
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
+    # Último cambio del contenido (p. ej. un resumen que sumó un evento)
+    updated_at = models.DateTimeField(auto_now=True)
     read_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
@@ -75,3 +90,59 @@ class Notification(models.Model):
             models.Index(fields=['recipient', '-created_at']),
             models.Index(fields=['recipient', 'is_read']),
         ]
+
+
+class NotificationCounter(models.Model):
+    """
+    Contador desnormalizado de notificaciones no leídas por usuario (para el badge)
+
+    Se ajusta con UPDATE ... SET unread = unread + n al crear, leer o eliminar
+    notificaciones. reconcile_notification_counters corrige cualquier desviación.
+    version cambia también al resumir, ver o eliminar notificaciones leídas.
+    """
+    
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notification_counter'
+    )
+    unread = models.IntegerField(default=0, verbose_name="No leídas")
+    # Aumenta con cada cambio en la bandeja (ETag de la API)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.nombre}: {self.unread} no leídas"
+    
+    class Meta:
+        verbose_name = 'Contador de Notificaciones'
+        verbose_name_plural = 'Contadores de Notificaciones'
+
+
+class TaskReminder(models.Model):
+    """
+    Recordatorio de tarea ya enviado a un usuario (para no repetirlo)
+
+    Una fila por tarea, usuario, ventana y fecha de entrega: si la fecha de
+    entrega cambia, la tarea vuelve a recordarse.
+    """
+    
+    WINDOWS = [
+        ('today', 'Vence hoy'),
+        ('tomorrow', 'Vence mañana'),
+        ('overdue', 'Vencida'),
+    ]
+    
+    task = models.ForeignKey('tasks.Task', on_delete=models.CASCADE, related_name='reminders')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='task_reminders')
+    window = models.CharField(max_length=10, choices=WINDOWS)
+    due_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.user.nombre} - {self.task.title} ({self.window})"
+    
+    class Meta:
+        verbose_name = 'Recordatorio de Tarea'
+        verbose_name_plural = 'Recordatorios de Tareas'
+        unique_together = ['task', 'user', 'window', 'due_date']
@@ -0,0 +1,197 @@
+# Particionado mensual de Notification (opcional, solo PostgreSQL)
+#
+# Con partition_notifications --setup la tabla se convierte en una tabla
+# particionada por rango de created_at, con una partición por mes y una
+# partición DEFAULT que recibe cualquier fila fuera de rango. Los índices
+# (recipient, -created_at) y (recipient, is_read) quedan definidos en la tabla
+# padre, así que PostgreSQL mantiene uno por partición y las consultas
+# recientes no tocan los meses viejos. Las particiones vencidas se separan
+# (DETACH) o se eliminan completas, sin DELETE fila por fila.
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+
+from .models import Notification
+
+
+TABLE = Notification._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_RE = re.compile(rf'^{TABLE}_p(\d{{4}})_(\d{{2}})$')
+
+
+def add_months(month, count):
+    """Primer día del mes que está count meses después de month"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def get_partition_name(month):
+    return f'{TABLE}_p{month.year}_{month.month:02d}'
+
+
+def _bound(month):
+    """Límite del rango en UTC para la columna timestamptz"""
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc).isoformat()
+
+
+def is_partitioned():
+    """La tabla de notificaciones ya es una tabla particionada"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass)',
+            [TABLE],
+        )
+        return cursor.fetchone()[0]
+
+
+def get_partitions():
+    """Particiones mensuales existentes: {primer día del mes: nombre}"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = %s::regclass',
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_partition(cursor, month):
+    """
+    Crea la partición de un mes
+
+    Las filas de ese mes que hayan caído en la partición DEFAULT se mueven a
+    la nueva antes de adjuntarla (ATTACH falla si DEFAULT tiene filas del rango).
+    """
+    name = get_partition_name(month)
+    start, end = _bound(month), _bound(add_months(month, 1))
+    cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved',
+        [start, end],
+    )
+    cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+    return name
+
+
+def ensure_partitions(months_ahead=3, today=None):
+    """
+    Crea las particiones desde el mes actual hasta months_ahead meses adelante
+
+    Returns:
+        Lista con los nombres de las particiones creadas
+    """
+    if today is None:
+        today = datetime.now(dt_timezone.utc).date()
+    current = today.replace(day=1)
+    existing = get_partitions()
+
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                created.append(create_partition(cursor, month))
+    return created
+
+
+def expire_partitions(retention_months, drop=False, today=None):
+    """
+    Separa (o elimina con drop=True) las particiones más antiguas que la retención
+
+    Una partición separada queda como tabla independiente para archivarla o
+    consultarla; ya no forma parte de Notification.
+
+    Returns:
+        Lista con los nombres de las particiones separadas o eliminadas
+    """
+    if today is None:
+        today = datetime.now(dt_timezone.utc).date()
+    cutoff = add_months(today.replace(day=1), -retention_months)
+
+    expired = [name for month, name in sorted(get_partitions().items()) if add_months(month, 1) <= cutoff]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for name in expired:
+            cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+            if drop:
+                cursor.execute(f'DROP TABLE {name}')
+    return expired
+
+
+def convert_to_partitioned(months_ahead=3, today=None):
+    """
+    Convierte la tabla de notificaciones en una tabla particionada por mes
+
+    Copia las filas existentes, conserva los nombres de índices y restricciones
+    (para que las migraciones futuras los encuentren) y mueve el id a una
+    secuencia propia. La clave primaria pasa a ser (id, created_at), como exige
+    PostgreSQL; los id siguen siendo únicos porque salen de la misma secuencia.
+
+    Returns:
+        Lista con los nombres de las particiones creadas
+    """
+    if today is None:
+        today = datetime.now(dt_timezone.utc).date()
+    legacy = f'{TABLE}_legacy'
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Las FK de Django son diferidas: verificarlas ya para poder eliminar la tabla anterior
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+
+        # Definiciones a recrear en la tabla padre (se leen antes de renombrar)
+        cursor.execute(
+            'SELECT pg_get_indexdef(indexrelid) FROM pg_index '
+            'WHERE indrelid = %s::regclass AND NOT indisprimary',
+            [TABLE],
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('f', 'c')",
+            [TABLE],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(f'SELECT min(created_at), coalesce(max(id), 0) FROM {TABLE}')
+        oldest, last_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {legacy}')
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)'
+        )
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+
+        first_month = (oldest.date() if oldest else today).replace(day=1)
+        last_month = add_months(today.replace(day=1), months_ahead)
+        created = []
+        month = first_month
+        while month <= last_month:
+            created.append(create_partition(cursor, month))
+            month = add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {legacy}')
+        # Al eliminar la tabla anterior se liberan los nombres de índices y restricciones
+        cursor.execute(f'DROP TABLE {legacy}')
+
+        sequence = f'{TABLE}_id_seq'
+        cursor.execute(f'CREATE SEQUENCE {sequence} OWNED BY {TABLE}.id')
+        cursor.execute('SELECT setval(%s, %s, %s)', [sequence, max(last_id, 1), last_id > 0])
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, created_at)')
+        for name, definition in constraints:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+        for definition in index_definitions:
+            cursor.execute(definition)
+
+    return created
@@ -0,0 +1,75 @@
+# Preferencias de notificaciones por tipo
+#
+# Cada tipo de Notification.NOTIFICATION_TYPES tiene un bit según su posición
+# en la lista (por eso los tipos nuevos se agregan siempre al final). Un bit
+# encendido en User.muted_notification_types silencia ese tipo: los envíos
+# descartan al usuario antes de insertar la fila.
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.lookups import Exact, GreaterThan
+
+from .models import Notification
+
+
+NOTIFICATION_TYPE_BITS = {
+    notification_type: 1 << index
+    for index, (notification_type, _) in enumerate(Notification.NOTIFICATION_TYPES)
+}
+
+# Avisos de moderación: siempre se envían
+UNMUTABLE_NOTIFICATION_TYPES = {'member_removed', 'member_banned', 'member_unbanned'}
+
+
+def get_type_bit(notification_type):
+    """Bit del tipo (0 si no se puede silenciar)"""
+    if notification_type in UNMUTABLE_NOTIFICATION_TYPES:
+        return 0
+    return NOTIFICATION_TYPE_BITS.get(notification_type, 0)
+
+
+def get_mutable_types():
+    """(tipo, etiqueta) de los tipos que el usuario puede silenciar"""
+    return [
+        (notification_type, label)
+        for notification_type, label in Notification.NOTIFICATION_TYPES
+        if notification_type not in UNMUTABLE_NOTIFICATION_TYPES
+    ]
+
+
+def build_muted_mask(muted_types):
+    """Máscara de bits a partir de una lista de tipos silenciados"""
+    mask = 0
+    for notification_type in muted_types:
+        mask |= get_type_bit(notification_type)
+    return mask
+
+
+def is_muted(user, notification_type):
+    """El usuario silenció este tipo"""
+    return bool(user.muted_notification_types & get_type_bit(notification_type))
+
+
+def accepts_type(notification_type, field='muted_notification_types'):
+    """
+    Condición para filter(): el usuario no silenció el tipo
+
+    field es la ruta a la máscara, p. ej. 'user__muted_notification_types'
+    desde GroupMember. Devuelve None si el tipo no se puede silenciar.
+    """
+    bit = get_type_bit(notification_type)
+    if not bit:
+        return None
+    return Exact(F(field).bitand(bit), 0)
+
+
+def get_muted_user_ids(user_ids, notification_type):
+    """IDs de la lista que silenciaron el tipo (una sola consulta)"""
+    bit = get_type_bit(notification_type)
+    if not bit or not user_ids:
+        return set()
+    return set(
+        get_user_model().objects.filter(
+            GreaterThan(F('muted_notification_types').bitand(bit), 0),
+            id__in=user_ids,
+        ).values_list('id', flat=True)
+    )
@@ -0,0 +1,155 @@
+# Notificaciones en tiempo real (Server-Sent Events)
+#
+# Cada proceso ASGI guarda los clientes SSE conectados por usuario. Al crear
+# o leer notificaciones se publica un NOTIFY de PostgreSQL con los IDs de los
+# usuarios afectados; un hilo por proceso escucha el canal (LISTEN) y despierta
+# a los clientes de esos usuarios, que consultan lo nuevo y lo envían.
+# Sin PostgreSQL (o con NOTIFICATIONS_PG_LISTEN = False) el aviso se reparte
+# solo dentro del proceso.
+import asyncio
+import json
+import select
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+
+
+CHANNEL = 'agenda_notifications'
+
+# IDs por NOTIFY (el payload de PostgreSQL tiene un límite de 8000 bytes)
+NOTIFY_CHUNK_SIZE = 500
+
+
+class NotificationBroker:
+    """Registro en memoria de las colas de los clientes SSE conectados"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, user_id):
+        """Registra un cliente y devuelve la cola donde recibirá los avisos"""
+        queue = asyncio.Queue(maxsize=1)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_ids):
+        """Despierta a los clientes de los usuarios indicados (seguro entre hilos)"""
+        with self._lock:
+            targets = [
+                subscriber
+                for user_id in user_ids
+                for subscriber in self._subscribers.get(user_id, ())
+            ]
+        for loop, queue in targets:
+            loop.call_soon_threadsafe(_wake, queue)
+
+    def has_subscribers(self, user_id):
+        with self._lock:
+            return bool(self._subscribers.get(user_id))
+
+
+def _wake(queue):
+    # Basta un aviso pendiente: el cliente consulta todo lo nuevo al despertar
+    if queue.empty():
+        queue.put_nowait(True)
+
+
+broker = NotificationBroker()
+
+_listener_lock = threading.Lock()
+_listener_thread = None
+
+
+def uses_pg_notify():
+    """LISTEN/NOTIFY solo con PostgreSQL y si está habilitado (PgBouncer en modo transacción no lo soporta)"""
+    return connection.vendor == 'postgresql' and settings.NOTIFICATIONS_PG_LISTEN
+
+
+def publish_notification_event(user_ids):
+    """
+    Avisa a los clientes conectados de los usuarios indicados
+
+    Se envía al confirmar la transacción, para que el cliente ya pueda leer
+    las filas nuevas cuando reciba el aviso.
+    """
+    user_ids = sorted({int(user_id) for user_id in user_ids})
+    if not user_ids:
+        return
+
+    def send():
+        if not uses_pg_notify():
+            broker.publish(user_ids)
+            return
+        with connection.cursor() as cursor:
+            for start in range(0, len(user_ids), NOTIFY_CHUNK_SIZE):
+                chunk = user_ids[start:start + NOTIFY_CHUNK_SIZE]
+                cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, json.dumps(chunk)])
+
+    transaction.on_commit(send)
+
+
+def ensure_listener():
+    """Inicia (una vez por proceso) el hilo que escucha el canal de PostgreSQL"""
+    global _listener_thread
+
+    if not uses_pg_notify():
+        return
+    with _listener_lock:
+        if _listener_thread and _listener_thread.is_alive():
+            return
+        _listener_thread = threading.Thread(target=listen_forever, name='notification-listener', daemon=True)
+        _listener_thread.start()
+
+
+def listen_forever(poll_timeout=60):
+    """Escucha NOTIFY en una conexión propia y reenvía los avisos al broker"""
+    while True:
+        raw_connection = None
+        try:
+            wrapper = connections.create_connection('default')
+            raw_connection = wrapper.get_new_connection(wrapper.get_connection_params())
+            raw_connection.autocommit = True
+            with raw_connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+
+            while True:
+                if select.select([raw_connection], [], [], poll_timeout) == ([], [], []):
+                    continue
+                raw_connection.poll()
+                while raw_connection.notifies:
+                    notify = raw_connection.notifies.pop(0)
+                    broker.publish(json.loads(notify.payload))
+        except Exception:
+            # Se reintenta: una caída de la base de datos no debe matar el hilo
+            traceback.print_exc()
+            time.sleep(5)
+        finally:
+            if raw_connection is not None:
+                try:
+                    raw_connection.close()
+                except Exception:
+                    pass
+
+
+def format_sse(event, data, event_id=None):
+    """Mensaje en formato text/event-stream"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
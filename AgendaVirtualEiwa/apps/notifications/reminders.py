@@ -0,0 +1,132 @@
+# Recordatorios de tareas (notificaciones task_reminder) generados en el servidor
+#
+# A las horas de settings.TASK_REMINDER_HOURS se calculan, para todos los
+# usuarios a la vez, las tareas que vencen hoy, mañana y las vencidas que aún
+# no completaron. Cada ventana es una sola consulta (tareas × miembros del
+# grupo, sin completadas ni ya recordadas); los recordatorios y las
+# notificaciones se escriben con bulk_create. TaskReminder evita repetir una
+# tarea en la misma ventana para el mismo usuario.
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Notification, TaskReminder
+from .preferences import get_type_bit
+from .utils import NOTIFICATION_BATCH_SIZE, insert_notifications
+
+
+REMINDER_MESSAGES = {
+    'today': ('Tareas para hoy', 'vence hoy', 'vencen hoy'),
+    'tomorrow': ('Tareas para mañana', 'vence mañana', 'vencen mañana'),
+    'overdue': ('Tareas vencidas', 'está vencida', 'están vencidas'),
+}
+
+
+def get_window_tasks(window, today):
+    """Tareas activas que caen en la ventana de recordatorio"""
+    from apps.tasks.models import Task
+
+    tasks = Task.objects.exclude(status='archived')
+    if window == 'today':
+        return tasks.filter(due_date=today)
+    if window == 'tomorrow':
+        return tasks.filter(due_date=today + timedelta(days=1))
+    return tasks.filter(status='overdue_recent', due_date__lt=today)
+
+
+def get_pending_reminders(window, today):
+    """
+    (user_id, task_id, título, due_date) de los recordatorios que faltan en una ventana
+
+    Una fila por tarea y miembro del grupo que no la completó, no la tiene
+    recordada para esa fecha de entrega y no silenció los recordatorios.
+    """
+    from apps.tasks.models import TaskCompletion
+
+    completed = TaskCompletion.objects.filter(
+        task_id=OuterRef('id'), user_id=OuterRef('member_id'), completed=True
+    )
+    reminded = TaskReminder.objects.filter(
+        task_id=OuterRef('id'), user_id=OuterRef('member_id'), window=window, due_date=OuterRef('due_date')
+    )
+    return (
+        get_window_tasks(window, today)
+        .annotate(
+            member_id=F('group__members__user_id'),
+            member_muted=F('group__members__user__muted_notification_types').bitand(get_type_bit('task_reminder')),
+        )
+        .filter(~Exists(completed), ~Exists(reminded), member_id__isnull=False, member_muted=0)
+        .order_by('member_id', 'due_date', 'id')
+        .values_list('member_id', 'id', 'title', 'due_date')
+    )
+
+
+def build_reminder_notification(user_id, window, tasks, content_type):
+    """Una notificación por usuario y ventana; con una sola tarea enlaza a esa tarea"""
+    title, singular, plural = REMINDER_MESSAGES[window]
+    if len(tasks) == 1:
+        task_id, task_title = tasks[0]
+        return Notification(
+            recipient_id=user_id,
+            notification_type='task_reminder',
+            title=title,
+            message=f'"{task_title}" {singular}',
+            action_url=reverse('task_detail', kwargs={'task_id': task_id}),
+            content_type=content_type,
+            object_id=task_id,
+        )
+    return Notification(
+        recipient_id=user_id,
+        notification_type='task_reminder',
+        title=title,
+        message=f'Tienes {len(tasks)} tareas que {plural}',
+        action_url=reverse('calendar'),
+    )
+
+
+def send_task_reminders(today=None, windows=None, batch_size=NOTIFICATION_BATCH_SIZE):
+    """
+    Genera los recordatorios pendientes de todas las ventanas
+
+    Args:
+        today: Fecha de referencia (por defecto hoy en la zona horaria local)
+        windows: Ventanas a procesar (por defecto today, tomorrow y overdue)
+        batch_size: Filas por INSERT
+
+    Returns:
+        Diccionario {ventana: (recordatorios, notificaciones)}
+    """
+    from apps.tasks.models import Task
+
+    if today is None:
+        today = timezone.localdate()
+    if windows is None:
+        windows = [window for window, _ in TaskReminder.WINDOWS]
+    content_type = ContentType.objects.get_for_model(Task)
+
+    results = {}
+    for window in windows:
+        # La lectura va en la misma transacción que la escritura: iterator() usa un
+        # cursor del servidor y, con el pooler de Neon (PgBouncer en modo
+        # transacción), fuera de una transacción cada FETCH puede ir a otra conexión
+        with transaction.atomic():
+            reminders = []
+            tasks_by_user = defaultdict(list)
+            for user_id, task_id, title, due_date in get_pending_reminders(window, today).iterator(chunk_size=2000):
+                reminders.append(TaskReminder(task_id=task_id, user_id=user_id, window=window, due_date=due_date))
+                tasks_by_user[user_id].append((task_id, title))
+
+            notifications = [
+                build_reminder_notification(user_id, window, tasks, content_type)
+                for user_id, tasks in tasks_by_user.items()
+            ]
+            # ignore_conflicts: si dos procesos coinciden, la restricción única evita el duplicado
+            TaskReminder.objects.bulk_create(reminders, batch_size=batch_size, ignore_conflicts=True)
+            insert_notifications(notifications, batch_size=batch_size)
+        results[window] = (len(reminders), len(notifications))
+    return results
@@ -1,3 +1,570 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.groups.models import Group, GroupMember
+from apps.subjects.models import Subject
+from apps.tasks.models import Task, TaskCompletion
+from apps.notifications.counters import get_unread_count
+from apps.notifications.models import Notification, NotificationCounter, TaskReminder
+from apps.notifications.preferences import build_muted_mask, get_mutable_types
+from apps.notifications.partitions import DEFAULT_PARTITION, add_months, get_partitions
+from apps.notifications.realtime import broker
+from apps.notifications.reminders import send_task_reminders
+from apps.notifications.utils import (
+    create_notification, create_notifications_bulk, notify_group_leaders, notify_group_members,
+)
+from apps.notifications.views import NOTIFICATIONS_API_LIMIT
+
+
+class BulkNotificationTests(TestCase):
+    """El envío a un grupo usa un número fijo de consultas y respeta las exclusiones"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.group = Group.objects.create(name='Grupo avisos')
+        cls.users = []
+        for i in range(30):
+            user = User.objects.create_user(
+                username=f'miembro{i}', email=f'miembro{i}@example.com', password='clave-segura-123',
+                nombre=f'Miembro {i}', apellido='Test'
+            )
+            GroupMember.objects.create(group=cls.group, user=user, role='leader' if i < 2 else 'member')
+            cls.users.append(user)
+
+    def test_notify_group_members_excludes_and_batches(self):
+        author, requester = self.users[0], self.users[5]
+
+        with CaptureQueriesContext(connection) as ctx:
+            notify_group_members(
+                self.group, 'general', 'Nueva tarea', 'Hay una tarea nueva',
+                sender=author, exclude=[author, requester.id],
+            )
+
+        # Miembros, INSERT masivo y UPDATE de los contadores de no leídas
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+        recipients = set(Notification.objects.values_list('recipient_id', flat=True))
+        self.assertEqual(len(recipients), 28)
+        self.assertNotIn(author.id, recipients)
+        self.assertNotIn(requester.id, recipients)
+
+    def test_notify_group_leaders_sets_group_as_content_object(self):
+        notify_group_leaders(self.group, 'join_request', 'Solicitud', 'Alguien quiere unirse')
+
+        notifications = Notification.objects.all()
+        self.assertEqual({n.recipient_id for n in notifications}, {self.users[0].id, self.users[1].id})
+        self.assertTrue(all(n.content_object == self.group for n in notifications))
+
+
+@override_settings(NOTIFICATIONS_PG_LISTEN=False)
+class NotificationStreamTests(TestCase):
+    """El stream SSE envía las notificaciones nuevas y el conteo de no leídas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(
+            username='oyente', email='oyente@example.com', password='clave-segura-123',
+            nombre='Olga', apellido='Rios'
+        )
+
+    @staticmethod
+    def _parse(chunk):
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode()
+        fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines() if not line.startswith(':'))
+        return fields.get('event'), json.loads(fields['data']) if 'data' in fields else None
+
+    async def test_stream_pushes_new_notifications(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('notification_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        self.assertEqual(self._parse(await anext(stream)), ('unread', {'unread_count': 0, 'last_id': 0}))
+
+        notification = await sync_to_async(create_notification)(self.user, 'general', 'Hola', 'Mensaje')
+        # En tests la transacción no se confirma, así que el aviso se publica directamente
+        broker.publish([self.user.id])
+
+        event, data = self._parse(await anext(stream))
+        self.assertEqual((event, data['id'], data['title']), ('notification', notification.id, 'Hola'))
+        event, data = self._parse(await anext(stream))
+        self.assertEqual((event, data['unread_count']), ('unread', 1))
+        await stream.aclose()
+
+    async def test_stream_sends_updated_digests(self):
+        group = await Group.objects.acreate(name='Grupo stream')
+        await GroupMember.objects.acreate(group=group, user=self.user, role='member')
+
+        def notify():
+            notify_group_members(group, 'general', 'Aviso', 'Mensaje', coalesce=True, digest_message='{count} avisos')
+
+        await sync_to_async(notify)()
+        await self.async_client.aforce_login(self.user)
+        # Reconexión desde antes del aviso: llega como notificación nueva
+        response = await self.async_client.get(reverse('notification_stream'), {'last_id': 0})
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+        event, data = self._parse(await anext(stream))
+        self.assertEqual((event, data['count']), ('notification', 1))
+        await anext(stream)  # unread
+
+        await sync_to_async(notify)()
+        broker.publish([self.user.id])
+
+        event, data = self._parse(await anext(stream))
+        self.assertEqual((event, data['count'], data['message']), ('update', 2, '2 avisos'))
+        await stream.aclose()
+
+    def test_stream_is_unavailable_under_wsgi(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('notification_stream'))
+        self.assertEqual(response.status_code, 503)
+
+
+class NotificationApiTests(TestCase):
+    """La API devuelve deltas con el cursor since y 304 si nada cambió"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(
+            username='lectora', email='lectora@example.com', password='clave-segura-123',
+            nombre='Eva', apellido='Luna'
+        )
+        cls.senders = [
+            User.objects.create_user(
+                username=f'remitente{n}', email=f'remitente{n}@example.com', password='clave-segura-123',
+                nombre=f'Remitente{n}', apellido='Soto'
+            )
+            for n in range(5)
+        ]
+        for sender in cls.senders:
+            create_notification(cls.user, 'general', 'Aviso', 'Mensaje', sender=sender)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('get_notifications')
+
+    def test_sender_names_come_from_the_same_query(self):
+        self.client.get(self.url)  # Sesión y usuario ya cargados
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+
+        data = response.json()
+        self.assertEqual(len(data['notifications']), 5)
+        self.assertEqual(data['notifications'][0]['sender']['nombre'], 'Remitente4')
+        self.assertEqual(data['unread_count'], 5)
+        notification_queries = [q for q in ctx.captured_queries if '"notifications_notification"' in q['sql']]
+        self.assertEqual(len(notification_queries), 1)
+
+    def test_unchanged_inbox_returns_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        # El 304 solo lee el contador del usuario, no las notificaciones
+        self.assertFalse([q for q in ctx.captured_queries if '"notifications_notification"' in q['sql']])
+
+        self.client.post(reverse('mark_all_seen'))
+        seen = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(seen.status_code, 200)
+        self.assertNotEqual(seen['ETag'], etag)
+
+        notification = Notification.objects.filter(recipient=self.user).first()
+        self.client.post(reverse('delete_notification', args=[notification.id]))
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=seen['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], seen['ETag'])
+
+    def test_since_cursor_returns_only_new_notifications(self):
+        cursor = self.client.get(self.url).json()['cursor']
+
+        self.assertEqual(self.client.get(self.url, {'since': cursor}).json()['notifications'], [])
+
+        new = create_notification(self.user, 'general', 'Nuevo', 'Mensaje')
+        data = self.client.get(self.url, {'since': cursor}).json()
+        self.assertEqual([n['id'] for n in data['notifications']], [new.id])
+        self.assertEqual(data['cursor'], new.id)
+
+        by_date = self.client.get(self.url, {'since': Notification.objects.get(id=cursor).created_at.isoformat()})
+        self.assertEqual([n['id'] for n in by_date.json()['notifications']], [new.id])
+        self.assertEqual(self.client.get(self.url, {'since': 'ayer'}).status_code, 400)
+
+    def test_since_delta_pages_in_arrival_order(self):
+        cursor = self.client.get(self.url).json()['cursor']
+        burst = [create_notification(self.user, 'general', f'Aviso {n}', 'Mensaje').id for n in range(NOTIFICATIONS_API_LIMIT + 5)]
+
+        received = []
+        while True:
+            data = self.client.get(self.url, {'since': cursor}).json()
+            received += [n['id'] for n in data['notifications']]
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+
+        self.assertEqual(received, burst)
+        self.assertEqual(cursor, burst[-1])
+
+
+class UnreadCounterTests(TestCase):
+    """El contador de no leídas sigue a las notificaciones sin recontarlas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(
+            username='badge', email='badge@example.com', password='clave-segura-123',
+            nombre='Ana', apellido='Cruz'
+        )
+        cls.group = Group.objects.create(name='Grupo badge')
+        GroupMember.objects.create(group=cls.group, user=cls.user, role='member')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _unread(self):
+        return NotificationCounter.objects.get(user=self.user).unread
+
+    def _real_unread(self):
+        return Notification.objects.filter(recipient=self.user, is_read=False).count()
+
+    def test_counter_follows_every_change(self):
+        create_notification(self.user, 'general', 'Previa', 'Mensaje')
+        self.assertEqual(get_unread_count(self.user), 1)
+
+        first = create_notification(self.user, 'general', 'Uno', 'Mensaje')
+        second = create_notification(self.user, 'general', 'Dos', 'Mensaje')
+        notify_group_members(self.group, 'general', 'Grupo', 'Mensaje')
+        self.assertEqual(self._unread(), 4)
+
+        self.client.post(reverse('mark_notification_read', args=[first.id]))
+        self.client.post(reverse('mark_notification_read', args=[first.id]))
+        self.assertEqual(self._unread(), 3)
+
+        self.client.post(reverse('delete_notification', args=[first.id]))
+        self.client.post(reverse('delete_notification', args=[second.id]))
+        self.assertEqual(self._unread(), 2)
+
+        self.client.post(reverse('mark_all_read'))
+        self.assertEqual(self._unread(), self._real_unread())
+        self.assertEqual(self.client.get(reverse('get_notifications')).json()['unread_count'], 0)
+
+    def test_notification_during_counter_creation_is_counted_once(self):
+        create_notification(self.user, 'general', 'Previa', 'Mensaje')
+        get_or_create = NotificationCounter.objects.get_or_create
+
+        def concurrent_insert(**kwargs):
+            # Otra petición crea una notificación justo después de que existe el contador
+            result = get_or_create(**kwargs)
+            create_notification(self.user, 'general', 'Concurrente', 'Mensaje')
+            return result
+
+        with mock.patch.object(NotificationCounter.objects, 'get_or_create', side_effect=concurrent_insert):
+            self.assertEqual(get_unread_count(self.user), 2)
+
+        create_notification(self.user, 'general', 'Otra', 'Mensaje')
+        self.assertEqual(self._unread(), self._real_unread())
+
+    def test_reconcile_command_repairs_drift(self):
+        create_notification(self.user, 'general', 'Uno', 'Mensaje')
+        get_unread_count(self.user)
+        NotificationCounter.objects.filter(user=self.user).update(unread=17)
+
+        call_command('reconcile_notification_counters', stdout=StringIO())
+
+        self.assertEqual(self._unread(), 1)
+
+
+@skipUnlessDBFeature('supports_partial_indexes')
+class NotificationPartitionTests(TestCase):
+    """La conversión a tabla particionada conserva datos, índices y comportamiento"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(
+            username='archivo', email='archivo@example.com', password='clave-segura-123',
+            nombre='Irma', apellido='Paz'
+        )
+        cls.old = create_notification(cls.user, 'general', 'Vieja', 'Mensaje')
+        Notification.objects.filter(id=cls.old.id).update(created_at=timezone.now() - timedelta(days=400))
+        cls.recent = create_notification(cls.user, 'general', 'Reciente', 'Mensaje')
+
+    def _partition_indexes(self, partition):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT indexdef FROM pg_indexes WHERE tablename = %s', [partition])
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_setup_partitions_table_and_expires_old_months(self):
+        call_command('partition_notifications', '--setup', '--months-ahead=2', stdout=StringIO())
+
+        partitions = get_partitions()
+        this_month = timezone.now().date().replace(day=1)
+        self.assertIn(add_months(this_month, 2), partitions)
+        self.assertEqual(Notification.objects.count(), 2)
+        current = partitions[this_month]
+        self.assertTrue(any('recipient_id, created_at DESC' in d for d in self._partition_indexes(current)))
+        self.assertTrue(any('recipient_id, is_read' in d for d in self._partition_indexes(current)))
+
+        # Inserciones, lecturas y fuera de rango siguen funcionando
+        new = create_notification(self.user, 'general', 'Nueva', 'Mensaje')
+        self.assertGreater(new.id, self.recent.id)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('get_notifications')).json()['unread_count'], 3)
+        future = create_notification(self.user, 'general', 'Futura', 'Mensaje')
+        Notification.objects.filter(id=future.id).update(created_at=timezone.now() + timedelta(days=150))
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {DEFAULT_PARTITION}')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        call_command('partition_notifications', '--months-ahead=6', '--retention-months=6', '--drop',
+                     stdout=StringIO())
+
+        self.assertFalse(Notification.objects.filter(id=self.old.id).exists())
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {DEFAULT_PARTITION}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertTrue(Notification.objects.filter(id=future.id).exists())
+        self.assertEqual(NotificationCounter.objects.get(user=self.user).unread, 3)
+
+    def test_scheduled_run_is_a_no_op_until_setup(self):
+        output = StringIO()
+        call_command('partition_notifications', stdout=output)
+
+        self.assertIn('no está particionada', output.getvalue())
+        self.assertEqual(get_partitions(), {})
+
+
+class TaskReminderTests(TestCase):
+    """Los recordatorios se calculan por conjuntos y no se repiten"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [
+            User.objects.create_user(
+                username=f'alumno{i}', email=f'alumno{i}@example.com', password='clave-segura-123',
+                nombre=f'Alumno{i}', apellido='Diaz'
+            )
+            for i in range(3)
+        ]
+        cls.group = Group.objects.create(name='Grupo recordatorios')
+        for user in cls.users:
+            GroupMember.objects.create(group=cls.group, user=user, role='member')
+        subject = Subject.objects.create(group=cls.group, name='Historia', created_by=cls.users[0])
+        cls.today = timezone.localdate()
+
+        def task(days, status='pending'):
+            due = cls.today + timedelta(days=days)
+            return Task.objects.create(
+                group=cls.group, subject=subject, title=f'Tarea {days}', created_by=cls.users[0],
+                assigned_date=due - timedelta(days=7), due_date=due, status=status,
+            )
+
+        cls.due_today = [task(0), task(0)]
+        cls.due_tomorrow = task(1)
+        cls.overdue = task(-2, status='overdue_recent')
+        task(5)
+        task(-60, status='archived')
+        TaskCompletion.objects.create(task=cls.due_tomorrow, user=cls.users[0], completed=True)
+
+    def test_reminders_are_set_based_and_deduplicated(self):
+        with CaptureQueriesContext(connection) as ctx:
+            results = send_task_reminders(today=self.today)
+
+        self.assertEqual(results, {'today': (6, 3), 'tomorrow': (2, 2), 'overdue': (3, 3)})
+        # Por ventana, sin importar cuántos usuarios: candidatos, savepoint, INSERT de
+        # recordatorios, INSERT de notificaciones y UPDATE de contadores
+        self.assertLessEqual(len(ctx.captured_queries), 18)
+        self.assertFalse(TaskReminder.objects.filter(task=self.due_tomorrow, user=self.users[0]).exists())
+
+        notification = Notification.objects.get(recipient=self.users[1], title='Tareas para mañana')
+        self.assertEqual(notification.notification_type, 'task_reminder')
+        self.assertEqual(notification.content_object, self.due_tomorrow)
+        summary = Notification.objects.get(recipient=self.users[1], title='Tareas para hoy')
+        self.assertEqual(summary.message, 'Tienes 2 tareas que vencen hoy')
+
+        again = send_task_reminders(today=self.today)
+        self.assertEqual(again, {'today': (0, 0), 'tomorrow': (0, 0), 'overdue': (0, 0)})
+        self.assertEqual(Notification.objects.count(), 8)
+
+    def test_moved_due_date_is_reminded_again(self):
+        send_task_reminders(today=self.today, windows=['tomorrow'])
+        Task.objects.filter(id=self.due_tomorrow.id).update(due_date=self.today + timedelta(days=2))
+
+        results = send_task_reminders(today=self.today + timedelta(days=1), windows=['tomorrow'])
+
+        self.assertEqual(results['tomorrow'], (2, 2))
+
+
+class NotificationDigestTests(TestCase):
+    """Las notificaciones repetidas del mismo tipo y grupo se resumen en una fila"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.leader = User.objects.create_user(
+            username='lider_resumen', email='lider_resumen@example.com', password='clave-segura-123',
+            nombre='Raul', apellido='Vera'
+        )
+        cls.members = [
+            User.objects.create_user(
+                username=f'resumen{i}', email=f'resumen{i}@example.com', password='clave-segura-123',
+                nombre=f'Resumen{i}', apellido='Vera'
+            )
+            for i in range(3)
+        ]
+        cls.group = Group.objects.create(name='Grupo resumen')
+        GroupMember.objects.create(group=cls.group, user=cls.leader, role='leader')
+        for member in cls.members:
+            GroupMember.objects.create(group=cls.group, user=member, role='member')
+        cls.subject = Subject.objects.create(group=cls.group, name='Ingles', created_by=cls.leader)
+
+    def test_bulk_task_entry_produces_one_digest_per_member(self):
+        self.client.force_login(self.leader)
+        due = timezone.localdate() + timedelta(days=3)
+        for title in ('Lectura', 'Ensayo', 'Vocabulario'):
+            self.client.post(reverse('create_task', args=[self.group.id]), {
+                'subject': self.subject.id, 'title': title, 'description': '', 'priority': 'medium',
+                'assigned_date': timezone.localdate().isoformat(), 'due_date': due.isoformat(),
+            })
+        task_ids = list(Task.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(len(task_ids), 3)
+
+        notifications = Notification.objects.filter(title='Nueva tarea')
+        self.assertEqual(notifications.count(), len(self.members))
+        digest = notifications.get(recipient=self.members[0])
+        self.assertEqual((digest.count, digest.object_ids), (3, task_ids))
+        self.assertEqual(digest.message, 'Raul agregó 3 tareas')
+        self.assertEqual(get_unread_count(self.members[0]), 1)
+
+    def test_read_or_expired_notifications_are_not_merged(self):
+        def notify():
+            notify_group_members(self.group, 'general', 'Aviso', 'Mensaje', coalesce=True)
+
+        notify()
+        Notification.objects.filter(recipient=self.members[0]).update(is_read=True)
+        Notification.objects.filter(recipient=self.members[1]).update(
+            created_at=timezone.now() - timedelta(days=1)
+        )
+        notify()
+
+        self.assertEqual(Notification.objects.filter(recipient=self.members[0]).count(), 2)
+        self.assertEqual(Notification.objects.filter(recipient=self.members[1]).count(), 2)
+        self.assertEqual(Notification.objects.get(recipient=self.members[2]).count, 2)
+
+    def test_poller_receives_updated_digests(self):
+        def notify():
+            notify_group_members(
+                self.group, 'general', 'Nueva tarea', 'Mensaje', sender=self.leader, exclude=[self.leader],
+                coalesce=True, digest_message='Raul agregó {count} tareas',
+            )
+
+        notify()
+        self.client.force_login(self.members[0])
+        url = reverse('get_notifications')
+        first = self.client.get(url).json()
+
+        notify()
+        data = self.client.get(url, {'since': first['cursor'], 'updated_since': first['updated_cursor']}).json()
+
+        self.assertEqual(data['notifications'], [])
+        self.assertEqual([(n['id'], n['count']) for n in data['updated']], [(first['notifications'][0]['id'], 2)])
+        self.assertEqual(data['updated'][0]['message'], 'Raul agregó 2 tareas')
+
+        again = self.client.get(url, {'since': data['cursor'], 'updated_since': data['updated_cursor']}).json()
+        self.assertEqual(again['updated'], [])
+
+    def test_digests_from_other_senders_or_keys_are_kept_apart(self):
+        other_leader = self.members[2]
+
+        def notify(sender, key, digest):
+            notify_group_members(
+                self.group, 'general', 'Nueva tarea', 'Mensaje', sender=sender, exclude=[sender],
+                coalesce=True, coalesce_key=key, digest_message=digest,
+            )
+
+        notify(self.leader, 'task_created', 'Raul agregó {count} tareas')
+        notify(other_leader, 'task_created', 'Resumen2 agregó {count} tareas')
+        notify(self.leader, 'task_request_approved', '{count} tareas nuevas')
+        notify(self.leader, 'task_created', 'Raul agregó {count} tareas')
+
+        inbox = Notification.objects.filter(recipient=self.members[0])
+        self.assertEqual(inbox.count(), 3)
+        digest = inbox.get(sender=self.leader, coalesce_key='task_created')
+        self.assertEqual((digest.count, digest.message), (2, 'Raul agregó 2 tareas'))
+        self.assertEqual(inbox.get(sender=other_leader).count, 1)
+
+
+class NotificationPreferenceTests(TestCase):
+    """Los tipos silenciados no se escriben"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [
+            User.objects.create_user(
+                username=f'pref{i}', email=f'pref{i}@example.com', password='clave-segura-123',
+                nombre=f'Pref{i}', apellido='Leon'
+            )
+            for i in range(4)
+        ]
+        cls.group = Group.objects.create(name='Grupo preferencias')
+        for user in cls.users:
+            GroupMember.objects.create(group=cls.group, user=user, role='member')
+        cls.muted = cls.users[0]
+
+    def setUp(self):
+        self.client.force_login(self.muted)
+        enabled = [t for t, _ in get_mutable_types() if t not in ('general', 'task_reminder')]
+        self.client.post(reverse('update_preferences'), {
+            'form_type': 'notification_types', 'notification_types': enabled,
+        })
+        self.muted.refresh_from_db()
+
+    def test_settings_page_stores_a_bitmask(self):
+        self.assertEqual(self.muted.muted_notification_types, build_muted_mask(['general', 'task_reminder']))
+        response = self.client.get(reverse('notifications_settings'))
+        enabled = {t['value'] for t in response.context['notification_types'] if t['enabled']}
+        self.assertNotIn('general', enabled)
+        self.assertIn('join_request', enabled)
+
+    def test_fan_out_skips_muted_recipients(self):
+        with CaptureQueriesContext(connection) as ctx:
+            notify_group_members(self.group, 'general', 'Aviso', 'Mensaje')
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+        recipients = set(Notification.objects.values_list('recipient_id', flat=True))
+        self.assertEqual(recipients, {u.id for u in self.users[1:]})
+        self.assertIsNone(create_notification(self.muted, 'general', 'Hola', 'Mensaje'))
+        create_notifications_bulk([self.muted.id], 'member_removed', 'Expulsado', 'Mensaje')
+        self.assertTrue(Notification.objects.filter(recipient=self.muted, notification_type='member_removed').exists())
+
+    def test_reminders_skip_muted_recipients(self):
+        subject = Subject.objects.create(group=self.group, name='Arte', created_by=self.muted)
+        today = timezone.localdate()
+        Task.objects.create(
+            group=self.group, subject=subject, title='Arte', created_by=self.muted,
+            assigned_date=today, due_date=today,
+        )
+
+        results = send_task_reminders(today=today, windows=['today'])
+
+        self.assertEqual(results['today'], (3, 3))
+        self.assertFalse(Notification.objects.filter(recipient=self.muted).exists())
@@ -5,6 +5,7 @@ urlpatterns = [
     path('test/', views.test_notifications, name='test_notifications'),
     path('mobile-test/', views.mobile_test, name='mobile_test'),
     path('api/get/', views.get_notifications, name='get_notifications'),
+    path('api/stream/', views.notification_stream, name='notification_stream'),
     path('api/pending/', views.get_pending_tasks, name='get_pending_tasks'),
     path('api/<int:notification_id>/read/', views.mark_as_read, name='mark_notification_read'),
     path('api/<int:notification_id>/seen/', views.mark_as_seen, name='mark_notification_seen'),
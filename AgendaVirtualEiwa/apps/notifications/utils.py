@@ -1,4 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import CharField, F, JSONField, Value
+from django.db.models.expressions import CombinedExpression
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+
+from .counters import adjust_unread_counters, touch_notification_counters
 from .models import Notification
+from .preferences import accepts_type, get_muted_user_ids, is_muted
+from .realtime import publish_notification_event
+
+
+# Filas por INSERT en los envíos masivos
+NOTIFICATION_BATCH_SIZE = 500
 
 
 def create_notification(recipient, notification_type, title, message, sender=None, action_url='', content_object=None):
@@ -13,7 +29,13 @@ def create_notification(recipient, notification_type, title, message, sender=Non
         sender: Usuario que genera la notificación (opcional)
         action_url: URL de acción (opcional)
         content_object: Objeto relacionado (opcional)
+    
+    Returns:
+        La notificación creada, o None si el usuario silenció ese tipo
     """
+    if is_muted(recipient, notification_type):
+        return None
+    
     notification = Notification.objects.create(
         recipient=recipient,
         sender=sender,
@@ -23,29 +45,255 @@ def create_notification(recipient, notification_type, title, message, sender=Non
         action_url=action_url,
         content_object=content_object
     )
+    adjust_unread_counters([notification.recipient_id], 1)
+    publish_notification_event([notification.recipient_id])
     return notification
 
 
-def notify_group_leaders(group, notification_type, title, message, sender=None, action_url=''):
-    """Notificar a todos los líderes de un grupo"""
-    from apps.groups.models import GroupMember
+# Columnas que necesita la API; el nombre del remitente sale del mismo JOIN
+NOTIFICATION_API_FIELDS = (
+    'id', 'notification_type', 'title', 'message', 'action_url', 'is_read', 'is_seen',
+    'created_at', 'updated_at', 'sender_id', 'sender__nombre', 'sender__apellido', 'count', 'object_ids',
+)
+
+
+def get_notification_rows(notifications):
+    """Proyección de un queryset de notificaciones con solo los campos de la API"""
+    return notifications.values(*NOTIFICATION_API_FIELDS)
+
+
+def serialize_notification(row):
+    """Representación JSON de una notificación (API y stream) a partir de get_notification_rows"""
+    return {
+        'id': row['id'],
+        'type': row['notification_type'],
+        'title': row['title'],
+        'message': row['message'],
+        'action_url': row['action_url'],
+        'is_read': row['is_read'],
+        'is_seen': row['is_seen'],
+        'created_at': row['created_at'].isoformat(),
+        'updated_at': row['updated_at'].isoformat(),
+        'count': row['count'],
+        'object_ids': row['object_ids'],
+        'sender': {
+            'nombre': row['sender__nombre'],
+            'apellido': row['sender__apellido'],
+        } if row['sender_id'] else None
+    }
+
+
+def _get_user_id(user):
+    """Acepta un usuario o directamente su ID"""
+    return getattr(user, 'pk', user)
+
+
+def coalesce_notifications(recipient_ids, notification_type, coalesce_key, group, sender=None,
+                           object_id=None, digest_message=None, digest_url=None, window=None):
+    """
+    Suma un evento a las notificaciones recientes equivalentes en lugar de crear filas nuevas
+
+    Una notificación es equivalente si es del mismo destinatario, tipo, grupo,
+    remitente y clave de resumen, no se ha leído y se creó (o se resumió por
+    última vez) dentro de la ventana. Se actualizan todas con un único UPDATE:
+    count + 1, el ID del objeto al final de object_ids, fecha actual (también
+    en updated_at, que siguen el stream y la API para reenviar el resumen) y
+    de nuevo sin ver.
+
+    Args:
+        recipient_ids: IDs de los destinatarios candidatos
+        coalesce_key: Clave del resumen (resúmenes distintos no se mezclan aunque compartan título)
+        digest_message: Mensaje del resumen con {count}, p. ej. 'Ana agregó {count} tareas'
+        digest_url: URL de acción del resumen (por defecto se conserva la original)
+        window: Segundos de la ventana (por defecto NOTIFICATION_COALESCE_WINDOW)
+
+    Returns:
+        Conjunto de IDs de destinatarios cuya notificación se resumió
+    """
+    if window is None:
+        window = settings.NOTIFICATION_COALESCE_WINDOW
+    now = timezone.now()
+
+    # La más reciente de cada destinatario
+    targets = dict(
+        Notification.objects.filter(
+            recipient_id__in=recipient_ids,
+            notification_type=notification_type,
+            coalesce_key=coalesce_key,
+            group=group,
+            sender_id=_get_user_id(sender),
+            is_read=False,
+            created_at__gte=now - timedelta(seconds=window),
+        ).order_by('recipient_id', '-created_at').distinct('recipient_id').values_list('id', 'recipient_id')
+    )
+    if not targets:
+        return set()
+
+    updates = {
+        'count': F('count') + 1,
+        'created_at': now,
+        'updated_at': now,
+        'is_seen': False,
+    }
+    if object_id is not None:
+        # jsonb || jsonb: agrega el ID al final de la lista
+        updates['object_ids'] = CombinedExpression(
+            F('object_ids'), '||', Value([object_id], output_field=JSONField()), output_field=JSONField()
+        )
+    if digest_message:
+        prefix, _, suffix = digest_message.partition('{count}')
+        updates['message'] = Concat(Value(prefix), Cast(F('count') + 1, CharField()), Value(suffix))
+    if digest_url:
+        updates['action_url'] = digest_url
+
+    Notification.objects.filter(id__in=targets).update(**updates)
+    recipient_ids = set(targets.values())
+    touch_notification_counters(recipient_ids)
+    publish_notification_event(recipient_ids)
+    return recipient_ids
+
+
+def create_notifications_bulk(recipients, notification_type, title, message, sender=None,
+                              action_url='', content_object=None, exclude=None, group=None,
+                              coalesce=False, coalesce_key=None, digest_message=None, digest_url=None,
+                              skip_muted=True, batch_size=NOTIFICATION_BATCH_SIZE):
+    """
+    Crea la misma notificación para varios destinatarios con bulk_create
     
-    leaders = GroupMember.objects.filter(
-        group=group,
-        role='leader'
-    ).select_related('user')
+    Arma todas las filas en memoria y las inserta en lotes de batch_size,
+    en lugar de un INSERT (y una búsqueda de ContentType) por destinatario.
+    Con coalesce=True, a quien ya tenga una notificación equivalente reciente
+    se le suma el evento a esa fila (ver coalesce_notifications).
+    
+    Args:
+        recipients: Usuarios o IDs de usuario que reciben la notificación
+        exclude: Usuarios o IDs que no deben recibirla (p. ej. quien hizo la acción)
+        group: Grupo de origen (necesario para resumir)
+        coalesce: Resumir en notificaciones recientes del mismo tipo, grupo y remitente
+        coalesce_key: Clave del resumen (por defecto el título)
+        digest_message, digest_url: Mensaje y URL cuando se resume
+        skip_muted: Descartar a quienes silenciaron el tipo (False si ya se filtraron)
+        batch_size: Filas por INSERT
+        (el resto de argumentos igual que create_notification)
+    
+    Returns:
+        Lista de notificaciones creadas (sin contar las resumidas)
+    """
+    excluded_ids = {_get_user_id(user) for user in (exclude or []) if user is not None}
+    
+    content_type = None
+    object_id = None
+    if content_object is not None:
+        content_type = ContentType.objects.get_for_model(content_object)
+        object_id = content_object.pk
     
-    notifications = []
-    for leader in leaders:
-        notification = create_notification(
-            recipient=leader.user,
+    recipient_ids = []
+    seen_ids = set()
+    for recipient in recipients:
+        recipient_id = _get_user_id(recipient)
+        if recipient_id in excluded_ids or recipient_id in seen_ids:
+            continue
+        seen_ids.add(recipient_id)
+        recipient_ids.append(recipient_id)
+    
+    if skip_muted:
+        muted_ids = get_muted_user_ids(recipient_ids, notification_type)
+        recipient_ids = [recipient_id for recipient_id in recipient_ids if recipient_id not in muted_ids]
+    
+    coalesce_key = (coalesce_key or title) if coalesce else ''
+    if coalesce and group is not None and recipient_ids:
+        coalesced_ids = coalesce_notifications(
+            recipient_ids, notification_type, coalesce_key, group, sender=sender, object_id=object_id,
+            digest_message=digest_message, digest_url=digest_url,
+        )
+        recipient_ids = [recipient_id for recipient_id in recipient_ids if recipient_id not in coalesced_ids]
+    
+    notifications = [
+        Notification(
+            recipient_id=recipient_id,
+            sender=sender,
             notification_type=notification_type,
             title=title,
             message=message,
-            sender=sender,
             action_url=action_url,
-            content_object=group
+            content_type=content_type,
+            object_id=object_id,
+            group=group,
+            object_ids=[object_id] if object_id is not None else [],
+            coalesce_key=coalesce_key,
         )
-        notifications.append(notification)
+        for recipient_id in recipient_ids
+    ]
+    
+    return insert_notifications(notifications, batch_size=batch_size)
+
+
+def insert_notifications(notifications, batch_size=NOTIFICATION_BATCH_SIZE):
+    """
+    Inserta notificaciones ya construidas con bulk_create
+
+    Actualiza los contadores de no leídas y avisa a los clientes conectados.
+    """
+    created = Notification.objects.bulk_create(notifications, batch_size=batch_size)
+    recipient_ids = [notification.recipient_id for notification in created]
+    adjust_unread_counters(recipient_ids, 1)
+    publish_notification_event(recipient_ids)
+    return created
+
+
+def notify_group_members(group, notification_type, title, message, sender=None, action_url='',
+                         content_object=None, exclude=None, roles=None, coalesce=False,
+                         coalesce_key=None, digest_message=None, digest_url=None):
+    """
+    Notificar a los miembros de un grupo con un solo envío masivo
+    
+    Args:
+        group: Grupo cuyos miembros reciben la notificación
+        exclude: Usuarios o IDs que no deben recibirla
+        roles: Limitar a ciertos roles (p. ej. ['leader']); por defecto todos
+        coalesce, coalesce_key, digest_message, digest_url: ver create_notifications_bulk
+        (el resto de argumentos igual que create_notification)
+    
+    Returns:
+        Lista de notificaciones creadas
+    """
+    from apps.groups.models import GroupMember
+    
+    members = GroupMember.objects.filter(group=group)
+    if roles:
+        members = members.filter(role__in=roles)
+    # Las preferencias se aplican en la misma consulta de miembros
+    accepts = accepts_type(notification_type, field='user__muted_notification_types')
+    if accepts is not None:
+        members = members.filter(accepts)
     
-    return notifications
+    return create_notifications_bulk(
+        members.values_list('user_id', flat=True),
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        sender=sender,
+        action_url=action_url,
+        content_object=content_object,
+        exclude=exclude,
+        group=group,
+        coalesce=coalesce,
+        coalesce_key=coalesce_key,
+        digest_message=digest_message,
+        digest_url=digest_url,
+        skip_muted=False,
+    )
+
+
+def notify_group_leaders(group, notification_type, title, message, sender=None, action_url=''):
+    """Notificar a todos los líderes de un grupo"""
+    return notify_group_members(
+        group,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        sender=sender,
+        action_url=action_url,
+        content_object=group,
+        roles=['leader'],
+    )
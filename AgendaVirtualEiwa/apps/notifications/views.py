@@ -1,45 +1,132 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.db.models import Q
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import quote_etag
 from django.views.decorators.http import require_POST
+from .counters import adjust_unread_counters, get_notification_counter, get_unread_count, touch_notification_counters
 from .models import Notification
+from .realtime import broker, ensure_listener, format_sse, publish_notification_event
+from .utils import get_notification_rows, serialize_notification
+
+
+# Segundos entre comentarios "ping" para mantener viva la conexión SSE
+STREAM_HEARTBEAT = 20
+
+# Notificaciones por respuesta de la API
+NOTIFICATIONS_API_LIMIT = 20
+
+
+def parse_moment(value):
+    """Fecha ISO de un parámetro de la API, o None si es inválida"""
+    # El '+' de la zona horaria llega como espacio si el cliente no lo codificó
+    moment = parse_datetime(value.replace(' ', '+'))
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def get_since_filter(since):
+    """Filtro del cursor since (ID de la última notificación recibida o fecha ISO), o None si es inválido"""
+    if since.isdigit():
+        return Q(id__gt=int(since))
+    moment = parse_moment(since)
+    if moment is None:
+        return None
+    return Q(created_at__gt=moment)
+
+
+def get_updated_rows(notifications, last_id, updated_since):
+    """Resúmenes ya entregados (ID <= last_id) que cambiaron después de updated_since"""
+    return list(get_notification_rows(
+        notifications.filter(id__lte=last_id, count__gt=1, updated_at__gt=updated_since).order_by('updated_at', 'id')
+    )[:NOTIFICATIONS_API_LIMIT])
+
+
+def get_updated_cursor(updated_since, *row_lists):
+    """Mayor updated_at entregado: desde ahí se piden los próximos cambios"""
+    moments = [row['updated_at'] for rows in row_lists for row in rows]
+    if updated_since is not None:
+        moments.append(updated_since)
+    return max(moments, default=None) or timezone.now()
 
 
 @login_required
 def get_notifications(request):
-    """Obtener notificaciones del usuario (API)"""
-    notifications = Notification.objects.filter(
-        recipient=request.user
-    )[:20]  # Últimas 20
-    
-    unread_count = Notification.objects.filter(
-        recipient=request.user,
-        is_read=False
-    ).count()
-    
+    """
+    Obtener notificaciones del usuario (API)
+
+    Con ?since=<id o fecha ISO> devuelve solo las notificaciones posteriores
+    al cursor, por orden de ID y de a NOTIFICATIONS_API_LIMIT (has_more si
+    quedan más; se sigue con el cursor devuelto). Con ?since=<id> y
+    ?updated_since=<updated_cursor> devuelve además en updated los resúmenes
+    ya entregados que sumaron eventos. El ETag sale del contador del usuario
+    (versión de la bandeja y no leídas): si no cambió se responde 304 sin leer
+    las notificaciones.
+    """
+    notifications = Notification.objects.filter(recipient=request.user)
+
+    since = request.GET.get('since', '').strip()
+    since_filter = get_since_filter(since) if since else Q()
+    if since_filter is None:
+        return JsonResponse({'error': 'Cursor since inválido'}, status=400)
+
+    updated_since = request.GET.get('updated_since', '').strip() or None
+    if updated_since is not None:
+        updated_since = parse_moment(updated_since)
+        if updated_since is None:
+            return JsonResponse({'error': 'Cursor updated_since inválido'}, status=400)
+
+    unread_count, version = get_notification_counter(request.user)
+    etag = quote_etag(f'{version}-{unread_count}')
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        patch_cache_control(not_modified, private=True, no_cache=True)
+        return not_modified
+
+    updated = []
+    if since:
+        # Delta en orden de llegada: el cursor es la última fila enviada y
+        # has_more indica que hay que volver a pedir desde ahí
+        rows = list(
+            get_notification_rows(notifications.filter(since_filter).order_by('id'))[:NOTIFICATIONS_API_LIMIT + 1]
+        )
+        has_more = len(rows) > NOTIFICATIONS_API_LIMIT
+        rows = rows[:NOTIFICATIONS_API_LIMIT]
+        cursor = rows[-1]['id'] if rows else (int(since) if since.isdigit() else None)
+        if since.isdigit() and updated_since is not None:
+            updated = get_updated_rows(notifications, int(since), updated_since)
+    else:
+        # Bandeja: las más recientes; el cursor es la mayor ID enviada (si
+        # hubiera alguna mayor fuera de la lista, llega en el siguiente delta)
+        rows = list(get_notification_rows(notifications)[:NOTIFICATIONS_API_LIMIT])
+        has_more = False
+        cursor = max((row['id'] for row in rows), default=0)
+
     data = {
-        'notifications': [
-            {
-                'id': n.id,
-                'type': n.notification_type,
-                'title': n.title,
-                'message': n.message,
-                'action_url': n.action_url,
-                'is_read': n.is_read,
-                'is_seen': n.is_seen,
-                'created_at': n.created_at.isoformat(),
-                'sender': {
-                    'nombre': n.sender.nombre if n.sender else None,
-                    'apellido': n.sender.apellido if n.sender else None,
-                } if n.sender else None
-            }
-            for n in notifications
-        ],
-        'unread_count': unread_count
+        'notifications': [serialize_notification(row) for row in rows],
+        'updated': [serialize_notification(row) for row in updated],
+        'unread_count': unread_count,
+        'cursor': cursor,
+        'updated_cursor': get_updated_cursor(updated_since, rows, updated).isoformat(),
+        'has_more': has_more,
     }
-    
-    return JsonResponse(data)
+
+    response = JsonResponse(data)
+    response['ETag'] = etag
+    # no-cache: el navegador revalida con If-None-Match en cada consulta
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @login_required
@@ -47,9 +134,13 @@ def get_notifications(request):
 def mark_as_read(request, notification_id):
     """Marcar notificación como leída"""
     notification = get_object_or_404(Notification, id=notification_id, recipient=request.user)
-    notification.is_read = True
-    notification.read_at = timezone.now()
-    notification.save()
+    # UPDATE condicional: solo descuenta si esta petición fue la que la marcó
+    marked = Notification.objects.filter(id=notification.id, is_read=False).update(
+        is_read=True, read_at=timezone.now()
+    )
+    if marked:
+        adjust_unread_counters([request.user.id], -1)
+        publish_notification_event([request.user.id])
     
     return JsonResponse({'success': True})
 
@@ -61,6 +152,7 @@ def mark_as_seen(request, notification_id):
     notification = get_object_or_404(Notification, id=notification_id, recipient=request.user)
     notification.is_seen = True
     notification.save()
+    touch_notification_counters([request.user.id])
     
     return JsonResponse({'success': True})
 
@@ -69,10 +161,13 @@ def mark_as_seen(request, notification_id):
 @require_POST
 def mark_all_as_read(request):
     """Marcar todas las notificaciones como leídas"""
-    Notification.objects.filter(
+    marked_count = Notification.objects.filter(
         recipient=request.user,
         is_read=False
     ).update(is_read=True, read_at=timezone.now())
+    if marked_count:
+        adjust_unread_counters([request.user.id], -marked_count)
+        publish_notification_event([request.user.id])
     
     return JsonResponse({'success': True})
 
@@ -81,10 +176,12 @@ def mark_all_as_read(request):
 @require_POST
 def mark_all_as_seen(request):
     """Marcar todas las notificaciones como vistas"""
-    Notification.objects.filter(
+    seen_count = Notification.objects.filter(
         recipient=request.user,
         is_seen=False
     ).update(is_seen=True)
+    if seen_count:
+        touch_notification_counters([request.user.id])
     
     return JsonResponse({'success': True})
 
@@ -94,11 +191,102 @@ def mark_all_as_seen(request):
 def delete_notification(request, notification_id):
     """Eliminar notificación"""
     notification = get_object_or_404(Notification, id=notification_id, recipient=request.user)
-    notification.delete()
+    # Se borra primero como no leída para descontarla solo si realmente lo era
+    unread_deleted, _ = Notification.objects.filter(id=notification.id, is_read=False).delete()
+    if unread_deleted:
+        adjust_unread_counters([request.user.id], -1)
+    else:
+        notification.delete()
+        touch_notification_counters([request.user.id])
+    publish_notification_event([request.user.id])
     
     return JsonResponse({'success': True})
 
 
+def get_stream_snapshot(user, last_id, updated_since):
+    """Notificaciones posteriores a last_id, resúmenes que cambiaron y conteo de no leídas para el stream"""
+    try:
+        notifications = Notification.objects.filter(recipient=user)
+        updated = []
+        if last_id is None:
+            # Primera conexión: solo se toma la posición actual, sin reenviar historial
+            latest = notifications.order_by('-id').values_list('id', flat=True).first()
+            new_notifications = []
+        else:
+            new_notifications = list(
+                get_notification_rows(notifications.filter(id__gt=last_id).order_by('id'))[:NOTIFICATIONS_API_LIMIT]
+            )
+            updated = get_updated_rows(notifications, last_id, updated_since)
+            latest = new_notifications[-1]['id'] if new_notifications else last_id
+        unread_count = get_unread_count(user)
+        return (
+            [serialize_notification(row) for row in new_notifications],
+            [serialize_notification(row) for row in updated],
+            latest or 0,
+            get_updated_cursor(updated_since, new_notifications, updated),
+            unread_count,
+        )
+    finally:
+        # No retener una conexión de base de datos por cada cliente conectado
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+async def stream_notification_events(user, last_id):
+    """Generador SSE: envía notificaciones nuevas, resúmenes actualizados y cambios en el conteo de no leídas"""
+    ensure_listener()
+    subscriber = broker.subscribe(user.id)
+    _, queue = subscriber
+    try:
+        yield 'retry: 5000\n\n'
+        unread_count = None
+        updated_since = timezone.now()
+        while True:
+            new_notifications, updated, last_id, updated_since, current_unread = await sync_to_async(
+                get_stream_snapshot
+            )(user, last_id, updated_since)
+            for data in new_notifications:
+                yield format_sse('notification', data, event_id=data['id'])
+            for data in updated:
+                # Mismo ID con otro contenido (p. ej. "3 tareas"): el cliente reemplaza la que tenía
+                yield format_sse('update', data, event_id=last_id)
+            if current_unread != unread_count:
+                unread_count = current_unread
+                yield format_sse('unread', {'unread_count': unread_count, 'last_id': last_id}, event_id=last_id)
+
+            # Esperar un aviso del broker; mientras tanto, mantener viva la conexión
+            while True:
+                try:
+                    await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT)
+                    break
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+    finally:
+        broker.unsubscribe(user.id, subscriber)
+
+
+async def notification_stream(request):
+    """Stream Server-Sent Events de notificaciones (requiere servidor ASGI)"""
+    if not isinstance(request, ASGIRequest):
+        # Bajo WSGI una respuesta infinita bloquearía el worker: el cliente usa polling
+        return JsonResponse({'error': 'Stream no disponible'}, status=503)
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'No autenticado'}, status=401)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_id')
+    last_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    response = StreamingHttpResponse(
+        stream_notification_events(user, last_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 
 @login_required
 def test_notifications(request):
@@ -117,6 +305,7 @@ def get_pending_tasks(request):
     from apps.tasks.models import Task, TaskCompletion
     from apps.groups.models import GroupMember
     from datetime import timedelta
+    from django.db.models import Exists, OuterRef
     
     # Obtener grupos del usuario
     user_group_ids = GroupMember.objects.filter(user=request.user).values_list('group_id', flat=True)
@@ -125,10 +314,11 @@ def get_pending_tasks(request):
     now = timezone.now()
     today = now.date()
     
-    # Tareas del usuario
+    # Tareas del usuario sin completar (una sola consulta, sin buscar TaskCompletion por tarea)
+    completed = TaskCompletion.objects.filter(task=OuterRef('pk'), user=request.user, completed=True)
     tasks = Task.objects.filter(
         group_id__in=user_group_ids
-    ).select_related('subject', 'group')
+    ).exclude(Exists(completed)).select_related('subject')
     
     # Fechas importantes
     tomorrow = today + timedelta(days=1)
@@ -140,11 +330,6 @@ def get_pending_tasks(request):
     overdue_tasks = []
     
     for task in tasks:
-        # Verificar si el usuario ya completó la tarea
-        completion = TaskCompletion.objects.filter(task=task, user=request.user).first()
-        if completion and completion.completed:
-            continue
-        
         # Calcular horas hasta vencimiento
         task_datetime = timezone.make_aware(
             timezone.datetime.combine(task.due_date, timezone.datetime.min.time())
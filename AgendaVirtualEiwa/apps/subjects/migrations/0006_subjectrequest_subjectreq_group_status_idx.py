@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:57
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Índices creados sin bloquear escrituras en tablas grandes
+    atomic = False
+
+    dependencies = [
+        ('groups', '0006_groupactivity_groupactivity_group_time_idx_and_more'),
+        ('subjects', '0005_alter_subject_name_alter_subjectrequest_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='subjectrequest',
+            index=models.Index(fields=['group', 'status'], name='subjectreq_group_status_idx'),
+        ),
+    ]
@@ -100,4 +100,7 @@ class SubjectRequest(models.Model):
         verbose_name = 'Solicitud de Materia'
         verbose_name_plural = 'Solicitudes de Materias'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['group', 'status'], name='subjectreq_group_status_idx'),
+        ]
 
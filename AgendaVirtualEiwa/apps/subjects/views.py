@@ -257,4 +257,8 @@ def delete_subject(request, subject_id):
     
     subject.delete()
     
+    # Las tareas de la materia se eliminaron en cascada
+    from apps.tasks.counters import refresh_task_counters
+    refresh_task_counters(group_ids=[group_id])
+    
     return redirect('group_subjects', group_id=group_id)
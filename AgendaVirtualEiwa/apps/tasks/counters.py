@@ -0,0 +1,265 @@
+# Contadores desnormalizados de tareas por (usuario, grupo)
+#
+# El dashboard lee pendientes/completadas/vencidas de TaskCounter en lugar de
+# recorrer Task y TaskCompletion. Los cambios puntuales ajustan los contadores
+# con UPDATE ... SET campo = campo + n; los cambios que afectan a todo un grupo
+# (ediciones de fecha, transición nocturna) recalculan ese grupo completo.
+#
+# Además de los totales se guardan los rangos por defecto del dashboard
+# (pendientes y completadas de la semana, vencidas de los últimos 7 días).
+# Dependen de la fecha: cada fila guarda el día para el que se calculó
+# (counted_on) y get_user_task_counters recalcula las de otro día al leerlas.
+from datetime import timedelta
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Task, TaskCompletion, TaskCounter
+
+
+# Campos de TaskCounter, en el orden de compute_task_counters
+COUNTER_FIELDS = ('pending', 'completed', 'overdue', 'pending_week', 'completed_week', 'overdue_recent')
+
+# Rangos del dashboard que se leen directo de TaskCounter: (contador, preferencia) -> campo
+COUNTER_RANGE_FIELDS = {
+    ('pending', 'all'): 'pending',
+    ('pending', 'week'): 'pending_week',
+    ('completed', 'all'): 'completed',
+    ('completed', 'week'): 'completed_week',
+    ('overdue', 'all'): 'overdue',
+    ('overdue', '7days'): 'overdue_recent',
+}
+
+# Días hacia atrás de las vencidas recientes (preferencia '7days')
+RECENT_OVERDUE_DAYS = 7
+
+
+def get_week_range(today):
+    """(lunes, domingo) de la semana de today"""
+    week_start = today - timedelta(days=today.weekday())
+    return week_start, week_start + timedelta(days=6)
+
+
+def is_overdue(task, today=None):
+    """La tarea cuenta como vencida si su fecha de entrega ya pasó"""
+    if today is None:
+        today = timezone.now().date()
+    return task.due_date < today
+
+
+def is_due_this_week(due_date, today):
+    week_start, week_end = get_week_range(today)
+    return week_start <= due_date <= week_end
+
+
+def is_recently_overdue(due_date, today):
+    return today - timedelta(days=RECENT_OVERDUE_DAYS) <= due_date < today
+
+
+def get_open_task_deltas(task, step, today):
+    """Cambios en los contadores de quien tiene la tarea sin completar (step = +1 o -1)"""
+    return {
+        'pending': F('pending') + step,
+        'overdue': F('overdue') + step * int(is_overdue(task, today)),
+        'pending_week': F('pending_week') + step * int(is_due_this_week(task.due_date, today)),
+        'overdue_recent': F('overdue_recent') + step * int(is_recently_overdue(task.due_date, today)),
+    }
+
+
+def counters_on_task_created(task):
+    """Una tarea nueva queda pendiente para todos los miembros del grupo"""
+    now = timezone.now()
+    TaskCounter.objects.filter(group_id=task.group_id).update(
+        **get_open_task_deltas(task, 1, now.date()),
+        updated_at=now,
+    )
+
+
+def counters_on_task_deleted(task):
+    """
+    Descuenta una tarea que se va a eliminar
+
+    Debe llamarse ANTES de task.delete(), mientras existen sus TaskCompletion.
+    """
+    now = timezone.now()
+    week_start, week_end = get_week_range(now.date())
+    completions = TaskCompletion.objects.filter(task=task, completed=True)
+    done_user_ids = completions.values('user_id')
+    done_this_week_ids = completions.filter(
+        completed_at__date__gte=week_start, completed_at__date__lte=week_end
+    ).values('user_id')
+    counters = TaskCounter.objects.filter(group_id=task.group_id)
+
+    counters.filter(user_id__in=done_this_week_ids).update(
+        completed_week=F('completed_week') - 1, updated_at=now
+    )
+    counters.filter(user_id__in=done_user_ids).update(completed=F('completed') - 1, updated_at=now)
+    counters.exclude(user_id__in=done_user_ids).update(
+        **get_open_task_deltas(task, -1, now.date()),
+        updated_at=now,
+    )
+
+
+def counters_on_completion_toggled(task, user, completed, completed_at=None):
+    """
+    Mueve la tarea entre pendientes y completadas para un usuario
+
+    Args:
+        completed_at: Fecha de la completación que se agrega o se quita
+            (cuenta en completed_week si cae en la semana actual)
+    """
+    now = timezone.now()
+    step = 1 if completed else -1
+    in_week = completed_at is not None and is_due_this_week(
+        timezone.localtime(completed_at).date(), now.date()
+    )
+    TaskCounter.objects.filter(user=user, group_id=task.group_id).update(
+        **get_open_task_deltas(task, -step, now.date()),
+        completed=F('completed') + step,
+        completed_week=F('completed_week') + step * int(in_week),
+        updated_at=now,
+    )
+
+
+def _count_subquery(queryset, group_field):
+    """Subquery escalar con el número de filas de queryset (0 si no hay)"""
+    counted = queryset.values(group_field).annotate(total=Count('id')).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def compute_task_counters(memberships, today=None):
+    """
+    Calcula los contadores reales de un conjunto de membresías
+
+    Args:
+        memberships: QuerySet de GroupMember
+        today: Fecha de referencia (por defecto hoy)
+
+    Returns:
+        Diccionario {(user_id, group_id): valores en el orden de COUNTER_FIELDS}
+    """
+    if today is None:
+        today = timezone.now().date()
+    week_start, week_end = get_week_range(today)
+    this_week = Q(due_date__gte=week_start, due_date__lte=week_end)
+    recently_overdue = Q(due_date__gte=today - timedelta(days=RECENT_OVERDUE_DAYS), due_date__lt=today)
+
+    group_tasks = Task.objects.filter(group_id=OuterRef('group_id'))
+    user_done = TaskCompletion.objects.filter(
+        user_id=OuterRef('user_id'), task__group_id=OuterRef('group_id'), completed=True
+    )
+
+    rows = memberships.annotate(
+        total=_count_subquery(group_tasks, 'group_id'),
+        total_overdue=_count_subquery(group_tasks.filter(due_date__lt=today), 'group_id'),
+        total_week=_count_subquery(group_tasks.filter(this_week), 'group_id'),
+        total_recent=_count_subquery(group_tasks.filter(recently_overdue), 'group_id'),
+        done=_count_subquery(user_done, 'user_id'),
+        done_overdue=_count_subquery(user_done.filter(task__due_date__lt=today), 'user_id'),
+        done_week=_count_subquery(
+            user_done.filter(task__due_date__gte=week_start, task__due_date__lte=week_end), 'user_id'
+        ),
+        done_recent=_count_subquery(
+            user_done.filter(
+                task__due_date__gte=today - timedelta(days=RECENT_OVERDUE_DAYS), task__due_date__lt=today
+            ),
+            'user_id',
+        ),
+        done_in_week=_count_subquery(
+            user_done.filter(completed_at__date__gte=week_start, completed_at__date__lte=week_end), 'user_id'
+        ),
+    ).values_list(
+        'user_id', 'group_id', 'total', 'total_overdue', 'total_week', 'total_recent',
+        'done', 'done_overdue', 'done_week', 'done_recent', 'done_in_week',
+    )
+
+    return {
+        (user_id, group_id): (
+            total - done, done, total_overdue - done_overdue,
+            total_week - done_week, done_in_week, total_recent - done_recent,
+        )
+        for (user_id, group_id, total, total_overdue, total_week, total_recent,
+             done, done_overdue, done_week, done_recent, done_in_week) in rows
+    }
+
+
+def refresh_task_counters(group_ids=None, user_ids=None, today=None):
+    """
+    Recalcula y guarda los contadores de las membresías indicadas
+
+    Escribe todas las filas con un único bulk_create (upsert) y elimina los
+    contadores de usuarios que ya no son miembros.
+
+    Returns:
+        Número de filas cuyo valor cambió (desviación corregida)
+    """
+    from apps.groups.models import GroupMember
+
+    if today is None:
+        today = timezone.now().date()
+    memberships = GroupMember.objects.all()
+    counters = TaskCounter.objects.all()
+    if group_ids is not None:
+        memberships = memberships.filter(group_id__in=group_ids)
+        counters = counters.filter(group_id__in=group_ids)
+    if user_ids is not None:
+        memberships = memberships.filter(user_id__in=user_ids)
+        counters = counters.filter(user_id__in=user_ids)
+
+    expected = compute_task_counters(memberships, today)
+    current = {
+        (user_id, group_id): (values, counted_on)
+        for user_id, group_id, counted_on, *values in counters.values_list(
+            'user_id', 'group_id', 'counted_on', *COUNTER_FIELDS
+        )
+    }
+
+    changed = [key for key, values in expected.items() if key not in current or current[key][0] != list(values)]
+    # Mismos valores calculados otro día: solo se actualiza la fecha de referencia
+    dated = [key for key in expected if key in current and key not in changed and current[key][1] != today]
+    stale = [key for key in current if key not in expected]
+
+    if changed or dated:
+        now = timezone.now()
+        rows = []
+        for user_id, group_id in changed + dated:
+            rows.append(TaskCounter(
+                user_id=user_id, group_id=group_id, counted_on=today, updated_at=now,
+                **dict(zip(COUNTER_FIELDS, expected[(user_id, group_id)])),
+            ))
+        TaskCounter.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['user', 'group'],
+            update_fields=[*COUNTER_FIELDS, 'counted_on', 'updated_at'],
+        )
+    if stale:
+        stale_q = Q()
+        for user_id, group_id in stale:
+            stale_q |= Q(user_id=user_id, group_id=group_id)
+        counters.filter(stale_q).delete()
+
+    return len(changed) + len(stale)
+
+
+def get_user_task_counters(user, group_ids):
+    """
+    Contadores del usuario en los grupos indicados, creando los que falten
+
+    Los calculados otro día se recalculan (los rangos de fecha cambiaron).
+
+    Returns:
+        Diccionario {group_id: TaskCounter}
+    """
+    today = timezone.now().date()
+    counters = {
+        c.group_id: c for c in TaskCounter.objects.filter(user=user, group_id__in=group_ids, counted_on=today)
+    }
+    missing = [group_id for group_id in group_ids if group_id not in counters]
+    if missing:
+        refresh_task_counters(group_ids=missing, user_ids=[user.id], today=today)
+        counters.update({
+            c.group_id: c for c in TaskCounter.objects.filter(user=user, group_id__in=missing)
+        })
+    return counters
@@ -0,0 +1,153 @@
+# Descarga de adjuntos
+#
+# Con ATTACHMENTS_SENDFILE la vista solo verifica permisos y devuelve una
+# respuesta vacía con la cabecera que le indica al servidor frontal qué
+# archivo enviar:
+#   - 'nginx': X-Accel-Redirect con ATTACHMENTS_SENDFILE_PREFIX + nombre del
+#     archivo. La location del prefijo debe ser `internal` y apuntar a
+#     MEDIA_ROOT (p. ej. `location /protected-media/ { internal; alias /ruta/media/; }`)
+#   - 'apache': X-Sendfile con la ruta absoluta (mod_xsendfile)
+# El servidor frontal resuelve Range y las validaciones condicionales.
+#
+# Sin servidor frontal (o con un almacenamiento sin rutas locales) el archivo
+# lo envía Django: con ETag y Last-Modified (If-None-Match/If-Modified-Since
+# responden 304) y con Range de un solo intervalo (206, o 416 si no es
+# válido), así una descarga repetida o reanudada no vuelve a enviar todo.
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_etags, quote_etag
+
+from .storage import BLOB_DIR
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def get_file_etag(name, stat):
+    """ETag fuerte: el hash del blob si el archivo es deduplicado, si no fecha y tamaño"""
+    if name.startswith(f'{BLOB_DIR}/'):
+        return quote_etag(os.path.basename(name))
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def parse_range(header, size):
+    """
+    Intervalo (inicio, fin inclusive) de una cabecera Range de un solo intervalo
+
+    Returns:
+        None si no hay Range (o tiene varios intervalos y se envía todo),
+        False si no se puede satisfacer
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # bytes=-N: los últimos N bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def iter_file_range(f, start, length):
+    try:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        f.close()
+
+
+def get_content_type(filename):
+    content_type, encoding = mimetypes.guess_type(filename)
+    return content_type if content_type and not encoding else 'application/octet-stream'
+
+
+def sendfile_response(name, path, filename):
+    """Respuesta vacía para que nginx/apache envíen el archivo"""
+    response = HttpResponse(content_type=get_content_type(filename))
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    if settings.ATTACHMENTS_SENDFILE == 'nginx':
+        response['X-Accel-Redirect'] = settings.ATTACHMENTS_SENDFILE_PREFIX.rstrip('/') + '/' + quote(name)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def serve_attachment_file(request, field_file, filename):
+    """
+    Respuesta de descarga de un archivo adjunto
+
+    Args:
+        request: Petición (cabeceras Range, If-Range, If-None-Match, ...)
+        field_file: FieldFile del adjunto
+        filename: Nombre con el que se descarga
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe en el almacenamiento
+    """
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        # Almacenamiento remoto: se envía tal cual
+        return FileResponse(field_file.open('rb'), as_attachment=True, filename=filename)
+
+    stat = os.stat(path)
+    if settings.ATTACHMENTS_SENDFILE in ('nginx', 'apache'):
+        return sendfile_response(field_file.name, path, filename)
+
+    etag = get_file_etag(field_file.name, stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build_file_response(request, path, stat.st_size, etag, filename)
+    response.headers.setdefault('ETag', etag)
+    response.headers.setdefault('Last-Modified', http_date(last_modified))
+    return response
+
+
+def build_file_response(request, path, size, etag, filename):
+    """Archivo completo (200) o el intervalo pedido con Range (206/416)"""
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    # If-Range: solo se respeta Range si el archivo sigue siendo el mismo
+    if 'HTTP_RANGE' in request.META and (not if_range or etag in parse_etags(if_range)):
+        byte_range = parse_range(request.META['HTTP_RANGE'], size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range is None:
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            iter_file_range(open(path, 'rb'), start, length),
+            status=206,
+            content_type=get_content_type(filename),
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.tasks.models import TaskAttachment
+from apps.tasks.storage import ContentAddressedStorage, reconcile_blob_refcounts
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las referencias de los archivos deduplicados y borra los que ya no usa ningún adjunto'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostrar cuántos blobs se corregirían sin modificar nada',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        storage = TaskAttachment._meta.get_field('file').storage
+        if not isinstance(storage, ContentAddressedStorage):
+            # Blobs de cuando la deduplicación estaba activa
+            storage = ContentAddressedStorage()
+
+        stats = reconcile_blob_refcounts(storage, dry_run=options['dry_run'])
+
+        verb = 'a corregir' if options['dry_run'] else 'corregidos'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Proceso completado en {time.monotonic() - started:.3f}s:'
+                f"\n  - {stats['checked']} blobs revisados"
+                f"\n  - {stats['fixed']} contadores {verb}"
+                f"\n  - {stats['created']} blobs sin fila {'a registrar' if options['dry_run'] else 'registrados'}"
+                f"\n  - {stats['released']} blobs sin referencias {'a eliminar' if options['dry_run'] else 'eliminados'}"
+            )
+        )
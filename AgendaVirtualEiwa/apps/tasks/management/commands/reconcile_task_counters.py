@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.tasks.counters import refresh_task_counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de tareas por usuario y grupo y corrige las desviaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--group',
+            type=int,
+            action='append',
+            dest='groups',
+            help='ID de grupo a reconciliar (se puede repetir; por defecto todos)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        fixed_count = refresh_task_counters(group_ids=options['groups'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Proceso completado en {time.monotonic() - started:.3f}s:'
+                f'\n  - {fixed_count} contadores corregidos'
+            )
+        )
@@ -1,46 +1,47 @@
+import time
+
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from apps.tasks.models import Task
+from apps.tasks.utils import bulk_update_task_statuses
 
 
 class Command(BaseCommand):
     help = 'Actualiza los estados de las tareas según las reglas del sistema (archiva tareas antiguas, marca vencidas recientes)'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo muestra cuántas tareas cambiarían de estado, sin modificar nada',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Cantidad de registros de historial por bloque (por defecto 5000)',
+        )
+
     def handle(self, *args, **options):
-        today = timezone.now().date()
-        
-        # Obtener todas las tareas activas (no completadas ni archivadas)
-        active_tasks = Task.objects.exclude(status__in=['completed', 'archived'])
-        
-        updated_count = 0
-        archived_count = 0
-        overdue_count = 0
-        
-        for task in active_tasks:
-            old_status = task.status
-            task.update_status()
-            
-            if old_status != task.status:
-                updated_count += 1
-                
-                if task.status == 'archived':
-                    archived_count += 1
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f'Archivada: {task.title} (vencida hace {task.days_overdue} días)'
-                        )
-                    )
-                elif task.status == 'overdue_recent':
-                    overdue_count += 1
-                    self.stdout.write(
-                        self.style.NOTICE(
-                            f'Vencida reciente: {task.title} (vencida hace {task.days_overdue} días)'
-                        )
-                    )
-        
+        dry_run = options['dry_run']
+        started = time.monotonic()
+
+        results = bulk_update_task_statuses(dry_run=dry_run, chunk_size=options['chunk_size'])
+
+        if dry_run:
+            self.stdout.write(self.style.NOTICE('Modo simulación: no se modificó ninguna tarea'))
+
+        for result in results:
+            self.stdout.write(
+                f"  {result['old_status']} → {result['new_status']}: "
+                f"{result['count']} tareas ({result['seconds']:.3f}s)"
+            )
+
+        updated_count = sum(r['count'] for r in results)
+        archived_count = sum(r['count'] for r in results if r['new_status'] == 'archived')
+        overdue_count = sum(r['count'] for r in results if r['new_status'] == 'overdue_recent')
+
         self.stdout.write(
             self.style.SUCCESS(
-                f'\n✓ Proceso completado:'
+                f'\n✓ Proceso completado en {time.monotonic() - started:.3f}s:'
                 f'\n  - {updated_count} tareas actualizadas'
                 f'\n  - {archived_count} tareas archivadas'
                 f'\n  - {overdue_count} tareas marcadas como vencidas recientes'
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:57
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Índices creados sin bloquear escrituras en tablas grandes
+    atomic = False
+
+    dependencies = [
+        ('groups', '0006_groupactivity_groupactivity_group_time_idx_and_more'),
+        ('subjects', '0006_subjectrequest_subjectreq_group_status_idx'),
+        ('tasks', '0010_taskeditrequest_documents_to_delete_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'archived'), _negated=True), fields=['group', 'due_date'], name='task_group_due_active_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='taskcompletion',
+            index=models.Index(condition=models.Q(('completed', True)), fields=['user', 'task'], name='completion_user_task_done_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='taskeditrequest',
+            index=models.Index(fields=['task', 'status'], name='taskedit_task_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='taskrequest',
+            index=models.Index(fields=['group', 'status'], name='taskrequest_group_status_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0006_groupactivity_groupactivity_group_time_idx_and_more'),
+        ('tasks', '0011_task_task_group_due_active_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pending', models.IntegerField(default=0, verbose_name='Pendientes')),
+                ('completed', models.IntegerField(default=0, verbose_name='Completadas')),
+                ('overdue', models.IntegerField(default=0, verbose_name='Vencidas')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_counters', to='groups.group')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Contador de Tareas',
+                'verbose_name_plural': 'Contadores de Tareas',
+                'unique_together': {('user', 'group')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:50
+
+import apps.tasks.models
+import apps.tasks.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_taskcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Blob de Archivo',
+                'verbose_name_plural': 'Blobs de Archivos',
+            },
+        ),
+        migrations.AlterField(
+            model_name='taskattachment',
+            name='file',
+            field=models.FileField(storage=apps.tasks.storage.get_attachment_storage, upload_to=apps.tasks.models.task_attachment_upload_to, verbose_name='Archivo'),
+        ),
+        migrations.AlterField(
+            model_name='taskeditattachment',
+            name='file',
+            field=models.FileField(storage=apps.tasks.storage.get_attachment_storage, upload_to=apps.tasks.models.task_edit_attachment_upload_to, verbose_name='Archivo'),
+        ),
+        migrations.AlterField(
+            model_name='taskrequestattachment',
+            name='file',
+            field=models.FileField(storage=apps.tasks.storage.get_attachment_storage, upload_to=apps.tasks.models.task_request_attachment_upload_to, verbose_name='Archivo'),
+        ),
+    ]
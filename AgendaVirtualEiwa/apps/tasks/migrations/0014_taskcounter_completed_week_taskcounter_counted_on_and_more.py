@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_fileblob_attachment_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskcounter',
+            name='completed_week',
+            field=models.IntegerField(default=0, verbose_name='Completadas en la semana'),
+        ),
+        migrations.AddField(
+            model_name='taskcounter',
+            name='counted_on',
+            field=models.DateField(blank=True, null=True, verbose_name='Fecha de referencia'),
+        ),
+        migrations.AddField(
+            model_name='taskcounter',
+            name='overdue_recent',
+            field=models.IntegerField(default=0, verbose_name='Vencidas en los últimos 7 días'),
+        ),
+        migrations.AddField(
+            model_name='taskcounter',
+            name='pending_week',
+            field=models.IntegerField(default=0, verbose_name='Pendientes de la semana'),
+        ),
+    ]
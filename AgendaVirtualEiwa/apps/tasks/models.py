@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from .storage import get_attachment_storage
 
 
 class Task(models.Model):
@@ -18,6 +19,9 @@ class Task(models.Model):
         ('high', 'Alta'),
     ]
     
+    # Días que una tarea vencida permanece como "vencida reciente" antes de archivarse
+    OVERDUE_RECENT_DAYS = 30
+    
     group = models.ForeignKey('groups.Group', on_delete=models.CASCADE, related_name='tasks')
     subject = models.ForeignKey('subjects.Subject', on_delete=models.CASCADE, related_name='tasks')
     title = models.CharField(max_length=200, verbose_name="Título")
@@ -65,12 +69,36 @@ class Task(models.Model):
         days_overdue = (today - self.due_date).days
         
         # Vencida reciente (hasta 30 días)
-        if days_overdue <= 30:
+        if days_overdue <= self.OVERDUE_RECENT_DAYS:
             return 'overdue_recent'
         
         # Debe archivarse (más de 30 días)
         return 'archived'
     
+    @classmethod
+    def computed_status_expression(cls, today=None):
+        """
+        Expresión SQL equivalente a get_computed_status
+        
+        Permite anotar el estado calculado en una consulta sin escribir en la
+        base de datos. La persistencia de los cambios de estado queda a cargo
+        del comando update_task_statuses.
+        """
+        from django.db.models import Case, When, Value, F, CharField
+        from django.utils import timezone
+        from datetime import timedelta
+        
+        if today is None:
+            today = timezone.now().date()
+        
+        return Case(
+            When(status__in=['completed', 'archived'], then=F('status')),
+            When(due_date__gte=today, then=Value('pending')),
+            When(due_date__gte=today - timedelta(days=cls.OVERDUE_RECENT_DAYS), then=Value('overdue_recent')),
+            default=Value('archived'),
+            output_field=CharField(),
+        )
+    
     def update_status(self):
         """Actualiza el estado de la tarea según las reglas del sistema"""
         from django.utils import timezone
@@ -123,6 +151,14 @@ class Task(models.Model):
         verbose_name = 'Tarea'
         verbose_name_plural = 'Tareas'
         ordering = ['due_date', '-priority']
+        indexes = [
+            # Listas de tareas: grupo + rango de fechas, solo activas
+            models.Index(
+                fields=['group', 'due_date'],
+                condition=~models.Q(status='archived'),
+                name='task_group_due_active_idx',
+            ),
+        ]
 
 
 class TaskRequest(models.Model):
@@ -162,6 +198,9 @@ class TaskRequest(models.Model):
         verbose_name = 'Solicitud de Tarea'
         verbose_name_plural = 'Solicitudes de Tareas'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['group', 'status'], name='taskrequest_group_status_idx'),
+        ]
 
 
 def task_request_attachment_upload_to(instance, filename):
@@ -180,7 +219,7 @@ class TaskRequestAttachment(models.Model):
     """Archivos adjuntos temporales para solicitudes de tareas"""
     
     task_request = models.ForeignKey(TaskRequest, on_delete=models.CASCADE, related_name='temp_attachments')
-    file = models.FileField(upload_to=task_request_attachment_upload_to, verbose_name="Archivo")
+    file = models.FileField(upload_to=task_request_attachment_upload_to, storage=get_attachment_storage, verbose_name="Archivo")
     
     # Metadata
     original_filename = models.CharField(max_length=255, verbose_name="Nombre original")
@@ -234,6 +273,9 @@ class TaskEditRequest(models.Model):
         verbose_name = 'Solicitud de Edición de Tarea'
         verbose_name_plural = 'Solicitudes de Edición de Tareas'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['task', 'status'], name='taskedit_task_status_idx'),
+        ]
 
 
 def task_edit_attachment_upload_to(instance, filename):
@@ -252,7 +294,7 @@ class TaskEditAttachment(models.Model):
     """Archivos nuevos adjuntos en solicitudes de edición"""
     
     edit_request = models.ForeignKey(TaskEditRequest, on_delete=models.CASCADE, related_name='new_attachments')
-    file = models.FileField(upload_to=task_edit_attachment_upload_to, verbose_name="Archivo")
+    file = models.FileField(upload_to=task_edit_attachment_upload_to, storage=get_attachment_storage, verbose_name="Archivo")
     
     # Metadata
     original_filename = models.CharField(max_length=255, verbose_name="Nombre original")
@@ -290,6 +332,45 @@ class TaskCompletion(models.Model):
         verbose_name_plural = 'Estados de Tareas por Usuario'
         unique_together = ['task', 'user']
         ordering = ['-completed_at']
+        indexes = [
+            # Exists(TaskCompletion(task, user, completed=True)) en todas las listas
+            models.Index(
+                fields=['user', 'task'],
+                condition=models.Q(completed=True),
+                name='completion_user_task_done_idx',
+            ),
+        ]
+
+
+class TaskCounter(models.Model):
+    """
+    Contadores desnormalizados de tareas por usuario y grupo (para el dashboard)
+
+    Se actualizan de forma incremental al crear, eliminar o completar tareas y
+    en la transición automática de estados. reconcile_task_counters corrige
+    cualquier desviación. Los contadores de la semana y de los últimos 7 días
+    (los rangos por defecto del dashboard) valen para el día counted_on; al
+    leerlos otro día se recalculan.
+    """
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='task_counters')
+    group = models.ForeignKey('groups.Group', on_delete=models.CASCADE, related_name='task_counters')
+    pending = models.IntegerField(default=0, verbose_name="Pendientes")
+    completed = models.IntegerField(default=0, verbose_name="Completadas")
+    overdue = models.IntegerField(default=0, verbose_name="Vencidas")
+    pending_week = models.IntegerField(default=0, verbose_name="Pendientes de la semana")
+    completed_week = models.IntegerField(default=0, verbose_name="Completadas en la semana")
+    overdue_recent = models.IntegerField(default=0, verbose_name="Vencidas en los últimos 7 días")
+    counted_on = models.DateField(null=True, blank=True, verbose_name="Fecha de referencia")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.nombre} - {self.group.name}: {self.pending}/{self.completed}/{self.overdue}"
+    
+    class Meta:
+        verbose_name = 'Contador de Tareas'
+        verbose_name_plural = 'Contadores de Tareas'
+        unique_together = ['user', 'group']
 
 
 
@@ -318,7 +399,7 @@ class TaskAttachment(models.Model):
     ]
     
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='attachments')
-    file = models.FileField(upload_to=task_attachment_upload_to, verbose_name="Archivo")
+    file = models.FileField(upload_to=task_attachment_upload_to, storage=get_attachment_storage, verbose_name="Archivo")
     
     # Metadata del archivo
     original_filename = models.CharField(max_length=255, verbose_name="Nombre original")
@@ -387,3 +468,19 @@ class TaskAttachment(models.Model):
         verbose_name = 'Archivo Adjunto'
         verbose_name_plural = 'Archivos Adjuntos'
         ordering = ['-uploaded_at']
+
+
+class FileBlob(models.Model):
+    """Contenido de adjunto guardado una sola vez (almacenamiento deduplicado, ver storage.py)"""
+    
+    name = models.CharField(max_length=100, unique=True)  # blobs/aa/bb/<sha256>
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.refcount} referencias)"
+    
+    class Meta:
+        verbose_name = 'Blob de Archivo'
+        verbose_name_plural = 'Blobs de Archivos'
@@ -0,0 +1,45 @@
+# Archivos de adjuntos eliminados en cascada
+#
+# Al borrar una tarea (o su grupo o materia), una solicitud de tarea o una
+# solicitud de edición, sus adjuntos se eliminan en cascada sin pasar por
+# FieldFile.delete. Antes del DELETE se toman los nombres de sus archivos y se
+# liberan al confirmar: con deduplicación el blob pierde una referencia, sin
+# ella se borra el archivo. Los adjuntos borrados uno a uno ya liberaron su
+# archivo (file queda vacío) y los de tareas archivadas están marcados como
+# file_deleted.
+#
+# Contadores de miembros que salen de un grupo
+#
+# Al eliminar una membresía (salir, expulsión, baneo, reversión) se borra su
+# TaskCounter: si el usuario vuelve, get_user_task_counters lo recalcula.
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+
+from apps.groups.models import GroupMember
+from .models import (
+    Task, TaskAttachment, TaskCounter, TaskEditAttachment, TaskEditRequest, TaskRequest, TaskRequestAttachment,
+)
+from .storage import release_attachment_files
+
+
+@receiver(pre_delete, sender=Task)
+def release_task_files(sender, instance, **kwargs):
+    names = TaskAttachment.objects.filter(task=instance, file_deleted=False).values_list('file', flat=True)
+    release_attachment_files(TaskAttachment, list(names))
+
+
+@receiver(pre_delete, sender=TaskRequest)
+def release_task_request_files(sender, instance, **kwargs):
+    names = TaskRequestAttachment.objects.filter(task_request=instance).values_list('file', flat=True)
+    release_attachment_files(TaskRequestAttachment, list(names))
+
+
+@receiver(pre_delete, sender=TaskEditRequest)
+def release_task_edit_files(sender, instance, **kwargs):
+    names = TaskEditAttachment.objects.filter(edit_request=instance).values_list('file', flat=True)
+    release_attachment_files(TaskEditAttachment, list(names))
+
+
+@receiver(post_delete, sender=GroupMember)
+def drop_member_counters(sender, instance, **kwargs):
+    TaskCounter.objects.filter(user_id=instance.user_id, group_id=instance.group_id).delete()
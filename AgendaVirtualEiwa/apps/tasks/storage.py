@@ -0,0 +1,311 @@
+# Almacenamiento de adjuntos de tareas
+#
+# Deduplicación (opcional, ATTACHMENTS_DEDUP = True): ContentAddressedStorage
+# calcula el SHA-256 mientras escribe la subida en un archivo temporal y la
+# guarda una sola vez como blobs/<aa>/<bb>/<sha256>. FileBlob lleva la cuenta
+# de referencias (TaskAttachment, TaskRequestAttachment y TaskEditAttachment
+# apuntan al mismo nombre); borrar un adjunto quita una referencia y el blob
+# solo se elimina del disco con la última. Los archivos anteriores (rutas de
+# upload_to) siguen funcionando como archivos normales. Los adjuntos que se
+# borran en cascada liberan sus archivos desde signals.py, y
+# reconcile_file_blobs recalcula las referencias desde las tres tablas.
+#
+# El archivo y la fila del adjunto se guardan en la misma transacción
+# (save_attachment, promote_attachment): la fila de FileBlob queda bloqueada
+# hasta que el adjunto existe, así la reconciliación espera en lugar de tomar
+# la referencia nueva por huérfana. Además no toca los blobs creados hace
+# menos de BLOB_RECONCILE_GRACE (guardados por otros caminos).
+#
+# Promoción: al aprobar una solicitud, el archivo temporal pasa a la tarea sin
+# copiar sus bytes: con deduplicación se agrega una referencia al mismo blob;
+# sin ella se crea un hard link en task_files/group_X/task_Y/. El archivo
+# temporal se elimina después como antes (solo se quita el enlace o la
+# referencia vieja). Si el almacenamiento no es local, o el destino está en
+# otro sistema de archivos (o no admite hard links), se copia como antes.
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+
+BLOB_DIR = 'blobs'
+# Antigüedad mínima de un blob para que la reconciliación lo corrija o lo borre
+BLOB_RECONCILE_GRACE = timedelta(hours=1)
+
+
+def unlink_file(path):
+    """Elimina un archivo: 'deleted', 'missing' o 'error'"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return 'missing'
+    except OSError:
+        return 'error'
+    return 'deleted'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Almacenamiento local que guarda cada contenido una sola vez"""
+
+    def get_blob_name(self, digest):
+        return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}'
+
+    def write_temporary(self, content):
+        """Escribe el contenido en un temporal calculando el hash: (sha256, tamaño, ruta)"""
+        directory = self.path(f'{BLOB_DIR}/tmp')
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary_path = tempfile.mkstemp(dir=directory)
+        digest = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, 'wb') as temporary:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                temporary.write(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size, temporary_path
+
+    def _save(self, name, content):
+        from .models import FileBlob
+
+        digest, size, temporary_path = self.write_temporary(content)
+        blob_name = self.get_blob_name(digest)
+        try:
+            while True:
+                try:
+                    with transaction.atomic():
+                        # El bloqueo de la fila ordena este guardado con un borrado concurrente del blob
+                        if FileBlob.objects.select_for_update().filter(name=blob_name).exists():
+                            FileBlob.objects.filter(name=blob_name).update(refcount=F('refcount') + 1)
+                            return blob_name
+                        FileBlob.objects.create(name=blob_name, size=size, refcount=1)
+                        path = self.path(blob_name)
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        os.replace(temporary_path, path)
+                        if self.file_permissions_mode is not None:
+                            os.chmod(path, self.file_permissions_mode)
+                        return blob_name
+                except IntegrityError:
+                    # Otro proceso creó el mismo blob: se vuelve a intentar como referencia
+                    continue
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def add_reference(self, name):
+        """Suma una referencia a un blob existente; False si name no es un blob"""
+        from .models import FileBlob
+
+        return FileBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') + 1) > 0
+
+    def release(self, names, pool=None):
+        """
+        Quita una referencia por cada nombre (un nombre puede repetirse)
+
+        Los blobs que quedan sin referencias se borran del disco con la fila
+        bloqueada, así un guardado concurrente del mismo contenido espera y
+        vuelve a escribir el archivo.
+
+        Returns:
+            {nombre: 'shared' | 'deleted' | 'missing' | 'error'} solo de los nombres que son blobs
+        """
+        from .models import FileBlob
+
+        counts = Counter(name for name in names if name.startswith(f'{BLOB_DIR}/'))
+        if not counts:
+            return {}
+
+        results = {}
+        with transaction.atomic():
+            blobs = list(FileBlob.objects.select_for_update().filter(name__in=counts).order_by('name'))
+            released = [blob for blob in blobs if blob.refcount <= counts[blob.name]]
+            paths = [self.path(blob.name) for blob in released]
+            for blob, result in zip(released, (pool.map if pool else map)(unlink_file, paths)):
+                results[blob.name] = result
+
+            # Si no se pudo borrar el archivo, la fila queda con 0 referencias
+            FileBlob.objects.filter(id__in=[blob.id for blob in released if results[blob.name] != 'error']).delete()
+            FileBlob.objects.filter(id__in=[blob.id for blob in released]).update(refcount=0)
+            for blob in blobs:
+                if blob not in released:
+                    FileBlob.objects.filter(id=blob.id).update(refcount=F('refcount') - counts[blob.name])
+                    results[blob.name] = 'shared'
+        return results
+
+    def delete(self, name):
+        if not self.release([name]):
+            super().delete(name)
+
+
+def get_attachment_storage():
+    """Almacenamiento de los adjuntos (deduplicado si ATTACHMENTS_DEDUP está activo)"""
+    if settings.ATTACHMENTS_DEDUP:
+        return ContentAddressedStorage()
+    return default_storage
+
+
+def delete_files(storage, names, pool=None):
+    """
+    Borra archivos del almacenamiento de adjuntos (en el pool si se indica)
+
+    Con deduplicación un blob compartido solo pierde una referencia ('shared').
+
+    Returns:
+        Resultado de cada nombre, en el mismo orden
+    """
+    results = storage.release(names, pool) if isinstance(storage, ContentAddressedStorage) else {}
+    plain = [name for name in names if name not in results]
+    paths = [storage.path(name) for name in plain]
+    results.update(zip(plain, (pool.map if pool else map)(unlink_file, paths)))
+    return [results[name] for name in names]
+
+
+def get_blob_references():
+    """Referencias reales a cada blob: {nombre: adjuntos que lo usan}"""
+    from .models import TaskAttachment, TaskEditAttachment, TaskRequestAttachment
+
+    references = Counter()
+    for attachments in (
+        # Los adjuntos de tareas archivadas ya liberaron su archivo
+        TaskAttachment.objects.filter(file_deleted=False),
+        TaskRequestAttachment.objects.all(),
+        TaskEditAttachment.objects.all(),
+    ):
+        rows = (
+            attachments.filter(file__startswith=f'{BLOB_DIR}/')
+            .values('file').annotate(total=Count('id')).order_by()
+        )
+        references.update({row['file']: row['total'] for row in rows})
+    return references
+
+
+def reconcile_blob_refcounts(storage, dry_run=False):
+    """
+    Recalcula FileBlob.refcount a partir de los adjuntos que apuntan a cada blob
+
+    Corrige los contadores desviados, crea la fila de los blobs referenciados
+    que no la tienen y borra del disco los que ya no usa ningún adjunto. Las
+    filas quedan bloqueadas mientras tanto, así un guardado concurrente del
+    mismo contenido espera. Los blobs creados hace menos de
+    BLOB_RECONCILE_GRACE se cuentan como revisados pero no se modifican.
+
+    Returns:
+        Diccionario con blobs revisados, corregidos, creados y liberados
+    """
+    from .models import FileBlob
+
+    stats = {'checked': 0, 'fixed': 0, 'created': 0, 'released': 0}
+    with transaction.atomic():
+        blobs = list(FileBlob.objects.select_for_update().order_by('name'))
+        references = get_blob_references()
+        stats['checked'] = len(blobs)
+
+        changed = []
+        released = []
+        recent = timezone.now() - BLOB_RECONCILE_GRACE
+        for blob in blobs:
+            if blob.created_at > recent:
+                continue
+            expected = references.get(blob.name, 0)
+            if expected == 0:
+                released.append(blob)
+            elif blob.refcount != expected:
+                blob.refcount = expected
+                changed.append(blob)
+        known = {blob.name for blob in blobs}
+        missing = [
+            FileBlob(name=name, size=storage.size(name), refcount=total)
+            for name, total in references.items()
+            if name not in known and storage.exists(name)
+        ]
+        stats.update(fixed=len(changed), created=len(missing), released=len(released))
+        if dry_run:
+            return stats
+
+        FileBlob.objects.bulk_update(changed, ['refcount'])
+        FileBlob.objects.bulk_create(missing, ignore_conflicts=True)
+        results = [unlink_file(storage.path(blob.name)) for blob in released]
+        # Si no se pudo borrar el archivo, la fila queda con 0 referencias
+        FileBlob.objects.filter(
+            id__in=[blob.id for blob, result in zip(released, results) if result != 'error']
+        ).delete()
+        FileBlob.objects.filter(id__in=[blob.id for blob in released]).update(refcount=0)
+    return stats
+
+
+def release_attachment_files(model, names):
+    """Libera los archivos de adjuntos eliminados al confirmar la transacción"""
+    names = [name for name in names if name]
+    if names:
+        storage = model._meta.get_field('file').storage
+        transaction.on_commit(lambda: delete_files(storage, names))
+
+
+def save_attachment(attachment):
+    """Guarda un adjunto nuevo y su archivo en una sola transacción"""
+    with transaction.atomic():
+        attachment.save()
+    return attachment
+
+
+def copy_attachment(source, attachment, filename):
+    """Copia los bytes del archivo temporal (respaldo)"""
+    with source.open('rb') as f:
+        attachment.file.save(filename, File(f), save=True)
+
+
+@transaction.atomic
+def promote_attachment(source, attachment, filename):
+    """
+    Asigna a attachment.file el archivo temporal source y guarda el adjunto
+
+    La referencia al blob y la fila del adjunto se confirman juntas.
+
+    Args:
+        source: FieldFile del archivo temporal (TaskRequestAttachment/TaskEditAttachment)
+        attachment: TaskAttachment sin guardar de la tarea destino
+        filename: Nombre original del archivo
+    """
+    field = attachment.file.field
+    storage = attachment.file.storage
+
+    if isinstance(storage, ContentAddressedStorage) and storage.add_reference(source.name):
+        # Mismo blob: solo una referencia más
+        attachment.file.name = source.name
+        attachment.save()
+        return
+
+    name = field.generate_filename(attachment, filename)
+    try:
+        source_path = source.path
+        storage.path(name)
+    except NotImplementedError:
+        # Almacenamiento remoto: no hay rutas locales que enlazar
+        copy_attachment(source, attachment, filename)
+        return
+
+    while True:
+        name = storage.get_available_name(name, max_length=field.max_length)
+        target_path = storage.path(name)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        try:
+            # link no reemplaza un archivo existente (a diferencia de rename)
+            os.link(source_path, target_path)
+        except FileExistsError:
+            # Otro proceso tomó el nombre entre la verificación y el enlace
+            continue
+        except OSError:
+            # Otro sistema de archivos (EXDEV) o sin soporte de hard links
+            copy_attachment(source, attachment, filename)
+            return
+        break
+
+    attachment.file.name = name
+    attachment.save()
@@ -4,7 +4,9 @@ from . import views_attachments
 
 urlpatterns = [
     path('', views.task_list, name='task_list'),
+    path('page/', views.unified_tasks_page, name='unified_tasks_page'),
     path('group/<int:group_id>/', views.group_tasks, name='group_tasks'),
+    path('group/<int:group_id>/page/', views.group_tasks_page, name='group_tasks_page'),
     path('group/<int:group_id>/create/', views.create_task, name='create_task'),
     path('<int:task_id>/toggle/', views.toggle_task_status, name='toggle_task_status'),
     path('<int:task_id>/', views.task_detail, name='task_detail'),
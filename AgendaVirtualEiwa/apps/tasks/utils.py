@@ -0,0 +1,294 @@
+import time
+from datetime import date, datetime, timedelta
+
+from django.core import signing
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .counters import refresh_task_counters
+from .models import Task, TaskCompletion
+
+
+# Transiciones automáticas de estado: (estado origen, estado destino)
+STATUS_TRANSITIONS = [
+    ('pending', 'overdue_recent'),
+    ('pending', 'archived'),
+    ('overdue_recent', 'archived'),
+    ('overdue_recent', 'pending'),
+]
+
+HISTORY_DETAILS = {'automatic': True, 'reason': 'Sistema de archivado automático'}
+
+
+def get_transition_queryset(old_status, new_status, today):
+    """Tareas que deben pasar de old_status a new_status según get_computed_status"""
+    archive_cutoff = today - timedelta(days=Task.OVERDUE_RECENT_DAYS)
+    tasks = Task.objects.filter(status=old_status)
+
+    if new_status == 'overdue_recent':
+        return tasks.filter(due_date__lt=today, due_date__gte=archive_cutoff)
+    if new_status == 'archived':
+        return tasks.filter(due_date__lt=archive_cutoff)
+    # Vuelve a pendiente si se movió la fecha de entrega hacia adelante
+    return tasks.filter(due_date__gte=today)
+
+
+def bulk_update_task_statuses(today=None, dry_run=False, chunk_size=5000):
+    """
+    Aplica las transiciones automáticas de estado con operaciones por lotes
+
+    Equivale a llamar Task.update_status() en cada tarea activa, pero emite un
+    UPDATE por transición y registra el historial con bulk_create en bloques.
+    Las filas actualizadas se identifican por el updated_at del proceso.
+
+    Args:
+        today: Fecha de referencia (por defecto hoy)
+        dry_run: Si es True solo cuenta las tareas afectadas, sin escribir
+        chunk_size: Tamaño de los bloques de historial
+
+    Returns:
+        Lista de diccionarios con old_status, new_status, count y seconds
+    """
+    from apps.tracking.models import TaskHistory
+
+    if today is None:
+        today = timezone.now().date()
+
+    results = []
+    changed_group_ids = set()
+    for old_status, new_status in STATUS_TRANSITIONS:
+        started = time.monotonic()
+        queryset = get_transition_queryset(old_status, new_status, today)
+
+        if dry_run:
+            count = queryset.count()
+        else:
+            run_at = timezone.now()
+            updates = {'status': new_status, 'updated_at': run_at}
+            if new_status == 'archived':
+                updates['archived_at'] = Coalesce(F('archived_at'), run_at)
+
+            with transaction.atomic():
+                count = queryset.update(**updates)
+
+                if count:
+                    changed = Task.objects.filter(
+                        status=new_status, updated_at=run_at
+                    ).values_list('id', 'title', 'group_id')
+
+                    batch = []
+                    for task_id, title, group_id in changed.iterator(chunk_size=chunk_size):
+                        changed_group_ids.add(group_id)
+                        batch.append(TaskHistory(
+                            task_id=task_id,
+                            task_title=title,
+                            group_id=group_id,
+                            action='status_changed',
+                            user=None,
+                            field_changed='status',
+                            old_value=old_status,
+                            new_value=new_status,
+                            details=HISTORY_DETAILS,
+                        ))
+                        if len(batch) >= chunk_size:
+                            TaskHistory.objects.bulk_create(batch)
+                            batch = []
+                    if batch:
+                        TaskHistory.objects.bulk_create(batch)
+
+        results.append({
+            'old_status': old_status,
+            'new_status': new_status,
+            'count': count,
+            'seconds': time.monotonic() - started,
+        })
+
+    # Las tareas que vencieron o volvieron a pendiente cambian los contadores de sus grupos
+    if changed_group_ids:
+        refresh_task_counters(group_ids=changed_group_ids, today=today)
+
+    return results
+
+
+# Orden de cada opción de "sort" en las listas de tareas. Todas terminan en
+# (due_date, created_at, id) para que el orden sea total y sirva como cursor
+TASK_SORT_ORDERINGS = {
+    'due_date': ['due_date', '-created_at', '-id'],
+    'due_date_desc': ['-due_date', '-created_at', '-id'],
+    'created': ['-created_at', '-due_date', '-id'],
+    'subject': ['subject__name', 'due_date', '-created_at', '-id'],
+    'group': ['group__name', 'due_date', '-created_at', '-id'],
+}
+
+CURSOR_SALT = 'tasks.cursor'
+
+
+def filter_tasks(tasks, status_filter='', subject_filter='', time_filter='', today=None):
+    """
+    Aplica los filtros de estado, materia y tiempo de las listas de tareas
+
+    El queryset debe estar anotado con user_completed.
+    """
+    if today is None:
+        today = timezone.now().date()
+
+    # Filtro por estado
+    if status_filter == 'completed':
+        tasks = tasks.filter(user_completed=True).exclude(status='archived')
+    elif status_filter == 'pending':
+        tasks = tasks.filter(Q(user_completed=False) | Q(user_completed__isnull=True), status='pending')
+    elif status_filter == 'archived':
+        tasks = tasks.filter(status='archived')
+    else:
+        # Por defecto: mostrar solo activas (pendientes y vencidas recientes, NO archivadas)
+        tasks = tasks.exclude(status='archived')
+
+    # Filtro por materia
+    if subject_filter and subject_filter != 'all':
+        tasks = tasks.filter(subject_id=subject_filter)
+
+    # Filtro por tiempo (solo si NO estamos viendo archivadas)
+    if status_filter != 'archived':
+        if not time_filter:
+            # Sin filtro de tiempo: mostrar SOLO pendientes (NO vencidas, NO archivadas)
+            tasks = tasks.filter(due_date__gte=today)
+        elif time_filter == 'today':
+            tasks = tasks.filter(due_date=today)
+        elif time_filter == 'tomorrow':
+            tasks = tasks.filter(due_date=today + timedelta(days=1))
+        elif time_filter == 'this_week':
+            week_end = today + timedelta(days=(6 - today.weekday()))
+            tasks = tasks.filter(due_date__gte=today, due_date__lte=week_end)
+        elif time_filter == 'next_week':
+            next_week_start = today + timedelta(days=(7 - today.weekday()))
+            next_week_end = next_week_start + timedelta(days=6)
+            tasks = tasks.filter(due_date__gte=next_week_start, due_date__lte=next_week_end)
+        elif time_filter == 'overdue':
+            # Mostrar TODAS las vencidas (completadas o no)
+            tasks = tasks.filter(due_date__lt=today)
+
+    return tasks
+
+
+def get_task_ordering(sort_by):
+    """Campos de ordenamiento para una opción de sort (por defecto due_date)"""
+    return TASK_SORT_ORDERINGS.get(sort_by, TASK_SORT_ORDERINGS['due_date'])
+
+
+def _get_ordering_value(task, field):
+    """Valor de un campo de ordenamiento, siguiendo relaciones como subject__name"""
+    value = task
+    for attr in field.lstrip('-').split('__'):
+        value = getattr(value, attr)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def encode_task_cursor(task, sort_by):
+    """Cursor firmado con los valores de ordenamiento de la última tarea de la página"""
+    values = [_get_ordering_value(task, field) for field in get_task_ordering(sort_by)]
+    return signing.dumps([sort_by, values], salt=CURSOR_SALT, compress=True)
+
+
+def decode_task_cursor(cursor, sort_by):
+    """Valores del cursor, o None si es inválido o pertenece a otro ordenamiento"""
+    try:
+        cursor_sort, values = signing.loads(cursor, salt=CURSOR_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if cursor_sort != sort_by or len(values) != len(get_task_ordering(sort_by)):
+        return None
+    return values
+
+
+def get_keyset_filter(ordering, values):
+    """
+    Condición "después de" para paginación por keyset con direcciones mixtas
+
+    Para (a, -b, c) genera: a > va OR (a = va AND b < vb) OR (a = va AND b = vb AND c > vc)
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def paginate_tasks(tasks, sort_by, cursor=None, page_size=30):
+    """
+    Página de tareas por keyset a partir de un cursor
+
+    No usa OFFSET: cada página continúa desde los valores de la última tarea
+    de la anterior, así que el costo no crece al avanzar en listas largas.
+
+    Returns:
+        Tupla (lista de tareas, cursor de la siguiente página o None)
+    """
+    ordering = get_task_ordering(sort_by)
+    tasks = tasks.order_by(*ordering)
+
+    values = decode_task_cursor(cursor, sort_by) if cursor else None
+    if values is not None:
+        tasks = tasks.filter(get_keyset_filter(ordering, values))
+
+    page = list(tasks[:page_size + 1])
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = encode_task_cursor(page[-1], sort_by)
+    return page, next_cursor
+
+
+def get_group_task_counters(user, group_ids, pending_range=(None, None),
+                            completed_range=(None, None), overdue_since=None, today=None):
+    """
+    Contadores de tareas por grupo desde el punto de vista de un usuario
+
+    Una sola consulta agregada (GROUP BY group_id) con Count(filter=...) para
+    cada contador, en lugar de un count() por contador y por grupo.
+
+    Args:
+        user: Usuario cuyo estado personal (TaskCompletion) se considera
+        group_ids: Grupos a contar
+        pending_range: (inicio, fin) de due_date para pendientes, o (None, None)
+        completed_range: (inicio, fin) de completed_at para completadas, o (None, None)
+        overdue_since: Fecha mínima de due_date para vencidas (None = todas)
+        today: Fecha de referencia (por defecto hoy)
+
+    Returns:
+        Diccionario {group_id: {'pending', 'completed', 'overdue'}}
+    """
+    if today is None:
+        today = timezone.now().date()
+
+    completions = TaskCompletion.objects.filter(task=OuterRef('pk'), user=user, completed=True)
+    done = Exists(completions)
+
+    pending_q = ~done
+    if pending_range[0] and pending_range[1]:
+        pending_q &= Q(due_date__gte=pending_range[0], due_date__lte=pending_range[1])
+
+    completed_in_range = completions
+    if completed_range[0] and completed_range[1]:
+        completed_in_range = completions.filter(
+            completed_at__date__gte=completed_range[0],
+            completed_at__date__lte=completed_range[1],
+        )
+
+    overdue_q = ~done & Q(due_date__lt=today)
+    if overdue_since:
+        overdue_q &= Q(due_date__gte=overdue_since)
+
+    rows = Task.objects.filter(group_id__in=group_ids).values('group_id').annotate(
+        pending=Count('id', filter=pending_q),
+        completed=Count('id', filter=Exists(completed_in_range)),
+        overdue=Count('id', filter=overdue_q),
+    ).order_by()
+
+    return {row.pop('group_id'): row for row in rows}
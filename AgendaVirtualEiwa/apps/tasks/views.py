@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
@@ -7,10 +8,16 @@ from django.urls import reverse
 from django.db.models import Q
 from apps.groups.models import Group, GroupMember
 from apps.subjects.models import Subject
-from apps.notifications.utils import create_notification
+from apps.notifications.utils import create_notification, notify_group_members
 from apps.tracking.utils import log_task_action, create_revertible_action
 from .models import Task
 from .forms import TaskForm
+from .storage import promote_attachment, save_attachment
+from .utils import filter_tasks, paginate_tasks
+from .counters import (
+    counters_on_completion_toggled, counters_on_task_created, counters_on_task_deleted,
+    refresh_task_counters,
+)
 
 
 @login_required
@@ -47,29 +54,16 @@ def task_list(request):
     return unified_tasks_view(request, user_groups, preselect_active_group=False)
 
 
-def unified_tasks_view(request, user_groups, preselect_active_group=False):
-    """Vista unificada de tareas de todos los grupos"""
-    from datetime import timedelta
+def get_unified_tasks_queryset(request, user_group_ids, group_filter='', groups_filter=''):
+    """
+    Tareas filtradas de la vista unificada
+
+    Returns:
+        Tupla (queryset, group_filter efectivo, IDs de grupos seleccionados)
+    """
     from .models import TaskCompletion
-    from django.db.models import Exists, OuterRef, Q
-    
-    today = timezone.now().date()
-    
-    # Obtener IDs de todos los grupos del usuario
-    user_group_ids = list(user_groups.values_list('group_id', flat=True))
-    
-    # Filtros
-    status_filter = request.GET.get('status', '')
-    group_filter = request.GET.get('group', '')
-    groups_filter = request.GET.get('groups', '')  # Nuevo: filtro de múltiples grupos
-    subject_filter = request.GET.get('subject', '')
-    time_filter = request.GET.get('time', '')
-    sort_by = request.GET.get('sort', 'due_date')
-    
-    # En modo separado, preseleccionar el grupo activo si no hay filtro
-    if preselect_active_group and not group_filter and not groups_filter and request.user.last_active_group_id:
-        group_filter = str(request.user.last_active_group_id)
-    
+    from django.db.models import Exists, OuterRef
+
     # Query base: todas las tareas de todos los grupos
     tasks = Task.objects.filter(group_id__in=user_group_ids).select_related(
         'subject', 'group', 'created_by'
@@ -82,9 +76,9 @@ def unified_tasks_view(request, user_groups, preselect_active_group=False):
             )
         )
     )
-    
+
     # Filtro por múltiples grupos (prioritario sobre filtro de grupo único)
-    filtered_groups = []
+    selected_group_ids = []
     if groups_filter:
         try:
             # Parsear IDs de grupos separados por coma
@@ -94,70 +88,86 @@ def unified_tasks_view(request, user_groups, preselect_active_group=False):
             if selected_group_ids:
                 tasks = tasks.filter(group_id__in=selected_group_ids)
                 group_filter = 'multiple'  # Marcar que hay filtro de múltiples grupos
-                # Obtener los objetos de grupo para mostrar sus nombres
-                from apps.groups.models import Group
-                filtered_groups = list(Group.objects.filter(id__in=selected_group_ids).values_list('name', flat=True))
         except (ValueError, AttributeError):
             pass
     # Filtro por grupo específico (solo si no hay filtro de múltiples grupos)
     elif group_filter and group_filter != 'all':
         tasks = tasks.filter(group_id=group_filter)
-    
-    # Filtro por estado
-    if status_filter == 'completed':
-        tasks = tasks.filter(user_completed=True).exclude(status='archived')
-    elif status_filter == 'pending':
-        tasks = tasks.filter(Q(user_completed=False) | Q(user_completed__isnull=True), status='pending')
-    elif status_filter == 'archived':
-        tasks = tasks.filter(status='archived')
-    else:
-        # Por defecto: mostrar solo activas
-        tasks = tasks.exclude(status='archived')
-    
-    # Filtro por materia
-    if subject_filter and subject_filter != 'all':
-        tasks = tasks.filter(subject_id=subject_filter)
-    
-    # Filtro por tiempo
-    if status_filter != 'archived':
-        if not time_filter:
-            tasks = tasks.filter(due_date__gte=today)
-        elif time_filter == 'today':
-            tasks = tasks.filter(due_date=today)
-        elif time_filter == 'tomorrow':
-            tasks = tasks.filter(due_date=today + timedelta(days=1))
-        elif time_filter == 'this_week':
-            week_end = today + timedelta(days=(6 - today.weekday()))
-            tasks = tasks.filter(due_date__gte=today, due_date__lte=week_end)
-        elif time_filter == 'next_week':
-            next_week_start = today + timedelta(days=(7 - today.weekday()))
-            next_week_end = next_week_start + timedelta(days=6)
-            tasks = tasks.filter(due_date__gte=next_week_start, due_date__lte=next_week_end)
-        elif time_filter == 'overdue':
-            tasks = tasks.filter(due_date__lt=today)
-    
-    # Ordenamiento
-    if sort_by == 'due_date':
-        tasks = tasks.order_by('due_date', '-created_at')
-    elif sort_by == 'due_date_desc':
-        tasks = tasks.order_by('-due_date', '-created_at')
-    elif sort_by == 'created':
-        tasks = tasks.order_by('-created_at')
-    elif sort_by == 'subject':
-        tasks = tasks.order_by('subject__name', 'due_date')
-    elif sort_by == 'group':
-        tasks = tasks.order_by('group__name', 'due_date')
-    
-    # Obtener todas las materias de todos los grupos
-    subjects = Subject.objects.filter(group_id__in=user_group_ids).select_related('group')
-    
-    # Crear diccionario con roles del usuario en cada grupo
+
+    tasks = filter_tasks(
+        tasks,
+        status_filter=request.GET.get('status', ''),
+        subject_filter=request.GET.get('subject', ''),
+        time_filter=request.GET.get('time', ''),
+    )
+    return tasks, group_filter, selected_group_ids
+
+
+def get_next_page_url(request, url_name, next_cursor, url_kwargs=None, **overrides):
+    """URL del fragmento con la siguiente página, conservando los filtros actuales"""
+    if not next_cursor:
+        return ''
+    params = request.GET.copy()
+    for key, value in overrides.items():
+        params[key] = value
+    params['cursor'] = next_cursor
+    return f"{reverse(url_name, kwargs=url_kwargs)}?{params.urlencode()}"
+
+
+def get_user_roles(user_groups):
+    """Diccionario con el rol del usuario en cada grupo"""
     user_roles = {}
     for membership in user_groups:
         user_roles[membership.group_id] = {
             'is_leader': membership.role == 'leader',
             'role': membership.role
         }
+    return user_roles
+
+
+def unified_tasks_view(request, user_groups, preselect_active_group=False):
+    """Vista unificada de tareas de todos los grupos"""
+    # Obtener IDs de todos los grupos del usuario
+    user_group_ids = list(user_groups.values_list('group_id', flat=True))
+    
+    # Filtros
+    status_filter = request.GET.get('status', '')
+    group_filter = request.GET.get('group', '')
+    groups_filter = request.GET.get('groups', '')  # Nuevo: filtro de múltiples grupos
+    subject_filter = request.GET.get('subject', '')
+    time_filter = request.GET.get('time', '')
+    sort_by = request.GET.get('sort', 'due_date')
+    
+    # En modo separado, preseleccionar el grupo activo si no hay filtro
+    if preselect_active_group and not group_filter and not groups_filter and request.user.last_active_group_id:
+        group_filter = str(request.user.last_active_group_id)
+    
+    tasks, group_filter, selected_group_ids = get_unified_tasks_queryset(
+        request, user_group_ids, group_filter, groups_filter
+    )
+    
+    # Obtener los objetos de grupo para mostrar sus nombres
+    filtered_groups = []
+    if selected_group_ids:
+        filtered_groups = list(Group.objects.filter(id__in=selected_group_ids).values_list('name', flat=True))
+    
+    # Total con los filtros (un COUNT); la página solo trae las primeras tareas
+    task_count = tasks.count()
+    
+    # Primera página; las siguientes se cargan con unified_tasks_page
+    tasks, next_cursor = paginate_tasks(
+        tasks, sort_by, request.GET.get('cursor'), settings.TASKS_PAGE_SIZE
+    )
+    next_page_url = get_next_page_url(
+        request, 'unified_tasks_page', next_cursor,
+        **({'group': group_filter} if group_filter and group_filter != 'multiple' else {})
+    )
+    
+    # Obtener todas las materias de todos los grupos
+    subjects = Subject.objects.filter(group_id__in=user_group_ids).select_related('group')
+    
+    # Crear diccionario con roles del usuario en cada grupo
+    user_roles = get_user_roles(user_groups)
     
     # Verificar si el usuario puede crear tareas (al menos en un grupo)
     can_create_in_any_group = False
@@ -172,6 +182,8 @@ def unified_tasks_view(request, user_groups, preselect_active_group=False):
     
     context = {
         'tasks': tasks,
+        'task_count': task_count,
+        'next_page_url': next_page_url,
         'user_groups': user_groups,
         'subjects': subjects,
         'can_create': can_create_in_any_group,
@@ -189,6 +201,35 @@ def unified_tasks_view(request, user_groups, preselect_active_group=False):
     return render(request, 'tasks/unified_tasks.html', context)
 
 
+def render_tasks_page(request, template_name, tasks, next_page_url, context):
+    """Fragmento HTML con una página de tareas; la URL siguiente va en un header"""
+    context['tasks'] = tasks
+    response = render(request, template_name, context)
+    response['X-Next-Page'] = next_page_url
+    return response
+
+
+@login_required
+def unified_tasks_page(request):
+    """Fragmento con la siguiente página de la vista unificada (scroll infinito)"""
+    user_groups = GroupMember.objects.filter(user=request.user).select_related('group')
+    user_group_ids = [membership.group_id for membership in user_groups]
+    sort_by = request.GET.get('sort', 'due_date')
+
+    tasks, _, _ = get_unified_tasks_queryset(
+        request, user_group_ids, request.GET.get('group', ''), request.GET.get('groups', '')
+    )
+    tasks, next_cursor = paginate_tasks(
+        tasks, sort_by, request.GET.get('cursor'), settings.TASKS_PAGE_SIZE
+    )
+
+    return render_tasks_page(
+        request, 'tasks/partials/unified_task_cards.html', tasks,
+        get_next_page_url(request, 'unified_tasks_page', next_cursor),
+        {'user_roles': get_user_roles(user_groups)},
+    )
+
+
 @login_required
 def group_tasks(request, group_id):
     """Ver tareas de un grupo específico"""
@@ -207,75 +248,20 @@ def group_tasks(request, group_id):
             request.user.save(update_fields=['last_active_group_id'])
     
     # Filtros
-    from datetime import timedelta
-    today = timezone.now().date()
-    
     status_filter = request.GET.get('status', '')
     subject_filter = request.GET.get('subject', '')
     time_filter = request.GET.get('time', '')
     sort_by = request.GET.get('sort', 'due_date')
     
-    from .models import TaskCompletion
-    from django.db.models import Exists, OuterRef, Q
+    tasks = get_group_tasks_queryset(request, group)
+    # Total con los filtros (un COUNT); la página solo trae las primeras tareas
+    task_count = tasks.count()
     
-    # Obtener tareas y anotar con el estado personal del usuario
-    tasks = Task.objects.filter(group=group).select_related('subject', 'created_by').annotate(
-        user_completed=Exists(
-            TaskCompletion.objects.filter(
-                task=OuterRef('pk'),
-                user=request.user,
-                completed=True
-            )
-        )
+    # Primera página; las siguientes se cargan con group_tasks_page
+    tasks, next_cursor = paginate_tasks(
+        tasks, sort_by, request.GET.get('cursor'), settings.TASKS_PAGE_SIZE
     )
-    
-    # Filtro por estado
-    if status_filter == 'completed':
-        # Solo completadas
-        tasks = tasks.filter(user_completed=True).exclude(status='archived')
-    elif status_filter == 'pending':
-        # Solo pendientes (no completadas, no archivadas)
-        tasks = tasks.filter(Q(user_completed=False) | Q(user_completed__isnull=True), status='pending')
-    elif status_filter == 'archived':
-        # Solo archivadas
-        tasks = tasks.filter(status='archived')
-    else:
-        # Por defecto: mostrar solo activas (pendientes y vencidas recientes, NO archivadas)
-        tasks = tasks.exclude(status='archived')
-    
-    # Filtro por materia
-    if subject_filter and subject_filter != 'all':
-        tasks = tasks.filter(subject_id=subject_filter)
-    
-    # Filtro por tiempo (solo si NO estamos viendo archivadas)
-    if status_filter != 'archived':
-        if not time_filter:
-            # Sin filtro de tiempo: mostrar SOLO pendientes (NO vencidas, NO archivadas)
-            tasks = tasks.filter(due_date__gte=today)
-        elif time_filter == 'today':
-            tasks = tasks.filter(due_date=today)
-        elif time_filter == 'tomorrow':
-            tasks = tasks.filter(due_date=today + timedelta(days=1))
-        elif time_filter == 'this_week':
-            week_end = today + timedelta(days=(6 - today.weekday()))
-            tasks = tasks.filter(due_date__gte=today, due_date__lte=week_end)
-        elif time_filter == 'next_week':
-            next_week_start = today + timedelta(days=(7 - today.weekday()))
-            next_week_end = next_week_start + timedelta(days=6)
-            tasks = tasks.filter(due_date__gte=next_week_start, due_date__lte=next_week_end)
-        elif time_filter == 'overdue':
-            # Mostrar TODAS las vencidas (completadas o no)
-            tasks = tasks.filter(due_date__lt=today)
-    
-    # Ordenamiento
-    if sort_by == 'due_date':
-        tasks = tasks.order_by('due_date', '-created_at')
-    elif sort_by == 'due_date_desc':
-        tasks = tasks.order_by('-due_date', '-created_at')
-    elif sort_by == 'created':
-        tasks = tasks.order_by('-created_at')
-    elif sort_by == 'subject':
-        tasks = tasks.order_by('subject__name', 'due_date')
+    next_page_url = get_next_page_url(request, 'group_tasks_page', next_cursor, {'group_id': group.id})
     
     subjects = Subject.objects.filter(group=group)
     
@@ -312,6 +298,8 @@ def group_tasks(request, group_id):
     context = {
         'group': group,
         'tasks': tasks,
+        'task_count': task_count,
+        'next_page_url': next_page_url,
         'subjects': subjects,
         'is_leader': is_leader,
         'can_create': can_create,
@@ -326,6 +314,48 @@ def group_tasks(request, group_id):
     return render(request, 'tasks/group_tasks.html', context)
 
 
+def get_group_tasks_queryset(request, group):
+    """Tareas filtradas de un grupo, anotadas con el estado personal del usuario"""
+    from .models import TaskCompletion
+    from django.db.models import Exists, OuterRef
+
+    tasks = Task.objects.filter(group=group).select_related('subject', 'created_by').annotate(
+        user_completed=Exists(
+            TaskCompletion.objects.filter(
+                task=OuterRef('pk'),
+                user=request.user,
+                completed=True
+            )
+        )
+    )
+    return filter_tasks(
+        tasks,
+        status_filter=request.GET.get('status', ''),
+        subject_filter=request.GET.get('subject', ''),
+        time_filter=request.GET.get('time', ''),
+    )
+
+
+@login_required
+def group_tasks_page(request, group_id):
+    """Fragmento con la siguiente página de tareas de un grupo (scroll infinito)"""
+    group = get_object_or_404(Group, id=group_id)
+    membership = get_object_or_404(GroupMember, group=group, user=request.user)
+
+    tasks, next_cursor = paginate_tasks(
+        get_group_tasks_queryset(request, group),
+        request.GET.get('sort', 'due_date'),
+        request.GET.get('cursor'),
+        settings.TASKS_PAGE_SIZE,
+    )
+
+    return render_tasks_page(
+        request, 'tasks/partials/group_task_cards.html', tasks,
+        get_next_page_url(request, 'group_tasks_page', next_cursor, {'group_id': group.id}),
+        {'group': group, 'is_leader': membership.role == 'leader'},
+    )
+
+
 @login_required
 def create_task(request, group_id):
     """Crear tarea"""
@@ -416,13 +446,13 @@ def create_task(request, group_id):
                 if has_attachments:
                     files = request.FILES.getlist('attachments')
                     for file in files:
-                        TaskRequestAttachment.objects.create(
+                        save_attachment(TaskRequestAttachment(
                             task_request=task_request,
                             file=file,
                             original_filename=file.name,
                             file_size=file.size,
                             file_type=file.content_type
-                        )
+                        ))
                 
                 # Notificar a los líderes
                 reason = 'con documentos adjuntos' if force_approval_by_documents else ''
@@ -456,6 +486,7 @@ def create_task(request, group_id):
                 task.description = censored_description
             
             task.save()
+            counters_on_task_created(task)
             
             # Procesar archivos adjuntos si hay
             if can_upload_documents and 'attachments' in request.FILES:
@@ -478,7 +509,7 @@ def create_task(request, group_id):
                     else:
                         attachment.status = 'approved'
                     
-                    attachment.save()
+                    save_attachment(attachment)
             
             # Registrar en tracking
             log_task_action(
@@ -493,16 +524,19 @@ def create_task(request, group_id):
             )
             
             # Notificar a todos los miembros
-            members = GroupMember.objects.filter(group=group).exclude(user=request.user)
-            for member in members:
-                create_notification(
-                    recipient=member.user,
-                    notification_type='general',
-                    title='Nueva tarea',
-                    message=f'{request.user.nombre} agregó tarea de {task.subject.name if task.subject else "sin materia"}',
-                    sender=request.user,
-                    action_url=reverse('group_tasks', kwargs={'group_id': group.id})
-                )
+            notify_group_members(
+                group,
+                notification_type='general',
+                title='Nueva tarea',
+                message=f'{request.user.nombre} agregó tarea de {task.subject.name if task.subject else "sin materia"}',
+                sender=request.user,
+                action_url=reverse('group_tasks', kwargs={'group_id': group.id}),
+                content_object=task,
+                exclude=[request.user],
+                coalesce=True,
+                coalesce_key='task_created',
+                digest_message=f'{request.user.nombre} agregó {{count}} tareas',
+            )
             
             # Redirigir según modo multigrupo
             if request.user.multigroup_mode == 'unified':
@@ -531,8 +565,8 @@ def task_detail(request, task_id):
     """Ver detalles de una tarea"""
     task = get_object_or_404(Task, id=task_id)
     
-    # Actualizar estado de la tarea
-    task.update_status()
+    # Estado calculado en memoria (el planificador persiste los cambios de estado)
+    task.status = task.get_computed_status()
     
     try:
         membership = GroupMember.objects.get(group=task.group, user=request.user)
@@ -619,9 +653,8 @@ def edit_task(request, task_id):
     """Editar tarea"""
     task = get_object_or_404(Task, id=task_id)
     
-    # Actualizar estado y bloquear edición de archivadas
-    task.update_status()
-    if task.status == 'archived':
+    # Bloquear edición de archivadas (estado calculado, sin escribir)
+    if task.get_computed_status() == 'archived':
         return redirect('task_detail', task_id=task.id)
     
     try:
@@ -768,13 +801,13 @@ def edit_task(request, task_id):
                     files = request.FILES.getlist('attachments')
                     
                     for file in files:
-                        TaskEditAttachment.objects.create(
+                        save_attachment(TaskEditAttachment(
                             edit_request=edit_request,
                             file=file,
                             original_filename=file.name,
                             file_size=file.size,
                             file_type=file.content_type
-                        )
+                        ))
                 
                 # Notificar a los líderes
                 notify_group_leaders(
@@ -827,28 +860,26 @@ def edit_task(request, task_id):
                 
                 updated_task.save()
                 
-                # Registrar cambios en tracking
+                # Cambios a registrar en tracking (campo, antes, después)
                 changes = []
                 if old_values['description'] != updated_task.description:
-                    log_task_action(task, 'edited', request.user, 'description', old_values['description'], updated_task.description)
-                    changes.append('description')
+                    changes.append(('description', old_values['description'], updated_task.description))
                 if old_values['subject_id'] != updated_task.subject_id:
                     old_subject = Subject.objects.get(id=old_values['subject_id']).name if old_values['subject_id'] else 'Sin materia'
                     new_subject = updated_task.subject.name if updated_task.subject else 'Sin materia'
-                    log_task_action(task, 'edited', request.user, 'subject', old_subject, new_subject)
-                    changes.append('subject')
+                    changes.append(('subject', old_subject, new_subject))
                 if old_values['due_date'] != updated_task.due_date:
-                    log_task_action(task, 'edited', request.user, 'due_date', str(old_values['due_date']), str(updated_task.due_date))
-                    changes.append('due_date')
+                    changes.append(('due_date', str(old_values['due_date']), str(updated_task.due_date)))
+                    # Cambia qué miembros la tienen como vencida
+                    refresh_task_counters(group_ids=[updated_task.group_id])
                 if old_values['assigned_date'] != updated_task.assigned_date:
-                    log_task_action(task, 'edited', request.user, 'assigned_date', str(old_values['assigned_date']), str(updated_task.assigned_date))
-                    changes.append('assigned_date')
+                    changes.append(('assigned_date', str(old_values['assigned_date']), str(updated_task.assigned_date)))
                 if old_values['priority'] != updated_task.priority:
-                    log_task_action(task, 'edited', request.user, 'priority', old_values['priority'], updated_task.priority)
-                    changes.append('priority')
+                    changes.append(('priority', old_values['priority'], updated_task.priority))
                 
                 # Procesar documentos eliminados - ELIMINAR INMEDIATAMENTE
                 deleted_attachments = []
+                deleted_filenames = []
                 if 'delete_attachments' in request.POST:
                     from .models import TaskAttachment
                     delete_ids = request.POST.getlist('delete_attachments')
@@ -863,18 +894,19 @@ def edit_task(request, task_id):
                                 except:
                                     pass
                             attachment.delete()
-                            log_task_action(task, 'document_deleted', request.user, 'attachment', attachment.original_filename, '')
+                            deleted_filenames.append(attachment.original_filename)
                         except:
                             pass
                 
                 # Crear acción revertible con documentos eliminados (pero ya borrados físicamente)
+                revertible = None
                 if changes or deleted_attachments:
                     snapshot_data = old_values.copy()
                     if deleted_attachments:
                         snapshot_data['deleted_attachments'] = deleted_attachments
                         snapshot_data['deleted_permanently'] = True  # Marcar que ya se eliminaron
                     
-                    create_revertible_action(
+                    revertible = create_revertible_action(
                         action_type='task_edit',
                         group=task.group,
                         performed_by=request.user,
@@ -882,6 +914,12 @@ def edit_task(request, task_id):
                         task=task
                     )
                 
+                # Registrar en tracking, enlazado a la acción revertible
+                for field, old_value, new_value in changes:
+                    log_task_action(task, 'edited', request.user, field, old_value, new_value, revertible_action=revertible)
+                for filename in deleted_filenames:
+                    log_task_action(task, 'document_deleted', request.user, 'attachment', filename, '', revertible_action=revertible)
+                
                 # Procesar nuevos documentos
                 if can_upload_documents and 'attachments' in request.FILES:
                     from .models import TaskAttachment
@@ -929,7 +967,7 @@ def edit_task(request, task_id):
                         else:
                             attachment.status = 'approved'
                         
-                        attachment.save()
+                        save_attachment(attachment)
                         log_task_action(task, 'document_added', request.user, 'attachment', '', file.name)
                 
                 # Solo redirigir si no hay errores
@@ -967,8 +1005,8 @@ def delete_task(request, task_id):
     """Eliminar tarea"""
     task = get_object_or_404(Task, id=task_id)
     
-    # Actualizar estado
-    task.update_status()
+    # Estado calculado en memoria (el planificador persiste los cambios de estado)
+    task.status = task.get_computed_status()
     
     try:
         membership = GroupMember.objects.get(group=task.group, user=request.user)
@@ -1015,6 +1053,7 @@ def delete_task(request, task_id):
     )
     
     # Eliminar tarea
+    counters_on_task_deleted(task)
     task.delete()
     
     # Registrar eliminación en tracking DESPUÉS de eliminar
@@ -1048,8 +1087,8 @@ def toggle_task_status(request, task_id):
     except GroupMember.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'No tienes acceso a esta tarea'}, status=403)
     
-    # Actualizar estado de la tarea antes de verificar
-    task.update_status()
+    # Calcular estado de la tarea antes de verificar (sin escribir)
+    task.status = task.get_computed_status()
     
     # Verificar si la tarea puede ser completada
     if not task.can_be_completed:
@@ -1068,15 +1107,17 @@ def toggle_task_status(request, task_id):
     
     # Alternar el estado
     if completion.completed:
+        toggled_at = completion.completed_at
         completion.completed = False
         completion.completed_at = None
         action = 'reopened'
     else:
         completion.completed = True
-        completion.completed_at = timezone.now()
+        completion.completed_at = toggled_at = timezone.now()
         action = 'completed'
     
     completion.save()
+    counters_on_completion_toggled(task, request.user, completion.completed, toggled_at)
     
     # Registrar cambio de estado personal
     log_task_action(
@@ -1130,6 +1171,7 @@ def approve_task_request(request, request_id):
         created_by=task_request.requested_by,
         status='pending'
     )
+    counters_on_task_created(task)
     
     # Registrar en tracking
     log_task_action(
@@ -1155,16 +1197,20 @@ def approve_task_request(request, request_id):
     )
     
     # Notificar a todos los miembros
-    members = GroupMember.objects.filter(group=task_request.group).exclude(user__in=[request.user, task_request.requested_by])
-    for member in members:
-        create_notification(
-            recipient=member.user,
-            notification_type='general',
-            title='Nueva tarea',
-            message=f'{task_request.requested_by.nombre} agregó tarea de {task.subject.name}',
-            sender=task_request.requested_by,
-            action_url=reverse('task_detail', kwargs={'task_id': task.id})
-        )
+    notify_group_members(
+        task_request.group,
+        notification_type='general',
+        title='Nueva tarea',
+        message=f'{task_request.requested_by.nombre} agregó tarea de {task.subject.name}',
+        sender=task_request.requested_by,
+        action_url=reverse('task_detail', kwargs={'task_id': task.id}),
+        content_object=task,
+        exclude=[request.user, task_request.requested_by],
+        coalesce=True,
+        coalesce_key='task_created',
+        digest_message=f'{task_request.requested_by.nombre} agregó {{count}} tareas',
+        digest_url=reverse('group_tasks', kwargs={'group_id': task_request.group.id}),
+    )
     
     return redirect('group_requests', group_id=task_request.group.id)
 
@@ -1253,10 +1299,13 @@ def approve_edit_request(request, request_id):
             setattr(task, field, value)
     
     task.save()
+    if 'due_date' in old_values:
+        refresh_task_counters(group_ids=[task.group_id])
     
     # Crear acción revertible
+    revertible = None
     if old_values:
-        create_revertible_action(
+        revertible = create_revertible_action(
             action_type='task_edit',
             group=task.group,
             performed_by=edit_request.requested_by,
@@ -1279,7 +1328,8 @@ def approve_edit_request(request, request_id):
                     field_changed='subject',
                     old_value=old_subject_name,
                     new_value=new_subject_name,
-                    details={'approved_by': request.user.id}
+                    details={'approved_by': request.user.id},
+                    revertible_action=revertible
                 )
             else:
                 log_task_action(
@@ -1289,7 +1339,8 @@ def approve_edit_request(request, request_id):
                     field_changed=field,
                     old_value=str(old_value),
                     new_value=str(new_value),
-                    details={'approved_by': request.user.id}
+                    details={'approved_by': request.user.id},
+                    revertible_action=revertible
                 )
     
     # Notificar al solicitante
@@ -1350,7 +1401,6 @@ def reject_edit_request(request, request_id):
 def approve_task_request(request, request_id):
     """Aprobar solicitud de creación de tarea"""
     from .models import TaskRequest, TaskAttachment, TaskRequestAttachment
-    from django.core.files import File
     import shutil
     import os
     
@@ -1379,6 +1429,7 @@ def approve_task_request(request, request_id):
         created_by=task_request.requested_by,
         status='pending'
     )
+    counters_on_task_created(task)
     
     # Copiar archivos adjuntos de la solicitud a la tarea
     temp_attachments = TaskRequestAttachment.objects.filter(task_request=task_request)
@@ -1394,9 +1445,8 @@ def approve_task_request(request, request_id):
                 status='approved'
             )
             
-            # Copiar el archivo
-            with temp_att.file.open('rb') as f:
-                task_attachment.file.save(temp_att.original_filename, File(f), save=True)
+            # Mover el archivo a la tarea sin copiar sus bytes
+            promote_attachment(temp_att.file, task_attachment, temp_att.original_filename)
     
     # Marcar solicitud como aprobada
     task_request.status = 'approved'
@@ -1429,16 +1479,20 @@ def approve_task_request(request, request_id):
     )
     
     # Notificar a todos los miembros del grupo
-    members = GroupMember.objects.filter(group=task_request.group).exclude(user__in=[request.user, task_request.requested_by])
-    for member in members:
-        create_notification(
-            recipient=member.user,
-            notification_type='general',
-            title='Nueva tarea',
-            message=f'Nueva tarea de {task.subject.name}',
-            sender=request.user,
-            action_url=reverse('task_detail', kwargs={'task_id': task.id})
-        )
+    notify_group_members(
+        task_request.group,
+        notification_type='general',
+        title='Nueva tarea',
+        message=f'Nueva tarea de {task.subject.name}',
+        sender=request.user,
+        action_url=reverse('task_detail', kwargs={'task_id': task.id}),
+        content_object=task,
+        exclude=[request.user, task_request.requested_by],
+        coalesce=True,
+        coalesce_key='task_request_approved',
+        digest_message='{count} tareas nuevas',
+        digest_url=reverse('group_tasks', kwargs={'group_id': task_request.group.id}),
+    )
     
     return redirect('group_requests', group_id=task_request.group.id)
 
@@ -1493,7 +1547,6 @@ def reject_task_request(request, request_id):
 def approve_edit_request(request, request_id):
     """Aprobar solicitud de edición de tarea"""
     from .models import TaskEditRequest, TaskAttachment, TaskEditAttachment
-    from django.core.files import File
     
     edit_request = get_object_or_404(TaskEditRequest, id=request_id)
     task = edit_request.task
@@ -1523,6 +1576,8 @@ def approve_edit_request(request, request_id):
             setattr(task, field, new_value)
     
     task.save()
+    if 'due_date' in proposed_changes:
+        refresh_task_counters(group_ids=[task.group_id])
     
     # Eliminar documentos marcados
     if edit_request.documents_to_delete:
@@ -1550,9 +1605,8 @@ def approve_edit_request(request, request_id):
                 status='approved'
             )
             
-            # Copiar el archivo
-            with temp_att.file.open('rb') as f:
-                task_attachment.file.save(temp_att.original_filename, File(f), save=True)
+            # Mover el archivo a la tarea sin copiar sus bytes
+            promote_attachment(temp_att.file, task_attachment, temp_att.original_filename)
             
             log_task_action(task, 'document_added', request.user, 'attachment', '', temp_att.original_filename)
     
@@ -1,10 +1,13 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import FileResponse, HttpResponseForbidden, Http404
+from django.db.models import OuterRef, Subquery
+from django.http import HttpResponseForbidden, Http404
 from django.utils import timezone
+from .downloads import serve_attachment_file
 from .models import Task, TaskAttachment
 from .forms import TaskAttachmentForm
+from .storage import save_attachment
 from apps.groups.models import GroupMember
 import os
 
@@ -61,7 +64,7 @@ def upload_attachment(request, task_id):
                 attachment.status = 'approved'
                 messages.success(request, 'Documento subido exitosamente')
             
-            attachment.save()
+            save_attachment(attachment)
             
             # TODO: Crear notificación para el líder si requiere aprobación
             
@@ -81,18 +84,20 @@ def upload_attachment(request, task_id):
 @login_required
 def download_attachment(request, attachment_id):
     """Descargar un documento adjunto"""
-    attachment = get_object_or_404(TaskAttachment, id=attachment_id)
-    task = attachment.task
-    group = task.group
+    # Adjunto y rol del usuario en el grupo de la tarea en una sola consulta
+    member_role = GroupMember.objects.filter(group=OuterRef('task__group'), user=request.user).values('role')[:1]
+    attachment = get_object_or_404(
+        TaskAttachment.objects.annotate(member_role=Subquery(member_role)),
+        id=attachment_id,
+    )
     
     # Verificar que el usuario es miembro del grupo
-    if not GroupMember.objects.filter(group=group, user=request.user).exists():
+    if attachment.member_role is None:
         return HttpResponseForbidden('No tienes acceso a este documento')
     
     # Verificar que el documento está aprobado (o es el uploader/líder)
-    membership = GroupMember.objects.get(group=group, user=request.user)
-    is_leader = membership.role == 'leader'
-    is_uploader = attachment.uploaded_by == request.user
+    is_leader = attachment.member_role == 'leader'
+    is_uploader = attachment.uploaded_by_id == request.user.id
     
     if attachment.status != 'approved' and not (is_leader or is_uploader):
         return HttpResponseForbidden('Este documento no está disponible')
@@ -100,20 +105,15 @@ def download_attachment(request, attachment_id):
     # Verificar que el archivo no fue eliminado físicamente
     if attachment.file_deleted:
         messages.error(request, 'Este documento ya no está disponible (tarea archivada)')
-        return redirect('task_detail', task_id=task.id)
+        return redirect('task_detail', task_id=attachment.task_id)
     
     # Verificar que el archivo existe
     if not attachment.file:
         raise Http404('Archivo no encontrado')
     
     try:
-        # Servir el archivo
-        response = FileResponse(
-            attachment.file.open('rb'),
-            as_attachment=True,
-            filename=attachment.original_filename
-        )
-        return response
+        # Servir el archivo (o delegarlo al servidor frontal, ver downloads.py)
+        return serve_attachment_file(request, attachment.file, attachment.original_filename)
     except FileNotFoundError:
         raise Http404('Archivo no encontrado en el servidor')
 
@@ -141,8 +141,8 @@ def delete_attachment(request, attachment_id):
         return redirect('task_detail', task_id=task.id)
     
     if request.method == 'POST':
-        # Eliminar el archivo físico
-        if attachment.file:
+        # Eliminar el archivo físico (si no lo borró ya la limpieza de tareas archivadas)
+        if attachment.file and not attachment.file_deleted:
             try:
                 attachment.file.delete()
             except:
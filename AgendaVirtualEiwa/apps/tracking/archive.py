@@ -0,0 +1,243 @@
+# Archivo frío del historial de tareas
+#
+# archive_task_history mueve las filas de TaskHistory más antiguas que la
+# ventana caliente (TASK_HISTORY_HOT_MONTHS) a segmentos JSONL comprimidos en
+# TASK_HISTORY_ARCHIVE_DIR, uno por grupo y mes:
+#
+#     <dir>/<group_id>/<AAAA-MM>.jsonl.gz
+#
+# Los segmentos solo crecen: cada lote se agrega como un miembro gzip nuevo
+# (gzip lee los miembros concatenados como un solo flujo). Las filas se borran
+# de la base de datos después de escribirlas; si el proceso se corta entre
+# ambos pasos, la fila queda repetida y el lector la descarta por id.
+#
+# get_history_page() devuelve una página del historial de un grupo o tarea y
+# continúa en los segmentos cuando la base de datos ya no tiene más filas.
+# Las dos fuentes se recorren por (timestamp, id) descendente y la página se
+# continúa desde esa clave: bulk_create deja muchas filas con el mismo
+# timestamp y un cursor solo por fecha saltaría las que quedan en el corte.
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import TaskHistory
+
+
+ARCHIVE_FIELDS = [
+    'id', 'task_id', 'task_title', 'group_id', 'action', 'user_id', 'timestamp',
+    'field_changed', 'old_value', 'new_value', 'details',
+]
+SEGMENT_RE = re.compile(r'^(\d{4})-(\d{2})\.jsonl\.gz$')
+
+
+def get_archive_dir():
+    return settings.TASK_HISTORY_ARCHIVE_DIR
+
+
+def month_start(month):
+    """Inicio del mes (UTC) como datetime"""
+    return datetime(month[0], month[1], 1, tzinfo=dt_timezone.utc)
+
+
+def get_month(timestamp):
+    """(año, mes) en UTC del timestamp"""
+    timestamp = timestamp.astimezone(dt_timezone.utc)
+    return timestamp.year, timestamp.month
+
+
+def next_month(month):
+    year, number = month
+    return (year + 1, 1) if number == 12 else (year, number + 1)
+
+
+def get_cutoff(hot_months, now=None):
+    """Inicio del mes más antiguo que se conserva en la base de datos"""
+    now = (now or datetime.now(dt_timezone.utc)).astimezone(dt_timezone.utc)
+    index = now.year * 12 + now.month - 1 - hot_months
+    return month_start((index // 12, index % 12 + 1))
+
+
+def get_segment_path(group_id, month):
+    return os.path.join(get_archive_dir(), str(group_id), f'{month[0]}-{month[1]:02d}.jsonl.gz')
+
+
+def get_segment_months(group_id):
+    """Meses archivados de un grupo, del más reciente al más antiguo"""
+    try:
+        names = os.listdir(os.path.join(get_archive_dir(), str(group_id)))
+    except FileNotFoundError:
+        return []
+    months = []
+    for name in names:
+        match = SEGMENT_RE.match(name)
+        if match:
+            months.append((int(match.group(1)), int(match.group(2))))
+    return sorted(months, reverse=True)
+
+
+def append_segment(group_id, month, rows):
+    """Agrega filas (diccionarios de ARCHIVE_FIELDS) al segmento de un grupo y mes"""
+    path = get_segment_path(group_id, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='ab') as segment:
+            for row in rows:
+                line = dict(row, timestamp=row['timestamp'].isoformat())
+                segment.write(json.dumps(line, ensure_ascii=False).encode('utf-8') + b'\n')
+        raw.flush()
+        # Las filas se borran de la base de datos después: el segmento debe estar en disco
+        os.fsync(raw.fileno())
+
+
+def read_segment(group_id, month):
+    """Filas de un segmento, de la más reciente a la más antigua y sin repetidas"""
+    try:
+        with gzip.open(get_segment_path(group_id, month), 'rt', encoding='utf-8') as segment:
+            rows = {}
+            for line in segment:
+                if line.strip():
+                    row = json.loads(line)
+                    row['timestamp'] = parse_datetime(row['timestamp'])
+                    rows[row['id']] = row
+    except FileNotFoundError:
+        return []
+    return sorted(rows.values(), key=lambda row: (row['timestamp'], row['id']), reverse=True)
+
+
+def archive_task_history(cutoff, chunk_size=5000, dry_run=False):
+    """
+    Mueve el historial anterior a cutoff a los segmentos y lo borra por lotes
+
+    Returns:
+        Tupla (filas archivadas, segmentos escritos)
+    """
+    old_rows = TaskHistory.objects.filter(timestamp__lt=cutoff)
+    if dry_run:
+        # iterator() usa un cursor del servidor: dentro de una transacción no cambia
+        # de conexión con el pooler de Neon (PgBouncer en modo transacción)
+        with transaction.atomic():
+            segments = {
+                (row['group_id'], get_month(row['timestamp']))
+                for row in old_rows.values('group_id', 'timestamp').iterator(chunk_size=chunk_size)
+            }
+            return old_rows.count(), len(segments)
+
+    archived = 0
+    segments = set()
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                old_rows.filter(id__gt=last_id).order_by('id').values(*ARCHIVE_FIELDS)[:chunk_size]
+            )
+            if not rows:
+                break
+
+            by_segment = {}
+            for row in rows:
+                key = (row['group_id'], get_month(row['timestamp']))
+                by_segment.setdefault(key, []).append(row)
+            for (group_id, month), segment_rows in by_segment.items():
+                append_segment(group_id, month, segment_rows)
+
+            ids = [row['id'] for row in rows]
+            TaskHistory.objects.filter(id__in=ids).delete()
+
+        archived += len(rows)
+        segments.update(by_segment)
+        last_id = ids[-1]
+    return archived, len(segments)
+
+
+def iter_archived_history(group_id, before=None, task=None, after=None):
+    """
+    Filas archivadas de un grupo (o de una tarea), de la más reciente a la más antigua
+
+    Con task solo se leen los meses desde la creación de la tarea; con after
+    se detiene al llegar a filas anteriores a ese momento (sin leer más segmentos).
+    """
+    months = get_segment_months(group_id)
+    if before is not None:
+        months = [month for month in months if month_start(month) < before]
+    if task is not None:
+        oldest = get_month(task.created_at)
+        months = [month for month in months if month >= oldest]
+
+    for month in months:
+        if after is not None and month_start(next_month(month)) <= after:
+            return
+        for row in read_segment(group_id, month):
+            if before is not None and row['timestamp'] >= before:
+                continue
+            if after is not None and row['timestamp'] < after:
+                return
+            if task is not None and row['task_id'] != task.id:
+                continue
+            yield row
+
+
+def build_archived_entries(rows):
+    """
+    TaskHistory sin guardar a partir de filas archivadas, para las mismas plantillas
+
+    Usuarios y tareas se cargan con una consulta cada uno; si la tarea ya no
+    existe, la entrada queda sin tarea (solo con task_title).
+    """
+    from apps.tasks.models import Task
+
+    users = get_user_model().objects.in_bulk({row['user_id'] for row in rows if row['user_id']})
+    tasks = Task.objects.in_bulk({row['task_id'] for row in rows if row['task_id']})
+
+    entries = []
+    for row in rows:
+        entry = TaskHistory(**row)
+        entry.user = users.get(row['user_id'])
+        entry.task = tasks.get(row['task_id'])
+        entries.append(entry)
+    return entries
+
+
+def get_history_page(group, task=None, before=None, limit=50):
+    """
+    Una página del historial: primero la base de datos y luego los segmentos
+
+    Args:
+        group: Grupo del historial
+        task: Limitar a una tarea (opcional)
+        before: Solo entradas anteriores a esta clave (timestamp, id) (cursor de la página)
+        limit: Entradas por página
+
+    Returns:
+        Lista de TaskHistory de la más reciente a la más antigua
+    """
+    history = TaskHistory.objects.filter(group=group).select_related('user', 'task').order_by('-timestamp', '-id')
+    if task is not None:
+        history = history.filter(task=task)
+    if before is not None:
+        timestamp, entry_id = before
+        history = history.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=entry_id))
+    entries = list(history[:limit])
+
+    if len(entries) < limit:
+        last = (entries[-1].timestamp, entries[-1].id) if entries else before
+        # before de iter_archived_history excluye el instante; se incluye y se desempata por id
+        archived_before = last[0] + timedelta(microseconds=1) if last else None
+        archived = []
+        hot_ids = {entry.id for entry in entries}
+        for row in iter_archived_history(group.id, before=archived_before, task=task):
+            if last is not None and (row['timestamp'], row['id']) >= last:
+                continue
+            if row['id'] not in hot_ids:
+                archived.append(row)
+                if len(entries) + len(archived) >= limit:
+                    break
+        entries.extend(build_archived_entries(archived))
+    return entries
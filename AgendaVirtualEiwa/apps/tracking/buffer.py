@@ -0,0 +1,141 @@
+# Buffer de auditoría por petición
+#
+# Durante una petición, log_task_action, log_group_activity y log_user_action
+# no escriben de inmediato: guardan la fila en el buffer de la petición (solo
+# cuando la transacción en curso se confirma, vía transaction.on_commit) y
+# AuditBufferMiddleware las inserta al final con un bulk_create por modelo.
+# Con AUDIT_LOG_ASYNC = True el lote se entrega a un hilo escritor y la
+# respuesta no espera ningún INSERT de auditoría.
+# Fuera de una petición (comandos, planificador) se escribe directamente.
+import atexit
+import queue
+import threading
+import traceback
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+
+
+_current_buffer = ContextVar('audit_buffer', default=None)
+
+
+class AuditBuffer:
+    """Filas de auditoría pendientes de una petición"""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, row):
+        self.rows.append(row)
+
+    def flush(self):
+        """Escribe (o entrega al hilo escritor) las filas acumuladas"""
+        rows, self.rows = self.rows, []
+        if not rows:
+            return
+        if settings.AUDIT_LOG_ASYNC:
+            get_writer().submit(rows)
+        else:
+            write_rows(rows)
+
+
+def start_buffer():
+    """Activa un buffer nuevo en el contexto actual y devuelve el token para restaurarlo"""
+    return _current_buffer.set(AuditBuffer())
+
+
+def get_buffer():
+    return _current_buffer.get()
+
+
+def stop_buffer(token):
+    _current_buffer.reset(token)
+
+
+def record(row):
+    """
+    Registra una fila de auditoría
+
+    Con buffer activo la fila entra al confirmarse la transacción (si se
+    revierte, la auditoría también se descarta); sin buffer se guarda ya.
+    """
+    buffer = get_buffer()
+    if buffer is None:
+        row.save()
+        return
+    # Solo se conservan los *_id: el objeto relacionado puede eliminarse antes del flush
+    row._state.fields_cache.clear()
+    transaction.on_commit(lambda: buffer.add(row))
+
+
+def write_rows(rows):
+    """Inserta las filas con un bulk_create por modelo"""
+    by_model = defaultdict(list)
+    for row in rows:
+        by_model[type(row)].append(row)
+
+    for model, model_rows in by_model.items():
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(model_rows)
+                # Las FK son diferidas: se verifican aquí y no al confirmar
+                connection.check_constraints()
+        except IntegrityError:
+            # Alguna fila apunta a un objeto eliminado después en la misma
+            # petición: se guardan una por una y se descartan las inválidas
+            for row in model_rows:
+                try:
+                    with transaction.atomic():
+                        row.save()
+                        connection.check_constraints()
+                except IntegrityError:
+                    pass
+
+
+class AuditWriter:
+    """Hilo que escribe los lotes de auditoría fuera del ciclo de la petición"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name='audit-writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, rows):
+        self.queue.put(rows)
+
+    def run(self):
+        while True:
+            rows = self.queue.get()
+            if rows is None:
+                break
+            try:
+                close_old_connections()
+                write_rows(rows)
+            except Exception:
+                # Un fallo de auditoría no debe detener el hilo
+                traceback.print_exc()
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+    def stop(self, timeout=10):
+        """Escribe lo pendiente y detiene el hilo (al salir del proceso)"""
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+
+_writer_lock = threading.Lock()
+_writer = None
+
+
+def get_writer():
+    """Hilo escritor del proceso (se inicia la primera vez)"""
+    global _writer
+
+    with _writer_lock:
+        if _writer is None or not _writer.thread.is_alive():
+            _writer = AuditWriter()
+        return _writer
@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.tracking.archive import archive_task_history, get_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Mueve el historial de tareas antiguo a segmentos JSONL comprimidos (uno por grupo y mes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=settings.TASK_HISTORY_HOT_MONTHS,
+            help='Meses completos a conservar en la base de datos (0 = no archivar)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Filas por lote (cada lote se escribe y se borra en una transacción)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostrar cuántas filas se archivarían sin modificar nada',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        if options['months'] <= 0:
+            # Opcional: mientras no se configure, el trabajo programado no hace nada
+            self.stdout.write(self.style.NOTICE(
+                'El archivo del historial está desactivado (TASK_HISTORY_HOT_MONTHS = 0)'
+            ))
+            return
+
+        cutoff = get_cutoff(options['months'])
+        archived, segments = archive_task_history(
+            cutoff, chunk_size=options['chunk_size'], dry_run=options['dry_run']
+        )
+
+        verb = 'a archivar' if options['dry_run'] else 'archivadas'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Proceso completado en {time.monotonic() - started:.3f}s:'
+                f'\n  - {archived} filas {verb} (anteriores a {cutoff:%Y-%m-%d})'
+                f'\n  - {segments} segmentos'
+            )
+        )
@@ -1,46 +1,73 @@
+import time
+
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from apps.tasks.models import Task, TaskAttachment
-import os
+from apps.core.models import ScheduledJob
+from apps.tracking.purge import purge_archived_attachment_files
 
 
 class Command(BaseCommand):
     help = 'Elimina archivos físicos de tareas archivadas pero mantiene metadata'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Adjuntos por lote (por defecto 500)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Hilos para eliminar archivos del disco (por defecto 4)',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignorar el checkpoint y recorrer todos los adjuntos',
+        )
+
     def handle(self, *args, **options):
-        # Obtener tareas archivadas con documentos
-        archived_tasks = Task.objects.filter(status='archived')
-        
-        total_files = 0
-        deleted_files = 0
-        
-        self.stdout.write(f'Buscando archivos en {archived_tasks.count()} tareas archivadas...')
-        
-        for task in archived_tasks:
-            attachments = TaskAttachment.objects.filter(task=task, file_deleted=False)
-            
-            for attachment in attachments:
-                total_files += 1
-                
-                if attachment.file:
-                    try:
-                        # Verificar si el archivo existe
-                        if os.path.exists(attachment.file.path):
-                            # Eliminar archivo físico
-                            os.remove(attachment.file.path)
-                            deleted_files += 1
-                            self.stdout.write(f'  ✓ Eliminado: {attachment.original_filename} (Tarea: {task.title})')
-                        
-                        # Marcar como eliminado en BD
-                        attachment.file_deleted = True
-                        attachment.deleted_at = timezone.now()
-                        attachment.save()
-                        
-                    except Exception as e:
-                        self.stdout.write(self.style.WARNING(f'  ✗ Error al eliminar {attachment.original_filename}: {e}'))
-        
+        started = time.monotonic()
+        # El checkpoint va en la base de datos: el disco de la app no sobrevive a un redeploy
+        self.job, _ = ScheduledJob.objects.get_or_create(name='cleanup_archived_files')
+
+        start_after = 0 if options['restart'] else self.read_checkpoint()
+        if start_after:
+            self.stdout.write(f'Retomando después del adjunto {start_after}...')
+
+        stats = purge_archived_attachment_files(
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            start_after=start_after,
+            on_chunk=self.report_chunk,
+        )
+
+        # Recorrido completo: la próxima ejecución empieza desde el principio
+        self.write_checkpoint({})
+
         self.stdout.write(
             self.style.SUCCESS(
-                f'\n✓ Limpieza completada: {deleted_files}/{total_files} archivos eliminados'
+                f'\n✓ Proceso completado en {time.monotonic() - started:.3f}s:'
+                f"\n  - {stats['marked']} adjuntos marcados como eliminados"
+                f"\n  - {stats['deleted']} archivos borrados ({stats['shared']} compartidos, {stats['missing']} no existían, {stats['error']} con error)"
             )
         )
+
+    def read_checkpoint(self):
+        try:
+            return int(self.job.checkpoint.get('last_id', 0))
+        except (AttributeError, TypeError, ValueError):
+            return 0
+
+    def write_checkpoint(self, checkpoint):
+        ScheduledJob.objects.filter(id=self.job.id).update(checkpoint=checkpoint)
+
+    def report_chunk(self, stats, elapsed, last_id):
+        self.write_checkpoint({'last_id': last_id})
+        files = stats['deleted'] + stats['missing'] + stats['error']
+        rate = files / elapsed if elapsed else 0
+        self.stdout.write(
+            f"  Lote {stats['chunks']}: {stats['marked']} adjuntos, "
+            f"{stats['deleted']} archivos borrados ({rate:.0f} archivos/s)"
+        )
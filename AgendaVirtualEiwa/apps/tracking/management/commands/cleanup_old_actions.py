@@ -1,55 +1,57 @@
+import time
+from datetime import timedelta
+
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datetime import timedelta
-from apps.tracking.models import RevertibleAction
-from apps.tasks.models import TaskAttachment
-import os
+from apps.tracking.purge import purge_revertible_actions
 
 
 class Command(BaseCommand):
     help = 'Limpia acciones reversibles mayores a 7 días y elimina archivos asociados'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help='Antigüedad en días a partir de la cual se eliminan las acciones (por defecto 7)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Acciones por lote (por defecto 1000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Hilos para eliminar archivos del disco (por defecto 4)',
+        )
+
     def handle(self, *args, **options):
-        # Calcular fecha límite (7 días atrás)
-        cutoff_date = timezone.now() - timedelta(days=7)
-        
-        # Obtener acciones antiguas
-        old_actions = RevertibleAction.objects.filter(
-            created_at__lt=cutoff_date,
-            is_reverted=False
+        started = time.monotonic()
+        cutoff = timezone.now() - timedelta(days=options['days'])
+
+        stats = purge_revertible_actions(
+            cutoff,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            on_chunk=self.report_chunk,
         )
-        
-        total_actions = old_actions.count()
-        deleted_files = 0
-        
-        self.stdout.write(f'Encontradas {total_actions} acciones antiguas para limpiar...')
-        
-        for action in old_actions:
-            # Si la acción tiene archivos eliminados en el snapshot, borrarlos físicamente
-            if action.action_type == 'task_edit' and action.snapshot_data:
-                # Buscar archivos que fueron marcados para eliminar
-                if 'deleted_attachments' in action.snapshot_data:
-                    for att_id in action.snapshot_data['deleted_attachments']:
-                        try:
-                            attachment = TaskAttachment.objects.get(id=att_id)
-                            if attachment.file:
-                                # Eliminar archivo físico
-                                if os.path.exists(attachment.file.path):
-                                    os.remove(attachment.file.path)
-                                    deleted_files += 1
-                                    self.stdout.write(f'  Archivo eliminado: {attachment.original_filename}')
-                            # Eliminar registro de BD
-                            attachment.delete()
-                        except TaskAttachment.DoesNotExist:
-                            pass
-                        except Exception as e:
-                            self.stdout.write(self.style.WARNING(f'  Error al eliminar archivo: {e}'))
-            
-            # Eliminar la acción reversible
-            action.delete()
-        
+
         self.stdout.write(
             self.style.SUCCESS(
-                f'✓ Limpieza completada: {total_actions} acciones eliminadas, {deleted_files} archivos borrados'
+                f'✓ Proceso completado en {time.monotonic() - started:.3f}s:'
+                f"\n  - {stats['actions']} acciones eliminadas"
+                f"\n  - {stats['attachments']} adjuntos eliminados"
+                f"\n  - {stats['deleted']} archivos borrados ({stats['shared']} compartidos, {stats['missing']} no existían, {stats['error']} con error)"
             )
         )
+
+    def report_chunk(self, stats, elapsed):
+        rate = stats['actions'] / elapsed if elapsed else 0
+        self.stdout.write(
+            f"  Lote {stats['chunks']}: {stats['actions']} acciones, "
+            f"{stats['deleted']} archivos ({rate:.0f} acciones/s)"
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:57
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Índices creados sin bloquear escrituras en tablas grandes
+    atomic = False
+
+    dependencies = [
+        ('groups', '0006_groupactivity_groupactivity_group_time_idx_and_more'),
+        ('tasks', '0011_task_task_group_due_active_idx_and_more'),
+        ('tracking', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='groupactivity',
+            index=models.Index(fields=['group', '-timestamp'], name='groupaction_group_time_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='taskhistory',
+            index=models.Index(fields=['group', '-timestamp'], name='taskhistory_group_time_idx'),
+        ),
+    ]
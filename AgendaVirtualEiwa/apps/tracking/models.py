@@ -29,10 +29,18 @@ class TaskHistory(models.Model):
     # Datos adicionales en JSON
     details = models.JSONField(default=dict, blank=True)
     
+    # Acción revertible que generó este cambio (ediciones)
+    revertible_action = models.ForeignKey(
+        'RevertibleAction', on_delete=models.SET_NULL, null=True, blank=True, related_name='history_entries'
+    )
+    
     class Meta:
         ordering = ['-timestamp']
         verbose_name = 'Historial de Tarea'
         verbose_name_plural = 'Historial de Tareas'
+        indexes = [
+            models.Index(fields=['group', '-timestamp'], name='taskhistory_group_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.task_title} - {self.get_action_display()} por {self.user}"
@@ -68,6 +76,9 @@ class GroupActivity(models.Model):
         ordering = ['-timestamp']
         verbose_name = 'Actividad de Grupo'
         verbose_name_plural = 'Actividades de Grupo'
+        indexes = [
+            models.Index(fields=['group', '-timestamp'], name='groupaction_group_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.group.name} - {self.get_action_display()}"
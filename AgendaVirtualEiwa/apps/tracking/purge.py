@@ -0,0 +1,144 @@
+# Limpieza por lotes de archivos del disco
+#
+# purge_revertible_actions: cada lote toma N ids de acciones vencidas, obtiene
+# en SQL los adjuntos que sus snapshots marcaron como eliminados, borra
+# adjuntos y acciones con un DELETE por tabla y, ya confirmada la transacción,
+# elimina los archivos del disco en un pool de hilos acotado. Un archivo que no
+# se pudo borrar queda huérfano en disco, nunca una fila apuntando a un
+# archivo inexistente.
+#
+# purge_archived_attachment_files: recorre por id (keyset) los adjuntos aún
+# presentes de tareas archivadas, borra los archivos en el pool y los marca
+# como eliminados con un UPDATE por lote. Devuelve el último id procesado de
+# cada lote para poder retomar una ejecución interrumpida. No usa un cursor del
+# servidor: con el pooler de Neon (PgBouncer en modo transacción) cada FETCH
+# fuera de una transacción puede caer en otra conexión donde el cursor no existe.
+#
+# Con almacenamiento deduplicado (ATTACHMENTS_DEDUP) un blob compartido con
+# otros adjuntos solo pierde una referencia ('shared') y no se borra del disco.
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
+from django.db.models import Func, IntegerField, TextField
+from django.db.models.functions import Cast
+from django.db.models.fields.json import KeyTransform
+from django.utils import timezone
+
+from apps.tasks.storage import delete_files
+from .models import RevertibleAction
+
+
+def get_snapshot_attachment_ids(action_ids):
+    """IDs de adjuntos en snapshot_data['deleted_attachments'] de las acciones (en SQL)"""
+    return set(
+        RevertibleAction.objects.filter(
+            id__in=action_ids, action_type='task_edit', snapshot_data__has_key='deleted_attachments'
+        )
+        .annotate(attachment_id=Cast(
+            Func(
+                KeyTransform('deleted_attachments', 'snapshot_data'),
+                function='jsonb_array_elements_text',
+                output_field=TextField(),
+            ),
+            IntegerField(),
+        ))
+        .values_list('attachment_id', flat=True)
+    )
+
+
+def purge_revertible_actions(cutoff, chunk_size=1000, workers=4, on_chunk=None):
+    """
+    Elimina las acciones no revertidas anteriores a cutoff y sus adjuntos
+
+    Args:
+        cutoff: Fecha límite (se eliminan las acciones con timestamp anterior)
+        chunk_size: Acciones por lote
+        workers: Hilos para borrar archivos
+        on_chunk: Función llamada tras cada lote con las estadísticas acumuladas
+
+    Returns:
+        Diccionario con acciones, adjuntos y archivos (deleted/shared/missing/error) procesados
+    """
+    from apps.tasks.models import TaskAttachment
+
+    storage = TaskAttachment._meta.get_field('file').storage
+    expired = RevertibleAction.objects.filter(timestamp__lt=cutoff).exclude(status='reverted')
+    stats = {'chunks': 0, 'actions': 0, 'attachments': 0, 'deleted': 0, 'shared': 0, 'missing': 0, 'error': 0}
+    started = time.monotonic()
+
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            action_ids = list(expired.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+            if not action_ids:
+                break
+            last_id = action_ids[-1]
+
+            attachments = list(
+                TaskAttachment.objects.filter(id__in=get_snapshot_attachment_ids(action_ids)).values_list('id', 'file')
+            )
+            with transaction.atomic():
+                TaskAttachment.objects.filter(id__in=[att_id for att_id, _ in attachments]).delete()
+                RevertibleAction.objects.filter(id__in=action_ids).delete()
+
+            results = delete_files(storage, [name for _, name in attachments if name], pool)
+
+            stats['chunks'] += 1
+            stats['actions'] += len(action_ids)
+            stats['attachments'] += len(attachments)
+            for result in results:
+                stats[result] += 1
+            if on_chunk:
+                on_chunk(stats, time.monotonic() - started)
+    return stats
+
+
+def purge_archived_attachment_files(chunk_size=500, workers=4, start_after=0, on_chunk=None):
+    """
+    Borra del disco los adjuntos de tareas archivadas y conserva su metadata
+
+    Args:
+        chunk_size: Adjuntos por lote
+        workers: Hilos para borrar archivos
+        start_after: Retomar después de este id de adjunto (checkpoint)
+        on_chunk: Función llamada tras cada lote con (estadísticas, segundos, último id)
+
+    Returns:
+        Diccionario con los adjuntos marcados y los archivos (deleted/shared/missing/error)
+    """
+    from apps.tasks.models import TaskAttachment
+
+    storage = TaskAttachment._meta.get_field('file').storage
+    pending = (
+        TaskAttachment.objects.filter(task__status='archived', file_deleted=False)
+        .order_by('id')
+        .values_list('id', 'file')
+    )
+    stats = {'chunks': 0, 'marked': 0, 'deleted': 0, 'shared': 0, 'missing': 0, 'error': 0}
+    started = time.monotonic()
+
+    def process(chunk):
+        with_file = [(att_id, name) for att_id, name in chunk if name]
+        results = delete_files(storage, [name for _, name in with_file], pool)
+        # Los que fallaron siguen pendientes para la próxima ejecución
+        failed = {att_id for (att_id, _), result in zip(with_file, results) if result == 'error'}
+        done = [att_id for att_id, _ in chunk if att_id not in failed]
+        TaskAttachment.objects.filter(id__in=done).update(file_deleted=True, deleted_at=timezone.now())
+
+        stats['chunks'] += 1
+        stats['marked'] += len(done)
+        for result in results:
+            stats[result] += 1
+        if on_chunk:
+            on_chunk(stats, time.monotonic() - started, chunk[-1][0])
+
+    last_id = start_after
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            chunk = list(pending.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            process(chunk)
+    return stats
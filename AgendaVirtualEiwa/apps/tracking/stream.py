@@ -0,0 +1,135 @@
+# Línea de tiempo de un grupo (actividad del grupo + historial de tareas)
+#
+# Las dos tablas se combinan en SQL con UNION ALL ordenado por
+# (timestamp, tipo, id) y se paginan con un cursor sobre esa misma clave,
+# así cada página lee solo sus filas. Después se cargan los eventos de la
+# página (una consulta por tabla) con usuarios, tareas y la acción revertible
+# enlazada en TaskHistory.revertible_action. Si hay historial en el archivo
+# frío (ver archive.py), se mezcla con la página por la misma clave.
+from datetime import timedelta
+
+from django.db.models import CharField, Q, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .archive import build_archived_entries, iter_archived_history
+from .models import GroupActivity, TaskHistory
+
+
+def encode_event_cursor(event):
+    return f"{event['timestamp'].isoformat()}|{event['kind']}|{event['id']}"
+
+
+def parse_event_cursor(value):
+    """(timestamp, tipo, id) del cursor; None si falta o no es válido"""
+    try:
+        timestamp, kind, event_id = value.split('|')
+        timestamp = parse_datetime(timestamp)
+        event_id = int(event_id)
+    except (AttributeError, ValueError):
+        return None
+    if timestamp is None or timezone.is_naive(timestamp) or kind not in ('group', 'task'):
+        return None
+    return timestamp, kind, event_id
+
+
+def get_cursor_filter(kind, cursor):
+    """Filas de un tipo que van después del cursor en orden descendente"""
+    timestamp, cursor_kind, event_id = cursor
+    if kind == cursor_kind:
+        return Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=event_id)
+    if kind < cursor_kind:
+        return Q(timestamp__lte=timestamp)
+    return Q(timestamp__lt=timestamp)
+
+
+def get_event_keys(group, cursor=None, limit=50):
+    """(tipo, id, timestamp) de una página, con una sola consulta UNION ALL"""
+    branches = []
+    for kind, model in (('group', GroupActivity), ('task', TaskHistory)):
+        rows = model.objects.filter(group=group)
+        if cursor is not None:
+            rows = rows.filter(get_cursor_filter(kind, cursor))
+        branches.append(
+            rows.order_by().annotate(kind=Value(kind, output_field=CharField())).values('id', 'timestamp', 'kind')
+        )
+    stream = branches[0].union(branches[1], all=True).order_by('-timestamp', '-kind', '-id')
+    return list(stream[:limit])
+
+
+def get_archived_keys(group, cursor, after, exclude_ids, limit):
+    """Filas del archivo frío que caen en la página (después del cursor y desde after)"""
+    # before incluye el mismo instante del cursor; el desempate se hace con la clave completa
+    before = cursor[0] + timedelta(microseconds=1) if cursor else None
+    rows = []
+    for row in iter_archived_history(group.id, before=before, after=after):
+        if cursor is not None and (row['timestamp'], 'task', row['id']) >= cursor:
+            continue
+        if row['id'] in exclude_ids:
+            continue
+        rows.append(row)
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def get_group_events(group, cursor=None, limit=50):
+    """
+    Una página de la línea de tiempo de un grupo
+
+    Args:
+        group: Grupo
+        cursor: Tupla (timestamp, tipo, id) del último evento ya mostrado
+        limit: Eventos por página
+
+    Returns:
+        Tupla (eventos, cursor de la página siguiente o None)
+    """
+    keys = get_event_keys(group, cursor, limit)
+
+    # Historial archivado que pueda caer en esta página: todo si la página
+    # quedó corta, si no solo lo posterior al último evento
+    after = keys[-1]['timestamp'] if len(keys) == limit else None
+    task_ids = {key['id'] for key in keys if key['kind'] == 'task'}
+    archived = get_archived_keys(group, cursor, after, task_ids, limit)
+
+    activity = GroupActivity.objects.select_related('user', 'affected_user').in_bulk(
+        [key['id'] for key in keys if key['kind'] == 'group']
+    )
+    history = TaskHistory.objects.select_related('user', 'task', 'revertible_action').in_bulk(task_ids)
+    history.update({entry.id: entry for entry in build_archived_entries(archived)})
+
+    events = []
+    for act in activity.values():
+        events.append({
+            'kind': 'group',
+            'id': act.id,
+            'type': 'group',
+            'timestamp': act.timestamp,
+            'action': act.get_action_display(),
+            'user': act.user,
+            'affected_user': act.affected_user,
+            'description': act.description,
+            'details': act.details,
+        })
+    for hist in history.values():
+        revertible = hist.revertible_action if hist.revertible_action_id else None
+        events.append({
+            'kind': 'task',
+            'id': hist.id,
+            'type': 'task',
+            'timestamp': hist.timestamp,
+            'action': hist.get_action_display(),
+            'user': hist.user,
+            'task_title': hist.task_title,
+            'task': hist.task,
+            'field_changed': hist.field_changed,
+            'old_value': hist.old_value,
+            'new_value': hist.new_value,
+            'revertible_action': revertible if revertible and revertible.status == 'active' else None,
+        })
+
+    events.sort(key=lambda event: (event['timestamp'], event['kind'], event['id']), reverse=True)
+    events = events[:limit]
+    next_cursor = encode_event_cursor(events[-1]) if len(events) == limit else None
+    return events, next_cursor
@@ -1,3 +1,372 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core.models import ScheduledJob
+from apps.groups.models import Group, GroupMember
+from apps.subjects.models import Subject
+from apps.tasks.models import Task, TaskAttachment
+from apps.tracking.archive import get_history_page, get_segment_path
+from apps.tracking.buffer import get_buffer, start_buffer, stop_buffer
+from apps.tracking.models import GroupActivity, RevertibleAction, TaskHistory
+from apps.tracking.stream import get_group_events, parse_event_cursor
+from apps.tracking.utils import create_revertible_action, log_group_activity, log_task_action
+
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class AuditBufferTests(TestCase):
+    """La auditoría de una petición se escribe en lote al final"""
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username='auditor', email='auditor@example.com', password='clave-segura-123',
+            nombre='Raul', apellido='Soto'
+        )
+        self.group = Group.objects.create(name='Grupo auditoria')
+        self.subject = Subject.objects.create(group=self.group, name='Historia', created_by=self.user)
+        today = timezone.now().date()
+        self.task = Task.objects.create(
+            group=self.group, subject=self.subject, title='Historia', created_by=self.user,
+            assigned_date=today, due_date=today + timedelta(days=3),
+        )
+
+    def _start_buffer(self):
+        # Buffer activo como dentro de una petición (AuditBufferMiddleware)
+        self.addCleanup(stop_buffer, start_buffer())
+
+    def _flush(self):
+        with CaptureQueriesContext(connection) as queries:
+            get_buffer().flush()
+        return [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+
+    def test_rows_are_written_in_one_insert_per_model(self):
+        self._start_buffer()
+        with self.captureOnCommitCallbacks(execute=True):
+            for field in ('description', 'due_date', 'priority'):
+                log_task_action(self.task, 'edited', self.user, field, 'antes', 'despues')
+            log_group_activity(self.group, 'group_updated', self.user, description='Cambio')
+        self.assertFalse(TaskHistory.objects.exists())
+
+        inserts = self._flush()
+
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(TaskHistory.objects.filter(task=self.task).count(), 3)
+        self.assertEqual(GroupActivity.objects.filter(group=self.group).count(), 1)
+
+    def test_rolled_back_actions_are_not_audited(self):
+        self._start_buffer()
+        with self.captureOnCommitCallbacks(execute=True):
+            log_task_action(self.task, 'edited', self.user, 'priority', 'low', 'high')
+            try:
+                with transaction.atomic():
+                    log_task_action(self.task, 'completed', self.user)
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self._flush()
+
+        self.assertEqual(list(TaskHistory.objects.values_list('action', flat=True)), ['edited'])
+
+    def test_rows_of_deleted_tasks_are_dropped(self):
+        other = Task.objects.create(
+            group=self.group, subject=self.subject, title='Historia', created_by=self.user,
+            assigned_date=self.task.assigned_date, due_date=self.task.due_date,
+        )
+        self._start_buffer()
+        with self.captureOnCommitCallbacks(execute=True):
+            log_task_action(self.task, 'edited', self.user, 'priority', 'low', 'high')
+            log_task_action(other, 'edited', self.user, 'priority', 'low', 'high')
+        other.delete()
+
+        self._flush()
+
+        self.assertEqual(list(TaskHistory.objects.values_list('task_id', flat=True)), [self.task.id])
+
+    def test_writes_immediately_outside_a_request(self):
+        log_task_action(self.task, 'created', self.user)
+
+        self.assertIsNone(get_buffer())
+        self.assertTrue(TaskHistory.objects.filter(action='created').exists())
+
+
+class TaskHistoryArchiveTests(TestCase):
+    """El historial antiguo pasa a segmentos comprimidos y se sigue leyendo"""
+
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, ignore_errors=True)
+        override = override_settings(TASK_HISTORY_ARCHIVE_DIR=self.archive_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username='archivo', email='archivo@example.com', password='clave-segura-123',
+            nombre='Elsa', apellido='Rios'
+        )
+        self.group = Group.objects.create(name='Grupo archivo')
+        GroupMember.objects.create(group=self.group, user=self.user, role='leader')
+        subject = Subject.objects.create(group=self.group, name='Geografia', created_by=self.user)
+        today = timezone.now().date()
+        self.task = Task.objects.create(
+            group=self.group, subject=subject, title='Geografia', created_by=self.user,
+            assigned_date=today, due_date=today + timedelta(days=3),
+        )
+        Task.objects.filter(id=self.task.id).update(created_at=datetime(2024, 1, 1, tzinfo=dt_timezone.utc))
+        self.task.refresh_from_db()
+
+        # 30 entradas de hace más de un año repartidas en tres meses y 5 recientes
+        now = timezone.now()
+        for n in range(35):
+            entry = TaskHistory.objects.create(
+                task=self.task, task_title='Geografia', group=self.group,
+                action='completed' if n % 2 else 'reopened', user=self.user,
+            )
+            if n < 30:
+                timestamp = datetime(2024, 3 + n // 10, 1 + n, 12, tzinfo=dt_timezone.utc)
+            else:
+                timestamp = now - timedelta(minutes=n)
+            TaskHistory.objects.filter(id=entry.id).update(timestamp=timestamp)
+
+    def test_command_moves_old_rows_to_monthly_segments(self):
+        call_command('archive_task_history', months=6, chunk_size=7, stdout=StringIO())
+
+        self.assertEqual(TaskHistory.objects.count(), 5)
+        for month in ((2024, 3), (2024, 4), (2024, 5)):
+            self.assertTrue(os.path.exists(get_segment_path(self.group.id, month)))
+
+        entries = get_history_page(self.group, task=self.task, limit=50)
+        self.assertEqual(len(entries), 35)
+        timestamps = [entry.timestamp for entry in entries]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+        self.assertEqual(entries[-1].user, self.user)
+        self.assertEqual(entries[-1].task, self.task)
+
+    def test_dry_run_keeps_rows(self):
+        call_command('archive_task_history', months=6, dry_run=True, stdout=StringIO())
+
+        self.assertEqual(TaskHistory.objects.count(), 35)
+        self.assertFalse(os.listdir(self.archive_dir))
+
+    @override_settings(HISTORY_PAGE_SIZE=20)
+    def test_history_view_pages_into_archive(self):
+        call_command('archive_task_history', months=6, stdout=StringIO())
+        self.client.force_login(self.user)
+
+        url = reverse('task_history', args=[self.task.id])
+        seen = []
+        while url:
+            response = self.client.get(url)
+            seen.extend(entry.id for entry in response.context['history'])
+            url = response.context['older_page_url']
+
+        self.assertEqual(len(seen), 35)
+        self.assertEqual(len(set(seen)), 35)
+
+        response = self.client.get(reverse('group_history', args=[self.group.id]))
+        older = self.client.get(response.context['older_page_url'])
+        self.assertEqual(len(older.context['all_events']), 15)
+
+
+    @override_settings(HISTORY_PAGE_SIZE=4)
+    def test_history_pages_do_not_skip_entries_with_the_same_timestamp(self):
+        # Como las deja bulk_create: grupos de filas con el mismo instante que cruzan el corte de página
+        recent = timezone.now() - timedelta(hours=1)
+        TaskHistory.objects.filter(timestamp__gte=datetime(2025, 1, 1, tzinfo=dt_timezone.utc)).update(timestamp=recent)
+        TaskHistory.objects.filter(
+            timestamp__month=4, timestamp__year=2024
+        ).update(timestamp=datetime(2024, 4, 15, 12, tzinfo=dt_timezone.utc))
+        expected = list(TaskHistory.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        call_command('archive_task_history', months=6, stdout=StringIO())
+        self.client.force_login(self.user)
+
+        url = reverse('task_history', args=[self.task.id])
+        seen = []
+        while url:
+            response = self.client.get(url)
+            seen.extend(entry.id for entry in response.context['history'])
+            url = response.context['older_page_url']
+
+        self.assertEqual(seen, expected)
+
+
+class GroupEventStreamTests(TestCase):
+    """La línea de tiempo del grupo se pagina en SQL sin repetir ni saltar eventos"""
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username='linea', email='linea@example.com', password='clave-segura-123',
+            nombre='Ana', apellido='Luna'
+        )
+        self.group = Group.objects.create(name='Grupo linea')
+        subject = Subject.objects.create(group=self.group, name='Quimica', created_by=self.user)
+        today = timezone.now().date()
+        self.task = Task.objects.create(
+            group=self.group, subject=subject, title='Quimica', created_by=self.user,
+            assigned_date=today, due_date=today + timedelta(days=3),
+        )
+
+        # Eventos de ambas tablas con instantes repetidos para forzar empates
+        base = timezone.now() - timedelta(days=1)
+        for n in range(9):
+            log_task_action(self.task, 'completed', self.user)
+            log_group_activity(self.group, 'group_updated', self.user, description=f'Cambio {n}')
+            timestamp = base + timedelta(minutes=n // 3)
+            TaskHistory.objects.filter(timestamp__gt=base + timedelta(hours=1)).update(timestamp=timestamp)
+            GroupActivity.objects.filter(timestamp__gt=base + timedelta(hours=1)).update(timestamp=timestamp)
+
+    def test_pages_cover_all_events_in_order(self):
+        seen = []
+        cursor = None
+        while True:
+            # UNION ALL + una consulta por tabla presente en la página
+            with CaptureQueriesContext(connection) as queries:
+                events, next_cursor = get_group_events(self.group, parse_event_cursor(cursor), limit=4)
+            self.assertLessEqual(len(queries), 3)
+            seen.extend((event['kind'], event['id'], event['timestamp']) for event in events)
+            if not next_cursor:
+                break
+            cursor = next_cursor
+
+        self.assertEqual(len(seen), 18)
+        self.assertEqual(len(set(seen)), 18)
+        self.assertEqual(seen, sorted(seen, key=lambda e: (e[2], e[0], e[1]), reverse=True))
+
+    def test_edit_links_its_revertible_action(self):
+        revertible = create_revertible_action('task_edit', self.group, self.user, {'priority': 'low'}, task=self.task)
+        log_task_action(self.task, 'edited', self.user, 'priority', 'low', 'high', revertible_action=revertible)
+
+        events, _ = get_group_events(self.group, limit=1)
+        self.assertEqual(events[0]['revertible_action'], revertible)
+
+        revertible.status = 'reverted'
+        revertible.save()
+        events, _ = get_group_events(self.group, limit=1)
+        self.assertIsNone(events[0]['revertible_action'])
+
+    def test_invalid_cursor_starts_from_first_page(self):
+        self.assertIsNone(parse_event_cursor('basura'))
+        self.assertIsNone(parse_event_cursor('2024-01-01T00:00:00|otro|4'))
+
+
+class FileCleanupTestCase(TestCase):
+    """Tarea con adjuntos guardados en un MEDIA_ROOT temporal"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username='limpieza', email='limpieza@example.com', password='clave-segura-123',
+            nombre='Luis', apellido='Paz'
+        )
+        self.group = Group.objects.create(name='Grupo limpieza')
+        subject = Subject.objects.create(group=self.group, name='Arte', created_by=self.user)
+        today = timezone.now().date()
+        self.task = Task.objects.create(
+            group=self.group, subject=subject, title='Arte', created_by=self.user,
+            assigned_date=today, due_date=today + timedelta(days=3),
+        )
+
+    def _attachment(self, name):
+        attachment = TaskAttachment(
+            task=self.task, uploaded_by=self.user, original_filename=name, file_size=4, file_type='text/plain'
+        )
+        attachment.file.save(name, ContentFile(b'data'))
+        return attachment
+
+
+class CleanupOldActionsTests(FileCleanupTestCase):
+    """cleanup_old_actions borra por lotes las acciones vencidas y sus archivos"""
+
+    def _action(self, days_ago, status='active', attachments=()):
+        action = create_revertible_action(
+            'task_edit', self.group, self.user,
+            {'priority': 'low', 'deleted_attachments': [a.id for a in attachments]}, task=self.task
+        )
+        RevertibleAction.objects.filter(id=action.id).update(
+            timestamp=timezone.now() - timedelta(days=days_ago), status=status
+        )
+        return action
+
+    def test_purges_expired_actions_and_their_files(self):
+        files = [self._attachment(f'viejo{n}.txt') for n in range(5)]
+        kept_file = self._attachment('reciente.txt')
+        for n in range(5):
+            self._action(10, attachments=files[n:n + 1])
+        self._action(10, status='expired')
+        reverted = self._action(10, status='reverted')
+        recent = self._action(1, attachments=[kept_file])
+        linked = TaskHistory.objects.create(
+            task=self.task, task_title='Arte', group=self.group, action='edited', user=self.user,
+            revertible_action=RevertibleAction.objects.order_by('id').first(),
+        )
+
+        out = StringIO()
+        call_command('cleanup_old_actions', chunk_size=2, workers=2, stdout=out)
+
+        self.assertEqual(set(RevertibleAction.objects.values_list('id', flat=True)), {reverted.id, recent.id})
+        self.assertEqual(list(TaskAttachment.objects.values_list('id', flat=True)), [kept_file.id])
+        for attachment in files:
+            self.assertFalse(os.path.exists(attachment.file.path))
+        self.assertTrue(os.path.exists(kept_file.file.path))
+        linked.refresh_from_db()
+        self.assertIsNone(linked.revertible_action_id)
+        self.assertIn('Lote 3', out.getvalue())
+        self.assertIn('6 acciones eliminadas', out.getvalue())
+
+
+class CleanupArchivedFilesTests(FileCleanupTestCase):
+    """cleanup_archived_files borra por lotes los archivos de tareas archivadas y se puede retomar"""
+
+    def setUp(self):
+        super().setUp()
+        self.active_file = self._attachment('activa.txt')
+        Task.objects.filter(id=self.task.id).update(status='archived')
+        self.archived_files = [self._attachment(f'archivada{n}.txt') for n in range(5)]
+        TaskAttachment.objects.filter(id=self.active_file.id).update(task=Task.objects.create(
+            group=self.group, subject=self.task.subject, title='Arte', created_by=self.user,
+            assigned_date=self.task.assigned_date, due_date=self.task.due_date,
+        ))
+
+    def test_purges_files_and_keeps_metadata(self):
+        call_command('cleanup_archived_files', chunk_size=2, workers=2, stdout=StringIO())
+
+        for attachment in self.archived_files:
+            attachment.refresh_from_db()
+            self.assertTrue(attachment.file_deleted)
+            self.assertIsNotNone(attachment.deleted_at)
+            self.assertFalse(os.path.exists(attachment.file.path))
+        self.assertTrue(os.path.exists(self.active_file.file.path))
+        self.assertFalse(TaskAttachment.objects.filter(id=self.active_file.id, file_deleted=True).exists())
+        self.assertEqual(ScheduledJob.objects.get(name='cleanup_archived_files').checkpoint, {})
+
+    def test_resumes_after_checkpoint(self):
+        ScheduledJob.objects.create(
+            name='cleanup_archived_files', checkpoint={'last_id': self.archived_files[2].id}
+        )
+
+        out = StringIO()
+        call_command('cleanup_archived_files', stdout=out)
+
+        marked = set(TaskAttachment.objects.filter(file_deleted=True).values_list('id', flat=True))
+        self.assertEqual(marked, {a.id for a in self.archived_files[3:]})
+        self.assertIn('Retomando', out.getvalue())
@@ -1,8 +1,10 @@
 from django.utils import timezone
+from .buffer import record
 from .models import TaskHistory, GroupActivity, UserActionLog, RevertibleAction
 
 
-def log_task_action(task, action, user, field_changed=None, old_value=None, new_value=None, details=None):
+def log_task_action(task, action, user, field_changed=None, old_value=None, new_value=None, details=None,
+                    revertible_action=None):
     """
     Registrar acción en una tarea
     
@@ -14,8 +16,11 @@ def log_task_action(task, action, user, field_changed=None, old_value=None, new_
         old_value: Valor anterior (opcional)
         new_value: Valor nuevo (opcional)
         details: Diccionario con detalles adicionales (opcional)
+        revertible_action: RevertibleAction que permite deshacer el cambio (opcional)
+    
+    Durante una petición la fila se escribe en lote al final (ver buffer.py).
     """
-    TaskHistory.objects.create(
+    record(TaskHistory(
         task=task,
         task_title=task.title if task else "Tarea eliminada",
         group=task.group if task else None,
@@ -24,8 +29,9 @@ def log_task_action(task, action, user, field_changed=None, old_value=None, new_
         field_changed=field_changed or '',
         old_value=str(old_value) if old_value else '',
         new_value=str(new_value) if new_value else '',
-        details=details or {}
-    )
+        details=details or {},
+        revertible_action=revertible_action
+    ))
 
 
 def log_group_activity(group, action, user, affected_user=None, description='', details=None):
@@ -40,14 +46,14 @@ def log_group_activity(group, action, user, affected_user=None, description='',
         description: Descripción de la acción
         details: Diccionario con detalles adicionales
     """
-    GroupActivity.objects.create(
+    record(GroupActivity(
         group=group,
         action=action,
         user=user,
         affected_user=affected_user,
         description=description,
         details=details or {}
-    )
+    ))
 
 
 def log_user_action(user, action_type, ip_address=None, user_agent=None, group=None, task=None, details=None):
@@ -63,7 +69,7 @@ def log_user_action(user, action_type, ip_address=None, user_agent=None, group=N
         task: Tarea relacionada (opcional)
         details: Diccionario con detalles adicionales
     """
-    UserActionLog.objects.create(
+    record(UserActionLog(
         user=user,
         action_type=action_type,
         ip_address=ip_address,
@@ -71,7 +77,7 @@ def log_user_action(user, action_type, ip_address=None, user_agent=None, group=N
         group=group,
         task=task,
         details=details or {}
-    )
+    ))
 
 
 def create_revertible_action(action_type, group, performed_by, snapshot_data, task=None, affected_user=None):
@@ -137,6 +143,9 @@ def revert_action(revertible_action, reverted_by):
                 if field not in ['deleted_attachments', 'deleted_permanently']:  # Saltar campos especiales
                     setattr(task, field, value)
             task.save()
+            if 'due_date' in snapshot:
+                from apps.tasks.counters import refresh_task_counters
+                refresh_task_counters(group_ids=[task.group_id])
             
             log_task_action(
                 task=task,
@@ -148,7 +157,9 @@ def revert_action(revertible_action, reverted_by):
         elif revertible_action.action_type == 'task_delete':
             # Restaurar tarea eliminada
             from apps.tasks.models import Task
+            from apps.tasks.counters import refresh_task_counters
             Task.objects.create(**snapshot)
+            refresh_task_counters(group_ids=[snapshot['group_id']])
             
         elif revertible_action.action_type == 'member_remove' and revertible_action.affected_user:
             # Re-agregar miembro expulsado
@@ -1,13 +1,40 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
 from apps.groups.models import Group, GroupMember
 from apps.tasks.models import Task
+from .archive import get_history_page
 from .models import TaskHistory, GroupActivity, RevertibleAction
+from .stream import get_group_events, parse_event_cursor
 from .utils import get_group_activity, get_revertible_actions, revert_action
 
 
+def get_before_cursor(request):
+    """Cursor ?before= (timestamp ISO|id de la última entrada vista); inválido = primera página"""
+    try:
+        timestamp, entry_id = request.GET.get('before', '').split('|')
+        before = parse_datetime(timestamp)
+        entry_id = int(entry_id)
+    except ValueError:
+        return None
+    if before is None or timezone.is_naive(before):
+        return None
+    return before, entry_id
+
+
+def get_older_page_url(url, entries):
+    """Enlace a la página siguiente (entradas anteriores a la última mostrada), si la actual vino completa"""
+    if len(entries) < settings.HISTORY_PAGE_SIZE:
+        return None
+    last = entries[-1]
+    return f"{url}?{urlencode({'before': f'{last.timestamp.isoformat()}|{last.id}'})}"
+
+
 @login_required
 def group_history(request, group_id):
     """Ver historial completo de un grupo"""
@@ -20,73 +47,11 @@ def group_history(request, group_id):
     except GroupMember.DoesNotExist:
         return redirect('dashboard')
     
-    # Obtener actividad del grupo
-    activity = get_group_activity(group, limit=50)
-    
-    # Obtener historial de tareas del grupo
-    task_history = TaskHistory.objects.filter(group=group).select_related('user', 'task')[:50]
-    
-    # Combinar y ordenar por fecha
-    all_events = []
-    
-    for act in activity:
-        all_events.append({
-            'type': 'group',
-            'timestamp': act.timestamp,
-            'action': act.get_action_display(),
-            'user': act.user,
-            'affected_user': act.affected_user,
-            'description': act.description,
-            'details': act.details,
-        })
-    
-    # Agrupar historial por timestamp para encontrar acciones revertibles
-    from collections import defaultdict
-    from .models import RevertibleAction
-    
-    history_by_time = defaultdict(list)
-    for hist in task_history:
-        # Agrupar por timestamp redondeado a minuto
-        time_key = hist.timestamp.replace(second=0, microsecond=0)
-        history_by_time[time_key].append(hist)
-    
-    # Obtener todas las acciones revertibles de edición activas
-    revertible_edits = {}
-    if task_history:
-        revertibles = RevertibleAction.objects.filter(
-            action_type='task_edit',
-            group=group,
-            status='active'
-        ).select_related('task')
-        
-        for rev in revertibles:
-            # Usar timestamp redondeado como clave
-            time_key = rev.timestamp.replace(second=0, microsecond=0)
-            if rev.task_id:
-                revertible_edits[(time_key, rev.task_id, rev.performed_by_id)] = rev
-    
-    for hist in task_history:
-        # Buscar acción revertible correspondiente
-        revertible = None
-        if hist.action == 'edited' and hist.task:
-            time_key = hist.timestamp.replace(second=0, microsecond=0)
-            revertible = revertible_edits.get((time_key, hist.task.id, hist.user.id))
-        
-        all_events.append({
-            'type': 'task',
-            'timestamp': hist.timestamp,
-            'action': hist.get_action_display(),
-            'user': hist.user,
-            'task_title': hist.task_title,
-            'task': hist.task,
-            'field_changed': hist.field_changed,
-            'old_value': hist.old_value,
-            'new_value': hist.new_value,
-            'revertible_action': revertible,
-        })
-    
-    # Ordenar por fecha descendente
-    all_events.sort(key=lambda x: x['timestamp'], reverse=True)
+    # Actividad del grupo e historial de tareas en una sola línea de tiempo,
+    # paginada con ?cursor= (ver stream.py)
+    all_events, next_cursor = get_group_events(
+        group, parse_event_cursor(request.GET.get('cursor')), settings.HISTORY_PAGE_SIZE
+    )
     
     # Acciones revertibles (para líderes y creadores según configuración)
     revertible_actions = []
@@ -103,12 +68,17 @@ def group_history(request, group_id):
                 task__created_by=request.user
             ).select_related('performed_by', 'task').order_by('-timestamp')
     
+    older_page_url = None
+    if next_cursor:
+        older_page_url = f"{reverse('group_history', args=[group.id])}?{urlencode({'cursor': next_cursor})}"
+    
     context = {
         'group': group,
         'is_leader': is_leader,
         'can_revert': can_revert,
-        'all_events': all_events[:50],  # Limitar a 50 eventos
+        'all_events': all_events,
         'revertible_actions': revertible_actions,
+        'older_page_url': older_page_url,
     }
     
     return render(request, 'tracking/group_history.html', context)
@@ -126,14 +96,17 @@ def task_history(request, task_id):
     except GroupMember.DoesNotExist:
         return redirect('dashboard')
     
-    # Obtener historial de la tarea
-    history = TaskHistory.objects.filter(task=task).select_related('user')
+    # Obtener historial de la tarea (continúa en el archivo frío)
+    history = get_history_page(
+        task.group, task=task, before=get_before_cursor(request), limit=settings.HISTORY_PAGE_SIZE
+    )
     
     context = {
         'task': task,
         'group': task.group,
         'is_leader': is_leader,
         'history': history,
+        'older_page_url': get_older_page_url(reverse('task_history', args=[task.id]), history),
     }
     
     return render(request, 'tracking/task_history.html', context)
@@ -0,0 +1,14 @@
+# Configuración de gunicorn (se carga automáticamente desde este directorio)
+import os
+
+
+def post_worker_init(worker):
+    """Inicia el planificador de tareas periódicas en cada worker si está habilitado.
+
+    Cada trabajo se reclama en una transacción con un advisory lock de
+    PostgreSQL (ver apps/core/scheduler.py), así solo un worker lo ejecuta
+    por periodo, aunque haya varios workers o varios nodos.
+    """
+    if os.environ.get('RUN_SCHEDULER', 'False') == 'True':
+        from apps.core.scheduler import start_scheduler_thread
+        start_scheduler_thread()
@@ -110,6 +110,7 @@ async function loadCalendar() {
 
         renderCalendar(data);
         renderWorkload(data.workload);
+        renderOverdueSummary(data.overdue_summary);
         hideLoading();
     } catch (error) {
         console.error('Error cargando calendario:', error);
@@ -390,38 +391,119 @@ function showDayDetails(year, month, day, dayTasks) {
         return;
     }
 
-    let html = '<div class="day-tasks-list">';
-    dayTasks.forEach(task => {
-        const isCompleted = task.status === 'completed' || task.status === 'overdue_completed';
-        const isOverdue = task.status === 'overdue' || task.status === 'overdue_completed';
-        const isArchived = task.is_archived || false;
-
-        html += `
-            <div class="task-card ${isCompleted ? 'completed' : ''} ${isOverdue ? 'overdue' : ''} ${isArchived ? 'archived' : ''}">
-                <div class="task-color" style="background: ${task.subject_color}"></div>
-                <div class="task-info">
-                    <h4>${task.title}</h4>
-                    <p class="task-subject">${task.subject} - ${task.group}</p>
-                    ${task.description ? `<p class="task-description">${task.description}</p>` : ''}
-                    <p class="task-meta">Creada por: ${task.created_by}</p>
-                    ${isArchived ? '<span class="badge-archived">ARCHIVADA</span>' : ''}
-                    ${isOverdue && !isArchived ? '<span class="badge-overdue">VENCIDA</span>' : ''}
-                </div>
-                <div class="task-actions">
-                    <a href="/tasks/${task.id}/" class="btn btn-sm btn-primary">Ver Tarea</a>
-                    ${!isArchived && !isCompleted ? 
-                        `<button class="btn btn-sm btn-success" onclick="toggleTask(${task.id})">Completar</button>` : 
-                        !isArchived && isCompleted ? 
-                        `<button class="btn btn-sm btn-secondary" onclick="toggleTask(${task.id})">Desmarcar</button>` : 
-                        ''
-                    }
-                </div>
+    modalBody.innerHTML = `<div class="day-tasks-list">${dayTasks.map(renderTaskCard).join('')}</div>`;
+}
+
+function renderTaskCard(task) {
+    const isCompleted = task.status === 'completed' || task.status === 'overdue_completed';
+    const isOverdue = task.status === 'overdue' || task.status === 'overdue_completed';
+    const isArchived = task.is_archived || false;
+
+    return `
+        <div class="task-card ${isCompleted ? 'completed' : ''} ${isOverdue ? 'overdue' : ''} ${isArchived ? 'archived' : ''}">
+            <div class="task-color" style="background: ${task.subject_color}"></div>
+            <div class="task-info">
+                <h4>${task.title}</h4>
+                <p class="task-subject">${task.subject} - ${task.group}</p>
+                ${task.description ? `<p class="task-description">${task.description}</p>` : ''}
+                <p class="task-meta">Creada por: ${task.created_by}</p>
+                ${isArchived ? '<span class="badge-archived">ARCHIVADA</span>' : ''}
+                ${isOverdue && !isArchived ? '<span class="badge-overdue">VENCIDA</span>' : ''}
             </div>
-        `;
+            <div class="task-actions">
+                <a href="/tasks/${task.id}/" class="btn btn-sm btn-primary">Ver Tarea</a>
+                ${!isArchived && !isCompleted ? 
+                    `<button class="btn btn-sm btn-success" onclick="toggleTask(${task.id})">Completar</button>` : 
+                    !isArchived && isCompleted ? 
+                    `<button class="btn btn-sm btn-secondary" onclick="toggleTask(${task.id})">Desmarcar</button>` : 
+                    ''
+                }
+            </div>
+        </div>
+    `;
+}
+
+// Tareas vencidas anteriores a la ventana de historial: el calendario solo
+// recibe un resumen por grupo y materia; el detalle se pide por páginas
+function renderOverdueSummary(summary) {
+    const container = document.getElementById('overdueSummary');
+    if (!container) return;
+
+    if (!summary || summary.total === 0) {
+        container.style.display = 'none';
+        container.innerHTML = '';
+        return;
+    }
+
+    const before = new Date(`${summary.before}T00:00:00`).toLocaleDateString('es-MX', { day: 'numeric', month: 'long', year: 'numeric' });
+    const chips = summary.groups.map((row, index) => `
+        <button type="button" class="overdue-chip" data-index="${index}" style="border-left-color: ${row.subject_color}">
+            <span class="overdue-chip-subject">${row.subject}</span>
+            <span class="overdue-chip-group">${row.group}</span>
+            <span class="overdue-chip-count">${row.count}</span>
+        </button>
+    `).join('');
+
+    container.innerHTML = `
+        <div class="overdue-summary-header">
+            <span>${summary.total} tarea${summary.total !== 1 ? 's' : ''} vencida${summary.total !== 1 ? 's' : ''} sin completar antes del ${before}</span>
+            <button type="button" class="overdue-summary-all">Ver todas</button>
+        </div>
+        <div class="overdue-chips">${chips}</div>
+    `;
+    container.style.display = 'block';
+
+    // Los mismos filtros con los que el servidor calculó el resumen (grupo, materia, creador)
+    container.querySelector('.overdue-summary-all').addEventListener('click', () => {
+        showOverdueTasks(summary.before, summary.filters);
+    });
+    container.querySelectorAll('.overdue-chip').forEach(chip => {
+        chip.addEventListener('click', () => {
+            const row = summary.groups[chip.dataset.index];
+            showOverdueTasks(summary.before, { ...summary.filters, group: row.group_id, subject: row.subject_id });
+        });
     });
-    html += '</div>';
+}
+
+async function showOverdueTasks(before, filters, cursor = null) {
+    const modal = document.getElementById('dayModal');
+    const modalBody = document.getElementById('modalBody');
+
+    if (!cursor) {
+        document.getElementById('modalDate').textContent = 'Tareas vencidas anteriores';
+        modalBody.innerHTML = '<div class="day-tasks-list"></div><p class="loading">Cargando...</p>';
+        modal.style.display = 'flex';
+    }
+
+    const params = new URLSearchParams({ before });
+    ['group', 'subject', 'creator'].forEach(name => {
+        if (filters[name]) params.set(name, filters[name]);
+    });
+    if (cursor) params.set('cursor', cursor);
 
-    modalBody.innerHTML = html;
+    const list = modalBody.querySelector('.day-tasks-list');
+    modalBody.querySelectorAll('.loading, .overdue-more').forEach(el => el.remove());
+
+    try {
+        const response = await fetch(`/calendar/api/overdue/?${params}`);
+        const data = await response.json();
+
+        list.insertAdjacentHTML('beforeend', data.tasks.map(renderTaskCard).join(''));
+        if (!cursor && data.tasks.length === 0) {
+            modalBody.insertAdjacentHTML('beforeend', '<p class="no-tasks">No hay tareas vencidas</p>');
+        }
+        if (data.has_next) {
+            const more = document.createElement('button');
+            more.type = 'button';
+            more.className = 'overdue-more';
+            more.textContent = 'Cargar más';
+            more.addEventListener('click', () => showOverdueTasks(before, filters, data.next_cursor));
+            modalBody.appendChild(more);
+        }
+    } catch (error) {
+        console.error('Error cargando tareas vencidas:', error);
+        modalBody.insertAdjacentHTML('beforeend', '<p class="error">Error al cargar las tareas</p>');
+    }
 }
 
 function closeModal() {
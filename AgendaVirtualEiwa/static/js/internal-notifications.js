@@ -7,6 +7,7 @@ class InternalNotifications {
         this.badge = null;
         this.list = null;
         this.unreadCount = 0;
+        this.notifications = [];
         this.init();
     }
 
@@ -53,8 +54,32 @@ class InternalNotifications {
         // Cargar notificaciones inicialmente
         this.loadNotifications();
 
-        // Actualizar cada 30 segundos
-        setInterval(() => this.loadNotifications(), 30000);
+        // Recibir cambios por el stream; actualizar cada 30 segundos solo si no está disponible
+        const stream = window.notificationStream;
+        if (stream) {
+            stream.addEventListener('unread', (e) => {
+                this.unreadCount = e.detail.unread_count || 0;
+                this.updateBadge();
+            });
+            stream.addEventListener('notification', (e) => this.addNotification(e.detail));
+            stream.addEventListener('update', (e) => this.updateNotification(e.detail));
+            stream.onFallback(() => setInterval(() => this.loadNotifications(), 30000));
+        } else {
+            setInterval(() => this.loadNotifications(), 30000);
+        }
+    }
+
+    addNotification(notification) {
+        if (this.notifications.some(n => n.id === notification.id)) return;
+        this.notifications = [notification, ...this.notifications].slice(0, 20);
+        this.renderNotifications(this.notifications);
+    }
+
+    updateNotification(notification) {
+        // Un resumen que sumó eventos vuelve arriba con su nuevo contenido
+        const others = this.notifications.filter(n => n.id !== notification.id);
+        this.notifications = [notification, ...others].slice(0, 20);
+        this.renderNotifications(this.notifications);
     }
 
     toggleDropdown() {
@@ -81,8 +106,9 @@ class InternalNotifications {
             const data = await response.json();
 
             this.unreadCount = data.unread_count || 0;
+            this.notifications = data.notifications || [];
             this.updateBadge();
-            this.renderNotifications(data.notifications || []);
+            this.renderNotifications(this.notifications);
         } catch (error) {
             console.error('Error cargando notificaciones:', error);
         }
@@ -122,7 +148,7 @@ class InternalNotifications {
                 </div>
                 <div class="notification-content"
                      onclick="internalNotifications.handleNotificationClick(${notif.id}, '${notif.action_url || ''}')">
-                    <h4>${notif.title}</h4>
+                    <h4>${notif.title}${notif.count > 1 ? ` <span class="notification-count">×${notif.count}</span>` : ''}</h4>
                     <p>${notif.message}</p>
                     <span class="notification-time">${this.formatTime(notif.created_at)}</span>
                 </div>
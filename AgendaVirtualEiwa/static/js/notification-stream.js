@@ -0,0 +1,76 @@
+// Conexión Server-Sent Events para notificaciones en tiempo real
+// Emite 'notification' (nueva notificación), 'update' (una notificación ya
+// recibida cambió, p. ej. un resumen que sumó tareas) y 'unread' (conteo de no leídas).
+// Si el stream no está disponible emite 'fallback' una sola vez y los módulos
+// de notificaciones vuelven a consultar la API periódicamente.
+
+class NotificationStream extends EventTarget {
+    constructor(url) {
+        super();
+        this.url = url;
+        this.source = null;
+        this.connected = false;
+        this.fallback = false;
+        this.failures = 0;
+        this.connect();
+    }
+
+    connect() {
+        if (!window.EventSource) {
+            this.useFallback();
+            return;
+        }
+
+        this.source = new EventSource(this.url);
+
+        this.source.addEventListener('open', () => {
+            this.connected = true;
+            this.failures = 0;
+        });
+
+        this.source.addEventListener('notification', (e) => {
+            this.emit('notification', JSON.parse(e.data));
+        });
+
+        this.source.addEventListener('update', (e) => {
+            this.emit('update', JSON.parse(e.data));
+        });
+
+        this.source.addEventListener('unread', (e) => {
+            this.emit('unread', JSON.parse(e.data));
+        });
+
+        this.source.addEventListener('error', () => {
+            this.failures += 1;
+            // CLOSED: el servidor rechazó el stream (p. ej. 503 bajo WSGI).
+            // Si nunca conectó, tras varios intentos se asume que no está disponible.
+            const closed = this.source.readyState === EventSource.CLOSED;
+            if (closed || (!this.connected && this.failures >= 3)) {
+                this.source.close();
+                this.useFallback();
+            }
+        });
+    }
+
+    emit(type, detail) {
+        this.dispatchEvent(new CustomEvent(type, { detail }));
+    }
+
+    useFallback() {
+        if (this.fallback) return;
+        this.fallback = true;
+        console.log('Stream de notificaciones no disponible, usando polling');
+        this.emit('fallback');
+    }
+
+    onFallback(callback) {
+        if (this.fallback) {
+            callback();
+        } else {
+            this.addEventListener('fallback', callback, { once: true });
+        }
+    }
+}
+
+// Crear instancia global
+window.notificationStream = new NotificationStream('/notifications/api/stream/');
@@ -288,41 +288,7 @@ const notificationManager = new NotificationManager();
 window.notificationManager = notificationManager;
 window.requestNotificationPermission = () => notificationManager.requestPermission();
 
-// Función para verificar si es hora de enviar notificaciones
-function shouldCheckNow() {
-    const now = new Date();
-    const hour = now.getHours();
-    const minute = now.getMinutes();
-
-    // Horarios clave para verificar:
-    // 8:00 AM - Recordatorio de tareas del día
-    // 12:00 PM - Recordatorio de medio día
-    // 6:00 PM - Recordatorio de tareas pendientes
-    // 8:00 PM - Recordatorio de tareas de mañana
-
-    const keyHours = [8, 12, 18, 20];
-
-    // Verificar si estamos en una hora clave (con margen de 5 minutos)
-    return keyHours.some(keyHour => hour === keyHour && minute < 5);
-}
-
-// Verificar tareas cada 5 minutos
-setInterval(() => {
-    if (notificationManager.permission === 'granted') {
-        // Solo verificar en horarios clave o cada hora
-        const now = new Date();
-        if (shouldCheckNow() || now.getMinutes() === 0) {
-            notificationManager.checkTasksAndNotify();
-        }
-    }
-}, 5 * 60 * 1000);
-
-// Verificar al cargar la página
-document.addEventListener('DOMContentLoaded', () => {
-    // Esperar 5 segundos antes de la primera verificación
-    setTimeout(() => {
-        if (notificationManager.permission === 'granted') {
-            notificationManager.checkTasksAndNotify();
-        }
-    }, 5000);
-});
+// Los recordatorios de tareas (hoy, mañana, vencidas) los genera el servidor
+// a las horas configuradas como notificaciones task_reminder; llegan por el
+// stream de notificaciones y realtime-notifications.js los muestra como push.
+// checkTasksAndNotify() queda disponible para una verificación manual.
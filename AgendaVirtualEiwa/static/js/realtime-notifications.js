@@ -1,11 +1,14 @@
 // Sistema de notificaciones en tiempo real
-// Verifica nuevas notificaciones cada minuto y las muestra como push
+// Recibe nuevas notificaciones por el stream SSE y las muestra como push.
+// Si el stream no está disponible, verifica cada minuto
 
 class RealtimeNotifications {
     constructor() {
         this.lastCheck = Date.now();
         this.checkInterval = 60 * 1000; // 1 minuto
         this.notifiedIds = new Set();
+        this.cursor = null; // ID de la última notificación recibida (cursor "since" de la API)
+        this.updatedCursor = null; // Último cambio recibido en resúmenes (cursor "updated_since")
         this.init();
     }
 
@@ -16,8 +19,15 @@ class RealtimeNotifications {
         // Verificar inmediatamente
         setTimeout(() => this.checkNewNotifications(), 3000);
 
-        // Verificar cada minuto
-        setInterval(() => this.checkNewNotifications(), this.checkInterval);
+        const stream = window.notificationStream;
+        if (stream) {
+            stream.addEventListener('notification', (e) => this.handleNotifications([e.detail]));
+            stream.addEventListener('update', (e) => this.handleUpdates([e.detail]));
+            // Verificar cada minuto solo si el stream no está disponible
+            stream.onFallback(() => setInterval(() => this.checkNewNotifications(), this.checkInterval));
+        } else {
+            setInterval(() => this.checkNewNotifications(), this.checkInterval);
+        }
     }
 
     loadNotifiedIds() {
@@ -43,25 +53,24 @@ class RealtimeNotifications {
 
     async checkNewNotifications() {
         try {
-            const response = await fetch('/notifications/api/get/');
-            const data = await response.json();
-
-            if (data.notifications && data.notifications.length > 0) {
-                // Filtrar solo notificaciones nuevas (no leídas y no notificadas)
-                const newNotifications = data.notifications.filter(notif =>
-                    !notif.is_read &&
-                    !this.notifiedIds.has(notif.id) &&
-                    this.isRecent(notif.created_at)
-                );
-
-                // Mostrar notificaciones push
-                newNotifications.forEach(notif => {
-                    this.showPushNotification(notif);
-                    this.notifiedIds.add(notif.id);
-                });
-
-                if (newNotifications.length > 0) {
-                    this.saveNotifiedIds();
+            // Solo se piden las notificaciones posteriores al cursor; si
+            // llegaron más de las que caben en una respuesta se sigue pidiendo
+            let hasMore = true;
+            while (hasMore) {
+                const params = new URLSearchParams();
+                if (this.cursor !== null) params.set('since', this.cursor);
+                if (this.updatedCursor !== null) params.set('updated_since', this.updatedCursor);
+                const response = await fetch(`/notifications/api/get/?${params}`);
+                const data = await response.json();
+                this.cursor = data.cursor ?? this.cursor;
+                this.updatedCursor = data.updated_cursor ?? this.updatedCursor;
+                hasMore = Boolean(data.has_more);
+
+                if (data.notifications && data.notifications.length > 0) {
+                    this.handleNotifications(data.notifications);
+                }
+                if (data.updated && data.updated.length > 0) {
+                    this.handleUpdates(data.updated);
                 }
             }
         } catch (error) {
@@ -69,6 +78,32 @@ class RealtimeNotifications {
         }
     }
 
+    handleNotifications(notifications) {
+        // Filtrar solo notificaciones nuevas (no leídas y no notificadas)
+        const newNotifications = notifications.filter(notif =>
+            !notif.is_read &&
+            !this.notifiedIds.has(notif.id) &&
+            this.isRecent(notif.created_at)
+        );
+
+        // Mostrar notificaciones push
+        newNotifications.forEach(notif => {
+            this.showPushNotification(notif);
+            this.notifiedIds.add(notif.id);
+        });
+
+        if (newNotifications.length > 0) {
+            this.saveNotifiedIds();
+        }
+    }
+
+    handleUpdates(notifications) {
+        // Resúmenes que sumaron eventos: se vuelven a mostrar con el conteo nuevo
+        notifications
+            .filter(notif => !notif.is_read && this.isRecent(notif.updated_at))
+            .forEach(notif => this.showPushNotification(notif));
+    }
+
     isRecent(createdAt) {
         // Considerar reciente si fue creada en los últimos 5 minutos
         const notifTime = new Date(createdAt).getTime();
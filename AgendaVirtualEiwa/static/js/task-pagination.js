@@ -0,0 +1,49 @@
+// Scroll infinito para las listas de tareas
+// Carga la siguiente página (fragmento HTML) cuando el final de la lista es visible.
+// La URL de la siguiente página viene en data-next-page y luego en el header X-Next-Page.
+(function () {
+    const list = document.getElementById('tasksList');
+    const sentinel = document.getElementById('tasksListSentinel');
+    if (!list || !sentinel) return;
+
+    let nextPage = list.dataset.nextPage;
+    let loading = false;
+
+    async function loadNextPage() {
+        if (!nextPage || loading) return;
+        loading = true;
+
+        try {
+            const response = await fetch(nextPage, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                credentials: 'same-origin'
+            });
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+            list.insertAdjacentHTML('beforeend', await response.text());
+            nextPage = response.headers.get('X-Next-Page') || '';
+        } catch (error) {
+            console.error('Error al cargar más tareas:', error);
+            nextPage = '';
+        } finally {
+            loading = false;
+        }
+
+        if (!nextPage) {
+            observer.disconnect();
+            sentinel.remove();
+        }
+    }
+
+    const observer = new IntersectionObserver((entries) => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadNextPage();
+        }
+    }, { rootMargin: '400px 0px' });
+
+    if (nextPage) {
+        observer.observe(sentinel);
+    } else {
+        sentinel.remove();
+    }
+})();